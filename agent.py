@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import math
+import time
+from array import array
+
+# 默认采样间隔（秒）
+SAMPLE_INTERVAL = 5
+# 默认汇总窗口（秒），窗口按整数倍对齐，例如 300 秒的窗口从 :00、:05、:10 … 开始
+WINDOW_SECONDS = 300
+# 服务状态的查询间隔（秒）；systemctl 需要启动子进程，比读取内存和磁盘贵得多，不必每次采样都查
+SERVICE_INTERVAL = 60
+
+
+class RingBuffer:
+    """定长环形缓冲区，写满后覆盖最早的数据，内存占用在创建时就固定"""
+
+    __slots__ = ('values', 'start', 'count')
+
+    def __init__(self, capacity, typecode='f'):
+        self.values = array(typecode, [0]) * capacity
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        capacity = len(self.values)
+        self.values[(self.start + self.count) % capacity] = value
+        if self.count < capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % capacity
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+    def items(self):
+        """按写入顺序返回当前数据"""
+        end = self.start + self.count
+        if end <= len(self.values):
+            return self.values[self.start:end]
+        return self.values[self.start:] + self.values[:end - len(self.values)]
+
+
+def summarize(values):
+    """返回 (最小值, 最大值, 平均值, P95)，P95 取最近秩"""
+    ordered = sorted(values)
+    count = len(ordered)
+    return (ordered[0], ordered[-1], math.fsum(ordered) / count,
+            ordered[max(0, math.ceil(count * 0.95) - 1)])
+
+
+class SamplingAgent:
+    """常驻采样：按固定间隔读取内存和磁盘使用率写入环形缓冲区，每个窗口汇总一次
+
+    read_usage() 返回 (内存%, 磁盘%)，每次采样调用；read_services() 返回
+    [(服务名, 状态, 运行时间文本)]，每 service_interval 秒调用一次；describe()
+    返回 hostname、system_version、uptime 和 thresholds，只在窗口结束时调用。
+    每个窗口结束时调用 write(summary)，summary 的格式见 HistoryStore.append_window。
+    """
+
+    def __init__(self, read_usage, read_services, describe, write, interval=SAMPLE_INTERVAL,
+                 window=WINDOW_SECONDS, service_interval=SERVICE_INTERVAL, clock=time.time):
+        self.read_usage = read_usage
+        self.read_services = read_services
+        self.describe = describe
+        self.write = write
+        self.interval = interval
+        self.window = window
+        self.service_interval = service_interval
+        self.clock = clock
+
+        # 时钟抖动时一个窗口可能多出一次采样，缓冲区多留一格
+        capacity = math.ceil(window / interval) + 1
+        self.memory = RingBuffer(capacity)
+        self.disk = RingBuffer(capacity)
+        self.costs = RingBuffer(capacity)  # 每次采样的耗时（毫秒）
+        self.window_start = None
+        self.next_service_probe = 0
+        # 窗口内各服务最差的状态，窗口内没有查询时沿用最近一次结果
+        self.window_services = {}
+        self.last_services = []
+
+        self.ticks = 0
+        self.missed = 0
+        self.cost_total = 0.0
+        self.cost_max = 0.0
+        self.windows = 0
+
+    def tick(self, now):
+        """采样一次，跨过窗口边界时先写出上一个窗口的汇总"""
+        window_start = now - now % self.window
+        if self.window_start is not None and window_start != self.window_start:
+            self.flush()
+        self.window_start = window_start
+
+        started = time.perf_counter()
+        memory, disk = self.read_usage()
+        self.memory.append(memory)
+        self.disk.append(disk)
+        if now >= self.next_service_probe:
+            self.next_service_probe = now + self.service_interval
+            self.record_services(self.read_services())
+        cost = (time.perf_counter() - started) * 1000
+
+        self.costs.append(cost)
+        self.ticks += 1
+        self.cost_total += cost
+        self.cost_max = max(self.cost_max, cost)
+
+    def record_services(self, services):
+        self.last_services = services
+        for name, state, running_time in services:
+            # 窗口内出现过非 active 的状态就保留下来，短暂的重启也不会被后面的采样掩盖
+            previous = self.window_services.get(name)
+            if previous is None or previous[0] == 'active':
+                self.window_services[name] = (state, running_time)
+
+    def flush(self):
+        """写出当前窗口的汇总，窗口内没有采样时什么也不做"""
+        if not len(self.memory):
+            return
+        summary = dict(self.describe())
+        summary.update({
+            'time': self.window_start,
+            'interval': self.interval,
+            'window': self.window,
+            'memory': summarize(self.memory.items()),
+            'disk': summarize(self.disk.items()),
+            'samples': len(self.memory),
+            'cost_mean': math.fsum(self.costs.items()) / len(self.costs),
+            'cost_max': max(self.costs.items()),
+            'services': [(name,) + self.window_services.get(name, (state, running_time))
+                         for name, state, running_time in self.last_services],
+        })
+        # 先写出再清空，写入失败时本窗口的采样仍保留，下次 flush 时重试
+        self.write(summary)
+        self.memory.clear()
+        self.disk.clear()
+        self.costs.clear()
+        self.window_services = {}
+        self.windows += 1
+
+    def run(self, stop):
+        """按间隔采样直到 stop（threading.Event）被设置，退出前写出未满的窗口"""
+        next_tick = time.monotonic()
+        try:
+            while not stop.is_set():
+                self.tick(self.clock())
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay < 0:
+                    # 采样或写入超过了一个间隔，跳过错过的采样点，不集中补采
+                    skipped = math.ceil(-delay / self.interval)
+                    self.missed += skipped
+                    next_tick += skipped * self.interval
+                    delay = next_tick - time.monotonic()
+                stop.wait(delay)
+        finally:
+            self.flush()
+
+    def stats(self):
+        """运行期间的采样次数和开销"""
+        return {
+            'ticks': self.ticks,
+            'windows': self.windows,
+            'missed': self.missed,
+            'cost_mean': self.cost_total / self.ticks if self.ticks else 0.0,
+            'cost_max': self.cost_max,
+        }
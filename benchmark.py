@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""报告生成性能基准
+
+生成模拟的 system_check.sh 日志，分别测量解析、设备卡片、索引页、告警总览页、设备详情页、
+完整报告生成、单文件报告和本地报告服务首页在不同设备数下的耗时、吞吐量和峰值内存，以及各种输出
+形式的大小和拷贝耗时，结果保存为 JSON，
+便于比较不同提交之间的性能变化：
+
+    python benchmark.py run --sizes 100,1000,10000 -o bench_new.json --compare bench_old.json
+    python benchmark.py generate /tmp/logs -n 1000 --alert-ratio 0.3
+    python benchmark.py run --sizes 1000 --log-format json -o bench_json.json --compare bench_new.json
+    python benchmark.py run --sizes 100 --large-section-mb 50 -o bench_large.json
+"""
+
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RESULT_VERSION = 1
+DEFAULT_SIZES = [100, 1000, 10000]
+
+SERVICES = [('updpi', '6.1.511'), ('upp', '1.1.162'), ('upload', '2.3.7'),
+            ('logtar', '1.0.9'), ('tnlinfo_proxy', '1.2.0')]
+
+
+def _section(title, lines, rng, with_timing):
+    """拼接一个分段，带耗时行时与新版巡检脚本的输出一致"""
+    text = f"\n---- {title} ----\n" + "\n".join(lines) + "\n"
+    if with_timing:
+        text += f"@timing elapsed_ms={rng.randint(5, 3000)} commands={rng.randint(1, 40)}\n"
+    return text
+
+def _json_record(record):
+    """与 system_check.sh -f json 一样紧凑输出，text 字段放在最后"""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+def generate_log(index, rng, alert_ratio=0.2, section_lines=5, with_timing=True, log_format='text'):
+    """生成一台设备的模拟巡检日志，返回 (ip, 日志文本)
+
+    每个检查项按 alert_ratio 的概率告警，section_lines 为硬件错误、
+    Core 文件等可变长度部分的行数，巡检总结与各部分的告警保持一致。
+    log_format 为 'json' 时生成 system_check.sh -f json 格式的 JSON 记录。
+    """
+    ip = f"10.{index // 62500}.{index // 250 % 250}.{index % 250 + 1}"
+    alert = {name: rng.random() < alert_ratio for name in
+             ('memory', 'disk', 'services', 'hardware', 'core', 'mempool',
+              'backfill', 'traffic', 'policy', 'policy_release')}
+    status = {name: '告警' if value else 'OK' for name, value in alert.items()}
+
+    memory = rng.uniform(91, 99) if alert['memory'] else rng.uniform(20, 85)
+    if alert['memory']:
+        memory_lines = [f"[告警] 内存使用率过高: 总内存 62.5G | 已用 {62.5 * memory / 100:.1f}G({memory:.1f}%)"]
+    else:
+        memory_lines = [f"（正常）内存使用正常 (当前: {memory:.1f}%)"]
+
+    disk = rng.randint(81, 99) if alert['disk'] else rng.randint(10, 75)
+    if alert['disk']:
+        disk_lines = [f"[告警] 挂载点 /data 使用率过高: 已用 {disk * 10}G/1000G({disk:.1f}%)"]
+    else:
+        disk_lines = [f"（正常）磁盘使用正常 (最高: {disk}% /data)"]
+
+    service_lines = [f"{'服务名称':<20} {'状态':<15} {'版本':<20} {'运行时长':<20}", '-' * 80]
+    down = rng.randrange(len(SERVICES)) if alert['services'] else None
+    for i, (name, version) in enumerate(SERVICES):
+        if i == down:
+            service_lines.append(f"[告警] {name:<15} | {'inactive':<15} | {'未知':<15} | {'时间不可用':<15}")
+        else:
+            uptime = f"{rng.randint(1, 300)} days"
+            service_lines.append(f"（正常）{name:<15} | {'运行中':<15} | {version:<15} | {uptime:<15}")
+    service_lines.append('-' * 80)
+
+    if alert['hardware']:
+        hardware_lines = ["[告警] 检测到硬件错误:"] + [
+            f"    [Mon Feb 17 0{i % 10}:12:3{i % 10} 2025] mce: [Hardware Error]: Machine check events logged"
+            for i in range(section_lines)]
+    else:
+        hardware_lines = ["最近系统错误日志（仅供参考）:"] + [
+            f"    [Mon Feb 17 0{i % 10}:10:0{i % 10} 2025] ACPI Error: AE_NOT_FOUND, While resolving a named reference"
+            for i in range(section_lines)]
+
+    if alert['core']:
+        core_lines = ["[告警] 发现最近一个月的core文件:"]
+        for i in range(section_lines):
+            core_lines += [f"    文件: /home/updpi/log/updpi.core.v{i}", f"    生成时间: 2025-02-1{i % 10} 03:12:45",
+                           "    文件大小: 1.2G", "    ----------------------"]
+    else:
+        core_lines = ["（正常）未发现最近一个月的core文件"]
+
+    b256 = rng.uniform(11, 30) if alert['mempool'] else rng.uniform(0, 2)
+    imsi = rng.uniform(1, 60)
+    mempool_lines = [
+        "", f"{'[告警]' if alert['mempool'] else '（正常）'} 内存池状态:",
+        f"{'内存池名称':<20} {'总大小':<10} {'失败次数':<14} {'失败率':<8}",
+        f"{'b256_pool':<15} {'1000000':<10} {int(b256 * 1000):<8} {b256:.2f}%",
+        "（正常）分片内存分配失败次数（get_seg_mem_failed）: 0",
+        "", "（正常）IMSI哈希表使用情况:",
+        f"    imsi hash table,cap:25000000,used:{int(imsi * 250000)}({imsi:.2f}%)",
+        "", "（正常）DPDK队列使用情况:",
+    ] + [f"    AGING_RING_STEP12[{i}]      使用率: {rng.randint(0, 60)}% (已用: 30/1024)" for i in range(4)]
+
+    backfill = rng.uniform(60, 89) if alert['backfill'] else rng.uniform(91, 99.9)
+    backfill_lines = [f"   [告警] 回填率过低: {backfill:.2f}%" if alert['backfill']
+                      else f"（正常）回填率: {backfill:.2f}%"]
+
+    traffic_lines = ["端口状态检查:"]
+    for port in range(2):
+        traffic_lines.append(f"（正常）Port{port} 状态: UP")
+    for port in range(2):
+        miss = rng.randint(1001, 5000) if alert['traffic'] and port == 0 else rng.randint(0, 50)
+        traffic_lines.append(f"（正常）Port{port}: Miss={miss}, Mbps={rng.uniform(1000, 30000):.2f}")
+        if miss > 1000:
+            traffic_lines.append(f"   [告警] Port{port} Miss 超过 1000")
+
+    policy_lines = (["[告警] 检测到规则分配失败:", "    Rule more alloc failed: 12"] if alert['policy']
+                    else ["（正常）规则分配正常"]) + ["", "策略数量统计:", "    Ant 12034", "    IDS 8872"]
+    release_lines = ["   [告警] 当天以下策略文件缺失: snort.evt"] if alert['policy_release'] \
+        else ["（正常）所有类型策略文件正常下发"]
+
+    backfill_status = f"告警 ({backfill:.1f}%)" if alert['backfill'] else 'OK'
+    summary = (f"内存: {status['memory']}, 磁盘: {status['disk']}, 服务状态: {status['services']}, "
+               f"硬件状态: {status['hardware']}, Core文件: {status['core']}, 内存池: {status['mempool']}, "
+               f"回填率: {backfill_status}, 流量情况: {status['traffic']}, 策略加载: {status['policy']}, "
+               f"策略下发: {status['policy_release']}")
+    sections = (('memory', '内存使用', memory_lines), ('disk', '磁盘使用', disk_lines),
+                ('services', '服务状态', service_lines), ('hardware', '硬件错误检查', hardware_lines),
+                ('core', 'Core文件检查', core_lines), ('mempool', 'Updpi内存池检查', mempool_lines),
+                ('backfill', '回填率', backfill_lines), ('traffic', '流量情况', traffic_lines),
+                ('policy', '策略加载信息', policy_lines), ('policy_release', '策略下发检查', release_lines))
+    hostname = f"bench-host-{index}"
+    uptime = f"{rng.randint(1, 50)} weeks, {rng.randint(0, 6)} days"
+
+    if log_format == 'json':
+        from trend import extract_metrics
+
+        text = _json_record({'type': 'header', 'version': 1, 'hostname': hostname,
+                             'check_time': 'Mon Feb 17 17:19:02 CST 2025', 'uptime': uptime})
+        for name, title, lines in sections:
+            body = "\n".join(lines) + "\n"
+            text += _json_record({'type': 'check', 'name': name, 'title': title, 'status': status[name],
+                                  'elapsed_ms': rng.randint(5, 3000), 'commands': rng.randint(1, 40),
+                                  'metrics': extract_metrics({title: body}), 'text': body})
+        text += _json_record({'type': 'summary', 'has_alert': any(alert.values()), 'summary': summary})
+        return ip, text
+
+    text = (f"===== 系统巡检报告 | Mon Feb 17 17:19:02 CST 2025 =====\n"
+            f"主机名: {hostname}\n"
+            f"系统运行时间: {uptime}\n")
+    for _, title, lines in sections:
+        text += _section(title, lines, rng, with_timing)
+    text += f"\n===== 巡检完成 =====\n巡检总结: {summary}\n"
+    return ip, text
+
+def generate_fleet(log_dir, devices, alert_ratio=0.2, section_lines=5, seed=0, with_timing=True,
+                   log_format='text'):
+    """在 log_dir 中生成 devices 台设备的模拟日志，返回文件路径列表"""
+    os.makedirs(log_dir, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for index in range(devices):
+        ip, text = generate_log(index, rng, alert_ratio, section_lines, with_timing, log_format)
+        path = os.path.join(log_dir, f"{ip}_check_20250217.log")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+def measure(func, repeat=1):
+    """测量 func() 的最短耗时，再单独运行一次用 tracemalloc 记录 Python 堆的峰值内存
+
+    返回 (秒, 峰值字节数, 最后一次的返回值)。tracemalloc 会拖慢执行，
+    因此计时和内存分两次测量。
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, value
+
+def run_size(devices, args, work_dir):
+    """生成 devices 台设备的日志并运行各项基准，返回结果记录列表"""
+    from html_generator import HTMLGenerator
+    from log_parser import materialize, parse_check_log
+    from report_builder import build_report
+    from report_server import ReportLibrary
+
+    log_dir = os.path.join(work_dir, f'logs_{devices}')
+    paths = generate_fleet(log_dir, devices, args.alert_ratio, args.section_lines, args.seed,
+                           log_format=args.log_format)
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+
+    parsed = [materialize(parse_check_log(path)) for path in paths]
+    # 设备详情页数量大时只取一部分，按单页耗时折算吞吐量
+    detail_devices = parsed[:min(devices, args.detail_limit)]
+    output_dir = os.path.join(work_dir, f'out_{devices}')
+
+    def end_to_end():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return build_report(log_dir, output_dir=output_dir, jobs=args.jobs)
+
+    def serve_first_page():
+        # 本地报告服务启动后打开索引页和一台设备的页面，解析结果来自 end_to_end 留下的缓存
+        library = ReportLibrary(log_dir, jobs=args.jobs, cache_dir=output_dir)
+        library.refresh(force=True)
+        library.page('index.html')
+        return library.page(f'device_{parsed[0].ip}.html')
+
+    benchmarks = [
+        ('parse_check_log', devices, lambda: [materialize(parse_check_log(path)) for path in paths]),
+        ('generate_device_card', devices,
+         lambda: [HTMLGenerator.generate_device_card(device) for device in parsed]),
+        ('generate_index_page', 1, lambda: HTMLGenerator.generate_index_page(parsed)),
+        ('generate_overview_page', 1, lambda: HTMLGenerator.generate_overview_page(parsed)),
+        ('generate_device_detail_page', len(detail_devices),
+         lambda: [HTMLGenerator.generate_device_detail_page(device) for device in detail_devices]),
+        ('end_to_end', devices, end_to_end),
+        ('serve_first_page', 1, serve_first_page),
+    ]
+
+    records = []
+    for name, items, func in benchmarks:
+        seconds, peak, _ = measure(func, args.repeat)
+        record = {
+            'benchmark': name,
+            'devices': devices,
+            'items': items,
+            'seconds': round(seconds, 6),
+            'items_per_second': round(items / seconds, 1) if seconds else None,
+            'peak_bytes': peak,
+        }
+        if name == 'parse_check_log':
+            record['mb_per_second'] = round(total_bytes / 1024 / 1024 / seconds, 2) if seconds else None
+        records.append(record)
+        print(f"{devices:>6} 台  {name:<28} {seconds:8.3f}s  "
+              f"{record['items_per_second'] or 0:>10.1f}/s  峰值 {peak / 1024 / 1024:7.1f}MB",
+              file=sys.stderr)
+    return records + run_bundles(devices, parsed, output_dir, work_dir, args)
+
+def run_bundles(devices, parsed, output_dir, work_dir, args):
+    """生成 zip 和单文件 HTML 报告，并与 end_to_end 生成的目录对比大小和拷贝耗时
+
+    拷贝到本地另一个目录只能反映文件数带来的开销，拷到网络共享时差距会更大。
+    """
+    import report_bundle
+    from report_cache import CACHE_FILE
+
+    bundle_dir = os.path.join(work_dir, f'bundle_{devices}')
+    os.makedirs(bundle_dir, exist_ok=True)
+    copies = itertools.count()
+
+    def copy_to_share(source):
+        target = os.path.join(work_dir, f'share_{devices}', str(next(copies)))
+        if os.path.isdir(source):
+            shutil.copytree(source, target, ignore=shutil.ignore_patterns(CACHE_FILE))
+        else:
+            os.makedirs(target)
+            shutil.copy(source, target)
+
+    loose_files = loose_bytes = 0
+    for root, _, files in os.walk(output_dir):
+        for file_name in files:
+            if file_name != CACHE_FILE:
+                loose_files += 1
+                loose_bytes += os.path.getsize(os.path.join(root, file_name))
+
+    layouts = [('loose', output_dir, loose_files, loose_bytes)]
+    records = []
+    for bundle in report_bundle.BUNDLE_FORMATS:
+        seconds, peak, path = measure(lambda: report_bundle.write_bundle(bundle, parsed, bundle_dir), args.repeat)
+        size = os.path.getsize(path)
+        layouts.append((bundle, path, 1, size))
+        records.append({'benchmark': f'bundle_{bundle}', 'devices': devices, 'items': devices,
+                        'seconds': round(seconds, 6),
+                        'items_per_second': round(devices / seconds, 1) if seconds else None,
+                        'peak_bytes': peak, 'output_bytes': size})
+        print(f"{devices:>6} 台  {'bundle_' + bundle:<28} {seconds:8.3f}s  "
+              f"{size / 1024 / 1024:8.1f}MB  峰值 {peak / 1024 / 1024:7.1f}MB", file=sys.stderr)
+
+    for layout, source, files, size in layouts:
+        seconds, _, _ = measure(lambda: copy_to_share(source), args.repeat)
+        records.append({'benchmark': f'copy_{layout}', 'devices': devices, 'items': files,
+                        'seconds': round(seconds, 6), 'files': files, 'output_bytes': size})
+        print(f"{devices:>6} 台  {'copy_' + layout:<28} {seconds:8.3f}s  "
+              f"{size / 1024 / 1024:8.1f}MB  {files:>7} 个文件", file=sys.stderr)
+    shutil.rmtree(os.path.join(work_dir, f'share_{devices}'), ignore_errors=True)
+    return records
+
+def run_large_section(args, work_dir):
+    """单台设备的硬件错误、Core 文件分段放大到约 large_section_mb MB，
+    对比整页拼接后写入与边生成边写入的耗时和峰值内存"""
+    from html_generator import HTMLGenerator
+    from log_parser import parse_check_log
+    from report_builder import write_device_page
+
+    # 硬件错误每行约 90 字节，Core 文件每项 4 行约 130 字节，两段合计达到目标大小
+    lines = max(1, int(args.large_section_mb * 1024 * 1024 / 220))
+    rng = random.Random(args.seed)
+    ip, text = generate_log(0, rng, alert_ratio=1.0, section_lines=lines, log_format=args.log_format)
+    log_dir = os.path.join(work_dir, 'logs_large')
+    output_dir = os.path.join(work_dir, 'out_large')
+    os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(log_dir, f"{ip}_check_20250217.log")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    log_bytes = os.path.getsize(path)
+    device = parse_check_log(path)
+
+    def buffered():
+        detail_html = HTMLGenerator.generate_device_detail_page(device)
+        with open(os.path.join(output_dir, f'device_{ip}.html'), 'w', encoding='utf-8') as f:
+            f.write(detail_html)
+
+    records = []
+    for name, func in (('device_detail_buffered', buffered),
+                       ('device_detail_streaming', lambda: write_device_page(device, output_dir, None))):
+        seconds, peak, _ = measure(func, args.repeat)
+        records.append({
+            'benchmark': name,
+            'devices': 1,
+            'items': 1,
+            'seconds': round(seconds, 6),
+            'log_bytes': log_bytes,
+            'peak_bytes': peak,
+        })
+        print(f"{log_bytes / 1024 / 1024:6.1f}MB  {name:<28} {seconds:8.3f}s  "
+              f"峰值 {peak / 1024 / 1024:7.1f}MB", file=sys.stderr)
+    return records
+
+def git_revision():
+    """当前提交的短哈希，不在 git 仓库中时返回 None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current):
+    """按 (基准, 设备数) 对比两次结果的耗时，比值大于 1 表示变慢"""
+    old = {(r['benchmark'], r['devices']): r for r in baseline['results']}
+    print(f"对比基准: {baseline.get('revision') or '?'} -> {current.get('revision') or '?'}")
+    for record in current['results']:
+        before = old.get((record['benchmark'], record['devices']))
+        if not before or not before['seconds']:
+            continue
+        ratio = record['seconds'] / before['seconds']
+        mark = '  变慢' if ratio > 1.1 else ('  变快' if ratio < 0.9 else '')
+        print(f"{record['devices']:>6} 台  {record['benchmark']:<28} "
+              f"{before['seconds']:8.3f}s -> {record['seconds']:8.3f}s  x{ratio:.2f}{mark}")
+
+def run_command(args):
+    sizes = [int(size) for size in args.sizes.split(',')] if args.sizes else DEFAULT_SIZES
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='system_check_bench_')
+    try:
+        results = []
+        for devices in sizes:
+            results += run_size(devices, args, work_dir)
+        if args.large_section_mb:
+            results += run_large_section(args, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    data = {
+        'version': RESULT_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {'sizes': sizes, 'alert_ratio': args.alert_ratio, 'section_lines': args.section_lines,
+                   'seed': args.seed, 'log_format': args.log_format, 'repeat': args.repeat, 'jobs': args.jobs,
+                   'detail_limit': args.detail_limit, 'large_section_mb': args.large_section_mb},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), data)
+    return 0
+
+def generate_command(args):
+    paths = generate_fleet(args.log_dir, args.devices, args.alert_ratio, args.section_lines, args.seed,
+                           with_timing=not args.no_timing, log_format=args.log_format)
+    print(f"已生成 {len(paths)} 个日志文件: {args.log_dir}")
+    return 0
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="报告生成性能基准")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_generator_options(sub):
+        sub.add_argument('--alert-ratio', type=float, default=0.2, help="每个检查项告警的概率，默认 0.2")
+        sub.add_argument('--section-lines', type=int, default=5,
+                         help="硬件错误、Core 文件等可变部分的行数，默认 5")
+        sub.add_argument('--seed', type=int, default=0, help="随机种子，相同种子生成相同日志")
+        sub.add_argument('--log-format', choices=['text', 'json'], default='text',
+                         help="日志格式：文本或 system_check.sh -f json 的 JSON 记录，默认 text")
+
+    run_parser = subparsers.add_parser('run', help="运行基准并保存 JSON 结果")
+    run_parser.add_argument('--sizes', help="设备数列表，逗号分隔，默认 100,1000,10000")
+    run_parser.add_argument('-o', '--output', default='benchmark.json', help="结果文件，默认 benchmark.json")
+    run_parser.add_argument('--compare', metavar='JSON', help="与之前保存的结果对比")
+    run_parser.add_argument('--repeat', type=int, default=1, help="每项重复次数，取最短耗时")
+    run_parser.add_argument('-j', '--jobs', type=int, help="完整报告生成的解析进程数，默认为CPU核数")
+    run_parser.add_argument('--detail-limit', type=int, default=1000,
+                            help="设备详情页基准最多生成的页面数，默认 1000")
+    run_parser.add_argument('--large-section-mb', type=float, default=0,
+                            help="另外生成一台分段正文约为该大小（MB）的设备，对比详情页两种写出方式，默认不运行")
+    run_parser.add_argument('--work-dir', help="保留生成的日志和报告的目录，默认使用临时目录并在结束后删除")
+    add_generator_options(run_parser)
+
+    generate_parser = subparsers.add_parser('generate', help="只生成模拟日志")
+    generate_parser.add_argument('log_dir', help="日志输出目录")
+    generate_parser.add_argument('-n', '--devices', type=int, default=100, help="设备数，默认 100")
+    generate_parser.add_argument('--no-timing', action='store_true', help="不输出 @timing 耗时行（旧版脚本格式）")
+    add_generator_options(generate_parser)
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        return generate_command(args)
+    return run_command(args)
+
+if __name__ == '__main__':
+    # 完整报告生成使用进程池，打包后同样需要 freeze_support
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# 默认通过 ssh 在远端执行，BatchMode 避免在没有密钥时卡在密码提示
+SSH_COMMAND = ['ssh', '-o', 'BatchMode=yes', '-o', 'ConnectTimeout=10']
+# 远端从标准输入读取脚本执行，不需要事先把脚本复制到设备上
+REMOTE_COMMAND = 'bash -s'
+# 同时连接的设备数
+DEFAULT_CONCURRENCY = 32
+# 单台设备一次执行的超时时间（秒）
+HOST_TIMEOUT = 300
+# 失败后的重试次数，第 n 次重试前等待 n * RETRY_DELAY 秒
+HOST_RETRIES = 2
+RETRY_DELAY = 5
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'system_check.sh')
+
+
+class CollectCancelled(Exception):
+    """采集被取消"""
+
+def load_inventory(path):
+    """读取设备清单，返回 [(ip, ssh目标)]
+
+    每行一台设备：`ip [ssh目标]`，ssh目标可以是 user@host 或 ssh 配置中的别名，
+    省略时使用 ip。空行和 # 开头的注释行被忽略，重复的 ip 只保留第一条。
+    """
+    hosts = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split()
+            if len(fields) > 2:
+                raise ValueError(f"设备清单第 {line_no} 行格式错误: {line}")
+            ip = fields[0]
+            if ip in seen:
+                continue
+            seen.add(ip)
+            hosts.append((ip, fields[1] if len(fields) > 1 else ip))
+    return hosts
+
+def log_file_name(ip, date):
+    """与手工收集的日志保持同样的命名，log_parser 从文件名第一个 _ 之前取 IP"""
+    return f'{ip}_check_{date}.log'
+
+def remote_command(script_args=None):
+    """远端执行的命令，script_args 为传给巡检脚本的参数，如 ['-f', 'json']"""
+    if not script_args:
+        return REMOTE_COMMAND
+    return ' '.join([REMOTE_COMMAND, '--'] + [shlex.quote(arg) for arg in script_args])
+
+def collect_host(ip, target, script, output_dir, date, timeout=HOST_TIMEOUT,
+                 retries=HOST_RETRIES, ssh_command=None, cancel=None, script_args=None):
+    """在一台设备上执行巡检脚本，标准输出直接写入日志文件
+
+    输出先写到 .part 临时文件，成功后才改名为正式日志，失败或超时的设备
+    不会留下半截日志被当作巡检结果。返回 (日志路径, 尝试次数, 错误信息)，
+    成功时错误信息为 None。
+    """
+    command = list(ssh_command or SSH_COMMAND) + [target, remote_command(script_args)]
+    log_path = os.path.join(output_dir, log_file_name(ip, date))
+    part_path = log_path + '.part'
+    error = None
+
+    for attempt in range(1, retries + 2):
+        if cancel is not None and cancel.is_set():
+            error = "已取消"
+            break
+        if attempt > 1:
+            time.sleep(RETRY_DELAY * (attempt - 1))
+        with open(script, 'rb') as stdin, open(part_path, 'wb') as stdout:
+            try:
+                # 单独的进程组，超时时连同 ssh 派生的子进程一起结束
+                proc = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE,
+                                        start_new_session=os.name != 'nt')
+            except OSError as e:
+                # ssh 命令不存在之类的问题重试也无济于事
+                error = f"{type(e).__name__}: {e}"
+                break
+            try:
+                _, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                if os.name == 'nt':
+                    proc.kill()
+                else:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                proc.communicate()
+                error = f"执行超时（{timeout}秒）"
+                continue
+        if proc.returncode == 0:
+            os.replace(part_path, log_path)
+            return log_path, attempt, None
+        message = stderr.decode('utf-8', errors='replace').strip().splitlines()
+        error = f"退出码 {proc.returncode}" + (f": {message[-1]}" if message else "")
+
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    return None, attempt, error
+
+def collect_fleet(hosts, output_dir, script=DEFAULT_SCRIPT, concurrency=DEFAULT_CONCURRENCY,
+                  timeout=HOST_TIMEOUT, retries=HOST_RETRIES, ssh_command=None,
+                  progress=None, cancel=None, date=None, script_args=None):
+    """并发在多台设备上执行巡检脚本，日志写入 output_dir
+
+    hosts 为 load_inventory 返回的 [(ip, ssh目标)]，同时最多保持 concurrency 个连接。
+    progress(done, total, ip, error) 在每台设备完成（含重试）时调用。
+    ssh_command 为替代 ssh 的命令列表，调用时在末尾追加目标和远端命令，
+    可以换成本地模拟命令测试。script_args 为传给巡检脚本的参数，
+    如 ['-f', 'json'] 让设备输出 JSON 记录。返回 (成功的日志路径, [(ip, 错误信息)])，
+    均按 hosts 顺序排列。
+    """
+    if not os.path.isfile(script):
+        raise FileNotFoundError(f"巡检脚本不存在: {script}")
+    os.makedirs(output_dir, exist_ok=True)
+    date = date or time.strftime('%Y%m%d')
+    total = len(hosts)
+    outcomes = [None] * total
+    cancel = cancel if cancel is not None else threading.Event()
+
+    # 每个连接在等待远端输出时几乎不占 CPU，用线程池即可维持大量并发连接
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, total))) as executor:
+        futures = {
+            executor.submit(collect_host, ip, target, script, output_dir, date,
+                            timeout, retries, ssh_command, cancel, script_args): i
+            for i, (ip, target) in enumerate(hosts)
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                outcomes[i] = future.result()
+                if progress:
+                    progress(done, total, hosts[i][0], outcomes[i][2])
+        except BaseException:
+            # Ctrl+C 等情况下不再启动新的连接，正在执行的设备在当前尝试结束后退出
+            cancel.set()
+            for pending in futures:
+                pending.cancel()
+            raise
+
+    logs = []
+    errors = []
+    for (ip, _), (log_path, _, error) in zip(hosts, outcomes):
+        if error is None:
+            logs.append(log_path)
+        else:
+            errors.append((ip, error))
+    if cancel.is_set():
+        raise CollectCancelled()
+    return logs, errors
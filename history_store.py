@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+# 存储格式版本，格式变化时递增，旧版本的分段只读不写
+SCHEMA_VERSION = 1
+HISTORY_DIR = 'system_check_history'
+META_FILE = 'meta.json'
+# 单个分段最多的行数，约为每分钟采集 70 天
+MAX_SEGMENT_ROWS = 100000
+# 单个分段覆盖的最长天数，超过后开始新的分段
+SEGMENT_DAYS = 30
+# 保留最近多少天的分段，更早的整段删除
+RETENTION_DAYS = 366
+
+# 服务状态编码，未列出的状态记为 unknown
+SERVICE_STATES = ['unknown', 'active', 'inactive', 'failed', 'activating', 'deactivating', 'reloading']
+STATE_CODES = {state: code for code, state in enumerate(SERVICE_STATES)}
+
+# 固定列：(列名, array 类型码)。时间为 Unix 时间戳，运行时间单位为秒，-1 表示未知
+BASE_COLUMNS = [('memory', 'f'), ('disk', 'f'), ('uptime', 'i')]
+TIME_COLUMN = ('time', 'd')
+
+# 常驻采样（agent 子命令）按窗口汇总的分段，meta 中 kind 为 window，时间列为窗口开始时间。
+# samples 为窗口内的采样次数，cost_* 为单次采样耗时（毫秒）
+AGGREGATES = ('min', 'max', 'mean', 'p95')
+WINDOW_COLUMNS = ([(f'{metric}_{aggregate}', 'f') for metric in ('memory', 'disk') for aggregate in AGGREGATES]
+                  + [('uptime', 'i'), ('samples', 'I'), ('cost_mean', 'f'), ('cost_max', 'f')])
+
+
+def service_columns(count):
+    """每个服务两列：状态编码和运行秒数"""
+    columns = []
+    for i in range(count):
+        columns += [(f'service{i}_state', 'B'), (f'service{i}_running', 'i')]
+    return columns
+
+def segment_columns(meta):
+    """分段的全部列，时间列放在最后，追加时最后写入"""
+    base = WINDOW_COLUMNS if meta.get('kind') == 'window' else BASE_COLUMNS
+    return base + service_columns(len(meta['services'])) + [TIME_COLUMN]
+
+def parse_running_time(text):
+    """把 str(timedelta) 形式的运行时间（如 '3 days, 4:05:06'）转换为秒，无法识别时返回 -1"""
+    days = 0
+    if ', ' in text:
+        day_text, text = text.split(', ', 1)
+        try:
+            days = int(day_text.split()[0])
+        except ValueError:
+            return -1
+    try:
+        hours, minutes, seconds = (int(part) for part in text.split(':'))
+    except ValueError:
+        return -1
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+def format_running_time(seconds, state):
+    """与采集时的显示保持一致：运行中显示时长，其余显示状态说明"""
+    if seconds >= 0:
+        days, rest = divmod(seconds, 86400)
+        clock = f"{rest // 3600}:{rest % 3600 // 60:02d}:{rest % 60:02d}"
+        if days:
+            return f"{days} day{'s' if days > 1 else ''}, {clock}"
+        return clock
+    if state == 'active':
+        return "运行中"
+    return "未知" if state == 'unknown' else "未运行"
+
+def format_uptime(seconds):
+    """与 system_check.get_uptime 相同的系统运行时间格式"""
+    if seconds < 0:
+        return "Unknown"
+    return time.strftime('%d天%H小时%M分钟', time.gmtime(seconds))
+
+class Segment:
+    """一个分段的元信息和按时间范围截取的各列数据"""
+
+    __slots__ = ('path', 'meta', 'columns')
+
+    def __init__(self, path, meta, columns):
+        self.path = path
+        self.meta = meta
+        self.columns = columns  # {列名: array}
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+class HistoryStore:
+    """定时采集结果的分段列式存储
+
+    每个分段是一个目录：meta.json 记录格式版本、主机名、系统版本、服务列表和阈值
+    （窗口汇总的分段还有 kind、采样间隔和窗口长度），
+    每列一个只追加的二进制文件，内容即 array 的原始字节。服务列表、主机信息或阈值变化、
+    行数或时间跨度超过上限时开始新的分段，因此同一分段内各行的列含义始终一致。
+    读取时每列一次 frombytes，几个月的每分钟样本也只需要毫秒级时间。
+    """
+
+    def __init__(self, directory=HISTORY_DIR, max_rows=MAX_SEGMENT_ROWS,
+                 segment_days=SEGMENT_DAYS, retention_days=RETENTION_DAYS):
+        self.directory = directory
+        self.max_rows = max_rows
+        self.segment_days = segment_days
+        self.retention_days = retention_days
+
+    def segment_paths(self):
+        """按时间顺序列出分段目录"""
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(os.listdir(self.directory))
+                if name.startswith('seg-')]
+
+    @staticmethod
+    def read_meta(path):
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _row_count(path):
+        return os.path.getsize(os.path.join(path, TIME_COLUMN[0])) // array(TIME_COLUMN[1]).itemsize
+
+    @staticmethod
+    def _last_time(path, rows):
+        if not rows:
+            return None
+        values = array(TIME_COLUMN[1])
+        with open(os.path.join(path, TIME_COLUMN[0]), 'rb') as f:
+            f.seek((rows - 1) * values.itemsize)
+            values.frombytes(f.read(values.itemsize))
+        return values[0]
+
+    def _new_segment(self, sample_time, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        name = 'seg-' + time.strftime('%Y%m%d%H%M%S', time.localtime(sample_time))
+        path = os.path.join(self.directory, name)
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f'{name}-{suffix}')
+            suffix += 1
+        os.makedirs(path)
+        for column, _ in segment_columns(meta):
+            open(os.path.join(path, column), 'wb').close()
+        # meta.json 最后写入，没有它的目录视为未完成的分段
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(dict(meta, created=sample_time), f, ensure_ascii=False)
+        self._expire(sample_time)
+        return path
+
+    def _expire(self, now):
+        """删除最后一行早于保留期限的分段"""
+        if not self.retention_days:
+            return
+        cutoff = now - self.retention_days * 86400
+        for path in self.segment_paths()[:-1]:
+            try:
+                last = self._last_time(path, self._row_count(path))
+            except OSError:
+                continue
+            if last is not None and last < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _current_segment(self, sample_time, meta):
+        """返回可以追加该样本的分段路径和已有行数，需要时新建分段"""
+        for path in reversed(self.segment_paths()):
+            try:
+                current = self.read_meta(path)
+            except (OSError, ValueError):
+                continue  # 未完成的分段
+            rows = self._row_count(path)
+            last = self._last_time(path, rows)
+            if (current.get('version') != SCHEMA_VERSION
+                    or {key: current.get(key) for key in meta} != meta
+                    or current.get('kind') != meta.get('kind')
+                    or rows >= self.max_rows
+                    or sample_time - current['created'] >= self.segment_days * 86400
+                    or (last is not None and sample_time < last)):
+                break
+            return path, rows
+        return self._new_segment(sample_time, meta), 0
+
+    @staticmethod
+    def _sample_meta(sample):
+        return {
+            'version': SCHEMA_VERSION,
+            'byteorder': sys.byteorder,
+            'hostname': sample['hostname'],
+            'system_version': sample['system_version'],
+            'services': [name for name, _, _ in sample['services']],
+            'thresholds': sample['thresholds'],
+        }
+
+    @staticmethod
+    def _sample_values(sample):
+        values = {'uptime': -1 if sample['uptime'] is None else int(sample['uptime']),
+                  'time': sample['time']}
+        for i, (_, state, running_time) in enumerate(sample['services']):
+            values[f'service{i}_state'] = STATE_CODES.get(state, 0)
+            values[f'service{i}_running'] = parse_running_time(running_time) if state == 'active' else -1
+        return values
+
+    def append(self, sample):
+        """追加一个样本
+
+        sample 包含 time、hostname、system_version、memory、disk、uptime、
+        services（[(服务名, 状态, 运行时间文本)]）和 thresholds（{'memory': 阈值, 'disk': 阈值}）。
+        """
+        values = self._sample_values(sample)
+        values.update(memory=sample['memory'], disk=sample['disk'])
+        self._append_row(self._sample_meta(sample), values)
+
+    def append_window(self, summary):
+        """追加一个窗口的汇总
+
+        summary 在 append 的样本格式基础上，memory/disk 为 (最小值, 最大值, 平均值, P95)，
+        另有 interval、window（采样间隔和窗口长度，秒）、samples、cost_mean 和 cost_max；
+        time 为窗口开始时间，services 中的状态为窗口内最差的状态。
+        采样间隔或窗口长度变化时开始新的分段。
+        """
+        meta = self._sample_meta(summary)
+        meta.update(kind='window', interval=summary['interval'], window=summary['window'])
+        values = self._sample_values(summary)
+        for metric in ('memory', 'disk'):
+            for aggregate, value in zip(AGGREGATES, summary[metric]):
+                values[f'{metric}_{aggregate}'] = value
+        values.update(samples=summary['samples'], cost_mean=summary['cost_mean'],
+                      cost_max=summary['cost_max'])
+        self._append_row(meta, values)
+
+    def _append_row(self, meta, values):
+        path, rows = self._current_segment(values['time'], meta)
+        for column, typecode in segment_columns(meta):
+            data = array(typecode, [values[column]])
+            with open(os.path.join(path, column), 'ab') as f:
+                # 上次追加中途失败时，其他列可能比时间列多出半行，先截断对齐
+                if f.tell() > rows * data.itemsize:
+                    f.truncate(rows * data.itemsize)
+                f.write(data.tobytes())
+
+    def load(self, since=None, until=None):
+        """读取 [since, until) 时间范围内的样本，返回 Segment 列表
+
+        since/until 为 Unix 时间戳，为 None 时不限制。
+        """
+        segments = []
+        for path in self.segment_paths():
+            try:
+                meta = self.read_meta(path)
+            except (OSError, ValueError):
+                continue
+            if meta.get('version') != SCHEMA_VERSION:
+                continue
+            # 以时间列的行数为准，追加中途失败时其他列多出的半行不读取
+            rows = self._row_count(path)
+            columns = {}
+            for column, typecode in segment_columns(meta):
+                values = array(typecode)
+                with open(os.path.join(path, column), 'rb') as f:
+                    values.frombytes(f.read(rows * values.itemsize))
+                if meta.get('byteorder', sys.byteorder) != sys.byteorder:
+                    values.byteswap()
+                columns[column] = values
+            times = columns['time']
+            start = bisect_left(times, since) if since is not None else 0
+            end = bisect_left(times, until) if until is not None else len(times)
+            if start >= end:
+                continue
+            segments.append(Segment(path, meta, {column: values[start:end] for column, values in columns.items()}))
+        return segments
+
+    def export_csv(self, csv_path, since=None, until=None):
+        """按原采集报告的列导出 GBK 编码的 CSV，便于用 Excel 打开，返回导出行数
+
+        不同分段的服务列表不同时，表头取所有服务的并集，缺少的列留空。
+        窗口汇总的行以平均值作为使用率，峰值超过阈值即标为告警，并附加最低、最高、P95、
+        采样次数和采样耗时列。
+        """
+        import csv
+
+        segments = self.load(since, until)
+        fieldnames = ['检查时间', '主机名', '系统版本', '内存使用率', '内存状态',
+                      '磁盘使用率', '磁盘状态', '系统运行时间']
+        if any(segment.meta.get('kind') == 'window' for segment in segments):
+            fieldnames += [label + suffix for label in ('内存', '磁盘') for suffix in ('最低', '最高', 'P95')]
+            fieldnames += ['采样次数', '采样耗时均值(ms)', '采样耗时最大(ms)']
+        for segment in segments:
+            for service in segment.meta['services']:
+                for suffix in ('_状态', '_运行时间', '_告警'):
+                    if service + suffix not in fieldnames:
+                        fieldnames.append(service + suffix)
+
+        count = 0
+        with open(csv_path, 'w', newline='', encoding='gbk', errors='replace') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=',', quoting=csv.QUOTE_ALL,
+                                    restval='')
+            writer.writeheader()
+            for segment in segments:
+                meta = segment.meta
+                columns = segment.columns
+                is_window = meta.get('kind') == 'window'
+                for i in range(len(segment)):
+                    if is_window:
+                        memory, memory_peak = columns['memory_mean'][i], columns['memory_max'][i]
+                        disk, disk_peak = columns['disk_mean'][i], columns['disk_max'][i]
+                    else:
+                        memory = memory_peak = columns['memory'][i]
+                        disk = disk_peak = columns['disk'][i]
+                    row = {
+                        '检查时间': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(columns['time'][i])),
+                        '主机名': meta['hostname'],
+                        '系统版本': meta['system_version'],
+                        '内存使用率': "{:.1f}%".format(memory),
+                        '内存状态': "告警" if memory_peak > meta['thresholds']['memory'] else "正常",
+                        '磁盘使用率': "{:.1f}%".format(disk),
+                        '磁盘状态': "告警" if disk_peak > meta['thresholds']['disk'] else "正常",
+                        '系统运行时间': format_uptime(columns['uptime'][i]),
+                    }
+                    if is_window:
+                        for metric, label in (('memory', '内存'), ('disk', '磁盘')):
+                            for aggregate, suffix in (('min', '最低'), ('max', '最高'), ('p95', 'P95')):
+                                row[label + suffix] = "{:.1f}%".format(columns[f'{metric}_{aggregate}'][i])
+                        row['采样次数'] = columns['samples'][i]
+                        row['采样耗时均值(ms)'] = "{:.2f}".format(columns['cost_mean'][i])
+                        row['采样耗时最大(ms)'] = "{:.2f}".format(columns['cost_max'][i])
+                    for j, service in enumerate(meta['services']):
+                        state = SERVICE_STATES[columns[f'service{j}_state'][i]]
+                        row[service + '_状态'] = state
+                        row[service + '_运行时间'] = format_running_time(columns[f'service{j}_running'][i], state)
+                        row[service + '_告警'] = "告警" if state != "active" else "正常"
+                    writer.writerow(row)
+                    count += 1
+        return count
@@ -1,98 +1,50 @@
-class HTMLGenerator:
-    @staticmethod
-    def generate_device_card(device):
-        """生成设备卡片HTML"""
-        summary_items = device['summary'].split(', ')
-        summary_links = []
-      
-        section_mapping = {
-            '内存': '内存使用',
-            '磁盘': '磁盘使用',
-            '服务状态': '服务状态',
-            '硬件状态': '硬件错误检查',
-            'Core文件': 'Core文件检查',
-            '内存池': 'Updpi内存池检查',
-            '回填率': '回填率',
-            '流量情况': '流量情况',
-            '策略加载': '策略加载信息',
-            '策略下发': '策略下发检查'
-        }
-      
-        for item in summary_items:
-            if ': ' in item:
-                name, status = item.split(': ')
-                section_name = section_mapping.get(name, name)
-                if '告警' in status:
-                    color = '#FF4444'  # 红色
-                elif 'OK' in status.upper():
-                    color = '#4CAF50'  # 绿色
-                else:
-                    color = '#000000'  # 黑色
-              
-                summary_links.append(
-                    f'<span style="margin-right: 15px;"><a href="device_{device["ip"]}.html?section={section_name}" '
-                    f'style="color: {color};">{name}: {status}</a></span>'
-                )
-      
-        return f'''
-            <div class="device-card">
-                <h3>IP: {device['ip']}</h3>
-                <p>主机名: {device['hostname']}</p>
-                <p style="display: flex; flex-wrap: wrap;">{"".join(summary_links)}</p>
-                <p><a href="device_{device['ip']}.html?show=all" class="view-report">查看完整报告</a></p>
-                <hr>
-            </div>
-        '''
+import hashlib
+import html
+import io
+import json
+import os
 
-    @staticmethod
-    def generate_index_page(check_results):
-        """生成索引页面"""
-        devices_html = ''.join(HTMLGenerator.generate_device_card(device) for device in check_results)
-        
-        # 获取当前日期
-        from datetime import datetime
-        current_date = datetime.now().strftime('%Y-%m-%d')
-      
-        return f'''<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<title>系统巡检报告 - {current_date}</title>
-<style>
-body {{
+from log_parser import SECTION_CHUNK_SIZE, iter_section
+# SECTION_MAPPING 原先定义在本模块中，保留导入以兼容从这里引用它的代码
+from report_model import (SEVERITY_ALERT, SECTION_MAPPING, build_status_index, check_name, section_name,
+                          status_severity)
+
+# 索引页样式
+INDEX_CSS = '''
+body {
     font-family: Arial, sans-serif;
     margin: 20px;
     background-color: #f5f5f5;
-}}
-h1 {{
+}
+h1 {
     color: #333;
     text-align: center;
     margin-bottom: 30px;
-}}
-.device-list {{
+}
+.device-list {
     max-width: 1200px;
     margin: 0 auto;
     background-color: white;
     padding: 20px;
     border-radius: 5px;
     box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-}}
-.device-card {{
+}
+.device-card {
     padding: 15px;
     margin-bottom: 20px;
     border-radius: 5px;
-}}
-.device-card:hover {{
+}
+.device-card:hover {
     background-color: #f8f8f8;
-}}
-.device-card h3 {{
+}
+.device-card h3 {
     margin: 0 0 10px 0;
     color: #333;
-}}
-.device-card p {{
+}
+.device-card p {
     margin: 5px 0;
-}}
-.view-report {{
+}
+.view-report {
     display: inline-block;
     margin-top: 10px;
     padding: 5px 15px;
@@ -100,155 +52,56 @@ h1 {{
     color: white;
     text-decoration: none;
     border-radius: 3px;
-}}
-.view-report:hover {{
+}
+.view-report:hover {
     background-color: #45a049;
-}}
-hr {{
+}
+hr {
     border: none;
     border-top: 1px solid #eee;
     margin: 15px 0;
-}}
-a {{
+}
+a {
     text-decoration: none;
-}}
-</style>
-</head>
-<body>
-<h1>系统巡检报告 - {current_date}</h1>
-<div class="device-list">
-{devices_html}
-</div>
-</body>
-</html>'''
-
-    @staticmethod
-    def format_service_status(content):
-        """保持原始格式显示服务状态"""
-        # 将内容按行分割
-        lines = content.strip().split('\n')
-      
-        # 创建一个带有等宽字体的预格式化文本块
-        formatted_content = f'''
-        <pre style="font-family: 'Courier New', Courier, monospace; 
-                    white-space: pre; 
-                    font-size: 14px;
-                    line-height: 1.5;
-                    padding: 15px;
-                    background-color: white;
-                    border-radius: 4px;
-                    overflow-x: auto;">
-{content}
-</pre>
-        '''
-      
-        return formatted_content
+}
+.trend-warning {
+    color: #FF9800;
+}
+.timing-summary {
+    max-width: 1200px;
+    margin: 0 auto 20px auto;
+    background-color: white;
+    padding: 10px 20px;
+    border-radius: 5px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+}
+.timing-summary summary {
+    cursor: pointer;
+    font-weight: bold;
+}
+.timing-table {
+    border-collapse: collapse;
+    margin: 10px 0;
+}
+.timing-table th, .timing-table td {
+    padding: 4px 12px;
+    border-bottom: 1px solid #eee;
+    text-align: left;
+}
+.timing-table td.num {
+    text-align: right;
+}
+'''
 
-    @staticmethod
-    def generate_device_detail_page(device):
-        """生成单个设备的详细信息页面"""
-        sections_html = ''
-        summary_items = device['summary'].split(', ')
-        formatted_summary = []
-      
-        # 统一的部分名称映射
-        section_mapping = {
-            '内存': '内存使用',
-            '磁盘': '磁盘使用',
-            '服务状态': '服务状态',
-            '硬件状态': '硬件错误检查',
-            'Core文件': 'Core文件检查',
-            '内存池': 'Updpi内存池检查',
-            '回填率': '回填率',
-            '流量情况': '流量情况',
-            '策略加载': '策略加载信息',
-            '策略下发': '策略下发检查'
-        }
-      
-        # 记录告警部分
-        warning_sections = set()
-        for item in summary_items:
-            if ': ' in item:
-                name, status = item.split(': ')
-                section_name = section_mapping.get(name, name)
-                if '告警' in status:
-                    warning_sections.add(section_name)
-                
-                # 设置颜色
-                if '告警' in status:
-                    color = '#FF4444'  # 红色
-                elif 'OK' in status.upper():
-                    color = '#4CAF50'  # 绿色
-                else:
-                    color = '#000000'  # 黑色
-                
-                # 添加可点击的链接，直接使用section_name作为锚点
-                formatted_summary.append(
-                    f'<a href="javascript:void(0)" onclick="showSection(\'{section_name}\')" '
-                    f'style="margin-right: 15px; text-decoration: none; color: {color};">{name}: {status}</a>'
-                )
-      
-        # 生成每个部分的HTML
-        for name, content in device['sections'].items():
-            # 使用映射后的名称作为ID
-            section_id = name
-            display_name = name
-            
-            # 检查是否需要映射回原始名称
-            for orig_name, mapped_name in section_mapping.items():
-                if mapped_name == name:
-                    section_id = mapped_name
-                    display_name = orig_name
-                    break
-            
-            has_warning = section_id in warning_sections or '[告警]' in content
-          
-            if has_warning:
-                header_style = 'background-color: #FF4444; color: white;'
-                content_style = 'background-color: #FFEBEE;'
-            else:
-                header_style = 'background-color: #f0f0f0;'
-                content_style = ''
-          
-            formatted_content = content
-            if '[告警]' in content:
-                formatted_content = content.replace('[告警]', '<span style="color: #FF4444; font-weight: bold;">[告警]</span>')
-          
-            # 对服务状态部分进行特殊处理
-            if name == '服务状态':
-                formatted_content = HTMLGenerator.format_service_status(formatted_content)
-            else:
-                formatted_content = f'<pre style="margin: 10px; padding: 10px; font-family: monospace; white-space: pre-wrap;">{formatted_content}</pre>'
-          
-            sections_html += f'''
-                <div class="section" id="section_{section_id}">
-                    <h3 onclick="toggleSection('{section_id}')" style="cursor: pointer; padding: 10px; {header_style}">
-                        ▶ {display_name}
-                    </h3>
-                    <div id="content_{section_id}" style="display: none; {content_style}">
-                        {formatted_content}
-                    </div>
-                </div>
-                <hr>
-            '''
-        
-        # 获取当前日期
-        from datetime import datetime
-        current_date = datetime.now().strftime('%Y-%m-%d')
-      
-        return f'''<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<title>设备 {device['ip']} 巡检报告 - {current_date}</title>
-<style>
-body {{
+# 设备详情页样式
+DEVICE_CSS = '''
+body {
     font-family: Arial, sans-serif;
     margin: 20px;
     background-color: #f5f5f5;
     padding-top: 150px; /* 增加顶部内边距，为固定头部留出更多空间 */
-}}
-.header-fixed {{
+}
+.header-fixed {
     position: fixed;
     top: 0;
     left: 0;
@@ -257,33 +110,33 @@ body {{
     padding: 15px 20px;
     box-shadow: 0 2px 5px rgba(0,0,0,0.1);
     z-index: 1000;
-}}
-.content-container {{
+}
+.content-container {
     margin-top: 20px; /* 为内容添加额外的顶部边距 */
-}}
-.summary-link {{
+}
+.summary-link {
     display: inline-block;
     margin: 5px 10px;
     padding: 3px 8px;
     border-radius: 3px;
     cursor: pointer;
-}}
-.summary-link:hover {{
+}
+.summary-link:hover {
     background-color: #f0f0f0;
-}}
-.warning {{
+}
+.warning {
     color: #FF4444;
-}}
-.ok {{
+}
+.ok {
     color: #4CAF50;
-}}
-.back-link {{
+}
+.back-link {
     margin-right: 20px;
-}}
-.control-buttons {{
+}
+.control-buttons {
     margin-top: 10px;
-}}
-.control-button {{
+}
+.control-button {
     padding: 5px 10px;
     margin-right: 10px;
     border: none;
@@ -291,40 +144,54 @@ body {{
     background-color: #4CAF50;
     color: white;
     cursor: pointer;
-}}
-.control-button:hover {{
+}
+.control-button:hover {
     background-color: #45a049;
-}}
-</style>
-<script>
-function toggleSection(id) {{
+}
+.timing-table {
+    border-collapse: collapse;
+    margin: 10px 0;
+}
+.timing-table th, .timing-table td {
+    padding: 4px 12px;
+    border-bottom: 1px solid #eee;
+    text-align: left;
+}
+.timing-table td.num {
+    text-align: right;
+}
+'''
+
+# 设备详情页脚本：展开/折叠和定位到指定部分
+DEVICE_JS = '''
+function toggleSection(id) {
     var content = document.getElementById('content_' + id);
     var header = document.querySelector('#section_' + id + ' h3');
-    if (content.style.display === 'none') {{
+    if (content.style.display === 'none') {
         content.style.display = 'block';
         header.innerHTML = header.innerHTML.replace('▶', '▼');
-    }} else {{
+    } else {
         content.style.display = 'none';
         header.innerHTML = header.innerHTML.replace('▼', '▶');
-    }}
-}}
+    }
+}
 
-function showSection(id) {{
+function showSection(id) {
     var allContents = document.querySelectorAll('[id^="content_"]');
     var allHeaders = document.querySelectorAll('.section h3');
     
-    allContents.forEach(function(content) {{
+    allContents.forEach(function(content) {
         content.style.display = 'none';
-    }});
+    });
     
-    allHeaders.forEach(function(header) {{
+    allHeaders.forEach(function(header) {
         header.innerHTML = header.innerHTML.replace('▼', '▶');
-    }});
+    });
     
     var content = document.getElementById('content_' + id);
     var header = document.querySelector('#section_' + id + ' h3');
     
-    if (content && header) {{
+    if (content && header) {
         content.style.display = 'block';
         header.innerHTML = header.innerHTML.replace('▶', '▼');
         
@@ -334,49 +201,1049 @@ function showSection(id) {{
         var scrollPosition = window.pageYOffset + sectionTop - headerHeight - 30; // 增加额外的偏移量
         var scrollPosition = window.pageYOffset + sectionTop - headerHeight - 20;
         
-        window.scrollTo({{
+        window.scrollTo({
             top: scrollPosition,
             behavior: 'smooth'
-        }});
-    }}
-}}
+        });
+    }
+}
 
-function toggleAll(show) {{
+function toggleAll(show) {
     var allContents = document.querySelectorAll('[id^="content_"]');
     var allHeaders = document.querySelectorAll('.section h3');
     
-    allContents.forEach(function(content) {{
+    allContents.forEach(function(content) {
         content.style.display = show ? 'block' : 'none';
-    }});
+    });
     
-    allHeaders.forEach(function(header) {{
-        if (show) {{
+    allHeaders.forEach(function(header) {
+        if (show) {
             header.innerHTML = header.innerHTML.replace('▶', '▼');
-        }} else {{
+        } else {
             header.innerHTML = header.innerHTML.replace('▼', '▶');
-        }}
-    }});
-}}
+        }
+    });
+}
 
-window.onload = function() {{
+window.onload = function() {
     var urlParams = new URLSearchParams(window.location.search);
     var showAll = urlParams.get('show') === 'all';
     var targetSection = urlParams.get('section');
   
-    if (showAll) {{
+    if (showAll) {
         toggleAll(true);
-    }} else if (targetSection) {{
+    } else if (targetSection) {
         showSection(targetSection);
-    }}
-}}
-</script>
+    }
+}
+'''
+
+# 虚拟滚动索引页样式
+VIRTUAL_CSS = '''
+body {
+    font-family: Arial, sans-serif;
+    margin: 20px;
+    background-color: #f5f5f5;
+}
+h1 {
+    color: #333;
+    text-align: center;
+    margin-bottom: 30px;
+}
+.device-list {
+    max-width: 1200px;
+    margin: 0 auto;
+    background-color: white;
+    padding: 20px;
+    border-radius: 5px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+}
+.toolbar {
+    display: flex;
+    align-items: center;
+    gap: 10px;
+    margin-bottom: 15px;
+}
+.toolbar input {
+    flex: 1;
+    padding: 6px 10px;
+    border: 1px solid #ccc;
+    border-radius: 3px;
+}
+.toolbar select {
+    padding: 6px;
+}
+.device-count {
+    color: #666;
+}
+.device-header, .device-row {
+    display: flex;
+    align-items: center;
+    height: 40px;
+    box-sizing: border-box;
+    border-bottom: 1px solid #eee;
+}
+.device-header {
+    font-weight: bold;
+    border-bottom: 2px solid #ddd;
+}
+.device-header .sortable {
+    cursor: pointer;
+}
+.device-header .sortable:hover {
+    color: #4CAF50;
+}
+.col-ip {
+    width: 140px;
+    flex-shrink: 0;
+}
+.col-host {
+    width: 200px;
+    flex-shrink: 0;
+    overflow: hidden;
+    text-overflow: ellipsis;
+    white-space: nowrap;
+}
+.col-alerts {
+    width: 70px;
+    flex-shrink: 0;
+    text-align: center;
+}
+.col-checks {
+    flex: 1;
+    overflow: hidden;
+    white-space: nowrap;
+}
+.device-row:hover {
+    background-color: #f8f8f8;
+}
+#device-scroller {
+    position: relative;
+    height: calc(100vh - 230px);
+    min-height: 300px;
+    overflow-y: auto;
+}
+#device-rows {
+    position: absolute;
+    top: 0;
+    left: 0;
+    right: 0;
+}
+.chip {
+    margin-right: 10px;
+    color: #000000;
+}
+.chip.ok {
+    color: #4CAF50;
+}
+.chip.warn {
+    color: #FF4444;
+    font-weight: bold;
+}
+.chip.trend {
+    color: #FF9800;
+}
+a {
+    text-decoration: none;
+}
+.timing-summary {
+    max-width: 1200px;
+    margin: 0 auto 20px auto;
+    background-color: white;
+    padding: 10px 20px;
+    border-radius: 5px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+}
+.timing-summary summary {
+    cursor: pointer;
+    font-weight: bold;
+}
+.timing-table {
+    border-collapse: collapse;
+    margin: 10px 0;
+}
+.timing-table th, .timing-table td {
+    padding: 4px 12px;
+    border-bottom: 1px solid #eee;
+    text-align: left;
+}
+.timing-table td.num {
+    text-align: right;
+}
+'''
+
+# 虚拟滚动索引页脚本：读取内嵌的 JSON 数据，只渲染可见范围内的行，支持排序和筛选
+VIRTUAL_JS = '''
+(function () {
+    var ROW_HEIGHT = 40;
+    var OVERSCAN = 10;
+    var data = JSON.parse(document.getElementById('device-data').textContent);
+    var checks = data.checks;
+    var sections = data.sections;
+    var statuses = data.statuses;
+    var devices = data.devices;  // [ip, 主机名, 告警数, [检查项序号, 状态序号, ...], [趋势预警, ...]]
+    var view = devices;
+    var sortKey = null;
+    var sortDir = 1;
+    var scheduled = false;
+
+    var scroller = document.getElementById('device-scroller');
+    var spacer = document.getElementById('device-spacer');
+    var rows = document.getElementById('device-rows');
+    var counter = document.getElementById('device-count');
+    var filterInput = document.getElementById('device-filter');
+    var statusSelect = document.getElementById('status-filter');
+
+    function esc(text) {
+        return String(text).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+
+    function ipKey(ip) {
+        return ip.split('.').map(function (part) { return ('000' + part).slice(-3); }).join('.');
+    }
+
+    var sortValues = {
+        ip: function (d) { return ipKey(d[0]); },
+        hostname: function (d) { return d[1].toLowerCase(); },
+        alerts: function (d) { return d[2]; }
+    };
+
+    function rowHtml(d) {
+        var page = 'device_' + encodeURIComponent(d[0]) + '.html';
+        var chips = [];
+        for (var i = 0; i < d[3].length; i += 2) {
+            var status = statuses[d[3][i + 1]];
+            var cls = status[1] === 2 ? 'chip warn' : (status[1] === 1 ? 'chip ok' : 'chip');
+            chips.push('<a class="' + cls + '" href="' + page + '?section=' +
+                       encodeURIComponent(sections[d[3][i]]) + '" title="' + esc(status[0]) + '">' +
+                       esc(checks[d[3][i]]) + ': ' + esc(status[0]) + '</a>');
+        }
+        if (d[4].length) {
+            chips.push('<span class="chip trend" title="' + esc(d[4].join('\\n')) + '">趋势预警(' +
+                       d[4].length + ')</span>');
+        }
+        return '<div class="device-row">' +
+               '<span class="col-ip"><a href="' + page + '?show=all">' + esc(d[0]) + '</a></span>' +
+               '<span class="col-host" title="' + esc(d[1]) + '">' + esc(d[1]) + '</span>' +
+               '<span class="col-alerts">' + d[2] + '</span>' +
+               '<span class="col-checks">' + chips.join('') + '</span></div>';
+    }
+
+    function render() {
+        scheduled = false;
+        var top = scroller.scrollTop;
+        var first = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+        var last = Math.min(view.length, Math.ceil((top + scroller.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        var html = [];
+        for (var i = first; i < last; i++) {
+            html.push(rowHtml(view[i]));
+        }
+        rows.style.transform = 'translateY(' + (first * ROW_HEIGHT) + 'px)';
+        rows.innerHTML = html.join('');
+    }
+
+    function scheduleRender() {
+        if (!scheduled) {
+            scheduled = true;
+            window.requestAnimationFrame(render);
+        }
+    }
+
+    function update() {
+        var query = filterInput.value.trim().toLowerCase();
+        var status = statusSelect.value;
+        view = devices.filter(function (d) {
+            if (status === 'alert' && d[2] === 0) return false;
+            if (status === 'ok' && d[2] !== 0) return false;
+            if (status === 'trend' && d[4].length === 0) return false;
+            return !query || d[0].toLowerCase().indexOf(query) !== -1 ||
+                   d[1].toLowerCase().indexOf(query) !== -1;
+        });
+        if (sortKey) {
+            var key = sortValues[sortKey];
+            view.sort(function (a, b) {
+                var ka = key(a), kb = key(b);
+                return ka < kb ? -sortDir : (ka > kb ? sortDir : 0);
+            });
+        }
+        spacer.style.height = (view.length * ROW_HEIGHT) + 'px';
+        counter.textContent = '显示 ' + view.length + ' / ' + devices.length + ' 台设备';
+        scroller.scrollTop = 0;
+        render();
+    }
+
+    document.querySelectorAll('.device-header .sortable').forEach(function (header) {
+        header.addEventListener('click', function () {
+            var key = header.getAttribute('data-key');
+            sortDir = sortKey === key ? -sortDir : 1;
+            sortKey = key;
+            update();
+        });
+    });
+    filterInput.addEventListener('input', update);
+    statusSelect.addEventListener('change', update);
+    scroller.addEventListener('scroll', scheduleRender);
+    window.addEventListener('resize', scheduleRender);
+    update();
+})();
+'''
+
+# 告警总览页样式，在虚拟滚动索引页样式的基础上使用
+OVERVIEW_CSS = '''
+.device-list.wide {
+    max-width: none;
+}
+.summary-line {
+    color: #666;
+}
+.matrix {
+    overflow-x: auto;
+}
+.matrix .device-header, .matrix .device-row {
+    height: 32px;
+}
+.matrix .device-header {
+    height: 48px;
+}
+.col-check {
+    width: 110px;
+    flex-shrink: 0;
+    padding: 0 4px;
+    box-sizing: border-box;
+    overflow: hidden;
+    text-overflow: ellipsis;
+    white-space: nowrap;
+    text-align: center;
+}
+.device-header .col-check {
+    white-space: normal;
+    line-height: 18px;
+}
+.col-check.filterable {
+    cursor: pointer;
+}
+.col-check.filterable:hover, .col-check.active {
+    color: #FF4444;
+}
+.col-check.active {
+    border-bottom: 3px solid #FF4444;
+}
+.alert-count {
+    display: block;
+    color: #FF4444;
+}
+.alert-count.none {
+    color: #4CAF50;
+}
+.cell {
+    display: block;
+    color: #000000;
+    overflow: hidden;
+    text-overflow: ellipsis;
+}
+.cell.ok {
+    color: #4CAF50;
+}
+.cell.warn {
+    color: white;
+    background-color: #FF4444;
+    border-radius: 3px;
+}
+.matrix #device-scroller {
+    overflow-x: hidden;
+}
+'''
+
+# 告警总览页脚本：设备 × 检查项状态矩阵，只渲染可见范围内的行；
+# 点击检查项表头时直接取倒排索引中该项告警的设备，不必遍历全部设备
+OVERVIEW_JS = '''
+(function () {
+    var ROW_HEIGHT = 32;
+    var OVERSCAN = 10;
+    var data = JSON.parse(document.getElementById('overview-data').textContent);
+    var checks = data.checks;
+    var sections = data.sections;
+    var statuses = data.statuses;
+    var devices = data.devices;  // [ip, 主机名, 告警数, [各检查项的状态序号，-1 表示没有该项]]
+    var alerting = data.alerting;  // [各检查项告警的设备序号列表]
+    var all = devices.map(function (_, i) { return i; });
+    var view = all;
+    var checkFilter = -1;
+    var sortByAlerts = false;
+    var scheduled = false;
+
+    var scroller = document.getElementById('device-scroller');
+    var spacer = document.getElementById('device-spacer');
+    var rows = document.getElementById('device-rows');
+    var counter = document.getElementById('device-count');
+    var filterInput = document.getElementById('device-filter');
+
+    function esc(text) {
+        return String(text).replace(/[&<>"']/g, function (c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+
+    function cellHtml(d, c, page) {
+        var code = d[3][c];
+        if (code < 0) {
+            return '<span class="col-check"><span class="cell">-</span></span>';
+        }
+        var status = statuses[code];
+        var cls = status[1] === 2 ? 'cell warn' : (status[1] === 1 ? 'cell ok' : 'cell');
+        return '<span class="col-check"><a class="' + cls + '" href="' + page + '?section=' +
+               encodeURIComponent(sections[c]) + '" title="' + esc(checks[c] + ': ' + status[0]) + '">' +
+               esc(status[0]) + '</a></span>';
+    }
+
+    function rowHtml(d) {
+        var page = 'device_' + encodeURIComponent(d[0]) + '.html';
+        var cells = [];
+        for (var c = 0; c < checks.length; c++) {
+            cells.push(cellHtml(d, c, page));
+        }
+        return '<div class="device-row">' +
+               '<span class="col-ip"><a href="' + page + '?show=all">' + esc(d[0]) + '</a></span>' +
+               '<span class="col-host" title="' + esc(d[1]) + '">' + esc(d[1]) + '</span>' +
+               '<span class="col-alerts">' + d[2] + '</span>' + cells.join('') + '</div>';
+    }
+
+    function render() {
+        scheduled = false;
+        var top = scroller.scrollTop;
+        var first = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+        var last = Math.min(view.length, Math.ceil((top + scroller.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        var html = [];
+        for (var i = first; i < last; i++) {
+            html.push(rowHtml(devices[view[i]]));
+        }
+        rows.style.transform = 'translateY(' + (first * ROW_HEIGHT) + 'px)';
+        rows.innerHTML = html.join('');
+    }
+
+    function scheduleRender() {
+        if (!scheduled) {
+            scheduled = true;
+            window.requestAnimationFrame(render);
+        }
+    }
+
+    function update() {
+        var query = filterInput.value.trim().toLowerCase();
+        var base = checkFilter >= 0 ? alerting[checkFilter] : all;
+        view = !query ? base.slice() : base.filter(function (i) {
+            var d = devices[i];
+            return d[0].toLowerCase().indexOf(query) !== -1 || d[1].toLowerCase().indexOf(query) !== -1;
+        });
+        if (sortByAlerts) {
+            view.sort(function (a, b) { return devices[b][2] - devices[a][2] || a - b; });
+        }
+        spacer.style.height = (view.length * ROW_HEIGHT) + 'px';
+        var label = checkFilter >= 0 ? '（' + checks[checkFilter] + ' 告警）' : '';
+        counter.textContent = '显示 ' + view.length + ' / ' + devices.length + ' 台设备' + label;
+        scroller.scrollTop = 0;
+        render();
+    }
+
+    document.querySelectorAll('.device-header .col-check.filterable').forEach(function (header) {
+        header.addEventListener('click', function () {
+            var check = parseInt(header.getAttribute('data-check'), 10);
+            checkFilter = checkFilter === check ? -1 : check;
+            document.querySelectorAll('.device-header .col-check').forEach(function (other) {
+                other.classList.toggle('active', other === header && checkFilter >= 0);
+            });
+            update();
+        });
+    });
+    document.querySelector('.device-header .col-alerts').addEventListener('click', function () {
+        sortByAlerts = !sortByAlerts;
+        update();
+    });
+    filterInput.addEventListener('input', update);
+    scroller.addEventListener('scroll', scheduleRender);
+    window.addEventListener('resize', scheduleRender);
+    update();
+})();
+'''
+
+# 单文件报告脚本：设备页面以 gzip + base64 内嵌，点击设备链接时才在浏览器中解压，
+# 在覆盖整页的 iframe 中显示；设备页面引用的样式和脚本替换为页面中只保存一份的内联内容
+BUNDLE_VIEWER_JS = '''
+(function () {
+    var pages = JSON.parse(document.getElementById('device-pages').textContent);
+    var deviceAssets = JSON.parse(document.getElementById('device-assets').textContent);
+    var overlay = null;
+    var frame = null;
+
+    function inflate(data) {
+        var binary = atob(data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        return new Response(stream).text();
+    }
+
+    function close() {
+        overlay.style.display = 'none';
+        frame.removeAttribute('srcdoc');
+        document.body.style.overflow = '';
+    }
+
+    function ensureOverlay() {
+        if (overlay) {
+            return;
+        }
+        overlay = document.createElement('div');
+        overlay.style.cssText = 'display: none; position: fixed; top: 0; left: 0; right: 0; bottom: 0; ' +
+                                'z-index: 10000; background-color: white;';
+        frame = document.createElement('iframe');
+        frame.style.cssText = 'width: 100%; height: 100%; border: 0;';
+        overlay.appendChild(frame);
+        document.body.appendChild(overlay);
+        document.addEventListener('keydown', function (event) {
+            if (event.key === 'Escape' && overlay.style.display !== 'none') {
+                close();
+            }
+        });
+    }
+
+    function show(ip, query) {
+        ensureOverlay();
+        inflate(pages[ip]).then(function (html) {
+            html = html.replace(deviceAssets.tags, function () { return deviceAssets.inline; });
+            frame.onload = function () {
+                var win = frame.contentWindow;
+                var back = frame.contentDocument.querySelector('.back-link');
+                if (back) {
+                    back.addEventListener('click', function (event) {
+                        event.preventDefault();
+                        close();
+                    });
+                }
+                win.addEventListener('keydown', function (event) {
+                    if (event.key === 'Escape') {
+                        close();
+                    }
+                });
+                // 设备页面通过 URL 参数定位分段，srcdoc 中没有 URL 参数，加载后直接调用
+                var params = new URLSearchParams(query);
+                if (params.get('show') === 'all') {
+                    win.toggleAll(true);
+                } else if (params.get('section')) {
+                    win.showSection(params.get('section'));
+                }
+            };
+            frame.srcdoc = html;
+            overlay.style.display = 'block';
+            document.body.style.overflow = 'hidden';
+        });
+    }
+
+    document.addEventListener('click', function (event) {
+        var link = event.target.closest ? event.target.closest('a[href^="device_"]') : null;
+        if (!link) {
+            return;
+        }
+        var match = /^device_(.+?)\\.html(\\?.*)?$/.exec(link.getAttribute('href'));
+        var ip = match ? decodeURIComponent(match[1]) : null;
+        if (!ip || !pages.hasOwnProperty(ip)) {
+            return;
+        }
+        event.preventDefault();
+        if (typeof DecompressionStream === 'undefined') {
+            alert('当前浏览器不支持解压内嵌的设备页面，请使用新版 Chrome、Edge 或 Firefox 打开');
+            return;
+        }
+        show(ip, match[2] || '');
+    });
+})();
+'''
+# 单文件报告中设备页面引用样式和脚本时使用的占位地址
+BUNDLE_DEVICE_ASSETS = {'device_css': 'bundle:device.css', 'device_js': 'bundle:device.js'}
+
+# 索引页指向告警总览页的链接
+OVERVIEW_LINK = '<p style="text-align: center;"><a href="overview.html">告警总览（设备 × 检查项状态矩阵）</a></p>\n'
+
+# 状态等级对应的颜色：告警红色、正常绿色、其他黑色
+SEVERITY_COLORS = ('#000000', '#4CAF50', '#FF4444')
+
+# 共享静态资源：(键, 文件名前缀, 扩展名, 内容)
+ASSETS = [
+    ('index_css', 'index', 'css', INDEX_CSS),
+    ('device_css', 'device', 'css', DEVICE_CSS),
+    ('device_js', 'device', 'js', DEVICE_JS),
+    ('virtual_css', 'virtual', 'css', VIRTUAL_CSS),
+    ('virtual_js', 'virtual', 'js', VIRTUAL_JS),
+    ('overview_css', 'overview', 'css', OVERVIEW_CSS),
+    ('overview_js', 'overview', 'js', OVERVIEW_JS),
+]
+ASSETS_DIR = 'assets'
+
+# 分段正文中的告警标记及其高亮写法
+ALERT_MARK = '[告警]'
+ALERT_HTML = '<span style="color: #FF4444; font-weight: bold;">[告警]</span>'
+# 分段正文外层的预格式化块；服务状态保持原始列对齐，不自动换行
+SECTION_PRE = ('<pre style="margin: 10px; padding: 10px; font-family: monospace; white-space: pre-wrap;">',
+               '</pre>')
+SERVICE_PRE = ('''
+        <pre style="font-family: 'Courier New', Courier, monospace; 
+                    white-space: pre; 
+                    font-size: 14px;
+                    line-height: 1.5;
+                    padding: 15px;
+                    background-color: white;
+                    border-radius: 4px;
+                    overflow-x: auto;">
+''', '''
+</pre>
+        ''')
+
+
+class HTMLGenerator:
+    @staticmethod
+    def write_assets(output_dir):
+        """把样式和脚本写入 assets/ 目录，文件名带内容哈希便于浏览器长期缓存
+
+        返回 {键: 相对路径}，传给页面生成函数后页面只引用这些文件而不再内联。
+        已存在的同名文件不重复写入，旧版本的资源文件会被删除。
+        """
+        assets_dir = os.path.join(output_dir, ASSETS_DIR)
+        os.makedirs(assets_dir, exist_ok=True)
+      
+        assets = {}
+        for key, href, data in HTMLGenerator.asset_files():
+            path = os.path.join(output_dir, href)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            assets[key] = href
+      
+        current = {os.path.basename(href) for href in assets.values()}
+        for file_name in os.listdir(assets_dir):
+            if file_name not in current:
+                os.remove(os.path.join(assets_dir, file_name))
+        return assets
+
+    @staticmethod
+    def asset_files():
+        """共享资源的 [(键, 相对路径, 内容字节)]，文件名带内容哈希"""
+        files = []
+        for key, prefix, ext, content in ASSETS:
+            data = content.strip().encode('utf-8') + b'\n'
+            files.append((key, f"{ASSETS_DIR}/{prefix}.{hashlib.sha1(data).hexdigest()[:10]}.{ext}", data))
+        return files
+
+    @staticmethod
+    def asset_tags(assets, css_key, css, js_key=None, js=None):
+        """有共享资源时生成 link/script 引用，否则内联样式和脚本"""
+        if assets:
+            tags = f'<link rel="stylesheet" href="{assets[css_key]}">'
+            if js_key:
+                tags += f'\n<script src="{assets[js_key]}"></script>'
+            return tags
+        tags = f'<style>{css}</style>'
+        if js_key:
+            tags += f'\n<script>{js}</script>'
+        return tags
+
+    @staticmethod
+    def generate_device_card(device, trend_warnings=None):
+        """生成设备卡片HTML，trend_warnings 为该设备的趋势预警文字列表"""
+        summary_links = [
+            f'<span style="margin-right: 15px;"><a href="device_{device.ip}.html?section={section_name(name)}" '
+            f'style="color: {SEVERITY_COLORS[severity]};">{name}: {status}</a></span>'
+            for name, status, severity in device.items
+        ]
+      
+        trend_html = ''
+        if trend_warnings:
+            trend_html = f'\n                <p class="trend-warning">趋势预警: {"；".join(trend_warnings)}</p>'
+      
+        return f'''
+            <div class="device-card">
+                <h3>IP: {device.ip}</h3>
+                <p>主机名: {device.hostname}</p>
+                <p style="display: flex; flex-wrap: wrap;">{"".join(summary_links)}</p>{trend_html}
+                <p><a href="device_{device.ip}.html?show=all" class="view-report">查看完整报告</a></p>
+                <hr>
+            </div>
+        '''
+
+    @staticmethod
+    def format_elapsed(elapsed_ms):
+        """把毫秒数格式化为耗时文字"""
+        return f"{elapsed_ms / 1000:.1f}s" if elapsed_ms >= 1000 else f"{elapsed_ms:.0f}ms"
+
+    @staticmethod
+    def build_timing_stats(check_results):
+        """汇总全部设备各检查项的耗时
+
+        返回按平均耗时从高到低排列的
+        [(分段名称, 设备数, 平均耗时, 最大耗时, 最慢设备IP, 平均外部命令数)]，
+        日志中没有耗时行时返回空列表。
+        """
+        stats = {}
+        for device in check_results:
+            for name, (elapsed_ms, commands) in device.timings.items():
+                item = stats.setdefault(name, [0, 0, 0, -1, None])
+                item[0] += 1
+                item[1] += elapsed_ms
+                item[2] += commands
+                if elapsed_ms > item[3]:
+                    item[3], item[4] = elapsed_ms, device.ip
+        rows = [(name, count, total_ms / count, max_ms, slowest_ip, commands / count)
+                for name, (count, total_ms, commands, max_ms, slowest_ip) in stats.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    @staticmethod
+    def generate_timing_summary(check_results):
+        """生成索引页的全部设备最慢检查项表，没有耗时数据时返回空字符串"""
+        rows = HTMLGenerator.build_timing_stats(check_results)
+        if not rows:
+            return ''
+        fmt = HTMLGenerator.format_elapsed
+        rows_html = ''.join(
+            f'<tr><td>{name}</td><td class="num">{count}</td><td class="num">{fmt(avg_ms)}</td>'
+            f'<td class="num">{fmt(max_ms)}</td>'
+            f'<td><a href="device_{ip}.html?section={name}">{ip}</a></td>'
+            f'<td class="num">{commands:.1f}</td></tr>'
+            for name, count, avg_ms, max_ms, ip, commands in rows
+        )
+        return f'''<details class="timing-summary">
+<summary>最慢检查项（全部设备）</summary>
+<table class="timing-table">
+<tr><th>检查项</th><th>设备数</th><th>平均耗时</th><th>最大耗时</th><th>最慢设备</th><th>平均外部命令数</th></tr>
+{rows_html}
+</table>
+</details>
+'''
+
+    @staticmethod
+    def generate_index_page(check_results, assets=None, degrading=None, overview=True):
+        """生成索引页面，assets 为 write_assets 的返回值，为空时内联样式
+
+        degrading 为 {ip: [趋势预警文字]}，对应设备卡片上会显示预警；
+        overview 为真时页面顶部链接到告警总览页 overview.html。
+        """
+        degrading = degrading or {}
+        devices_html = ''.join(HTMLGenerator.generate_device_card(device, degrading.get(device.ip))
+                               for device in check_results)
+        
+        # 获取当前日期
+        from datetime import datetime
+        current_date = datetime.now().strftime('%Y-%m-%d')
+      
+        return f'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>系统巡检报告 - {current_date}</title>
+{HTMLGenerator.asset_tags(assets, 'index_css', INDEX_CSS)}
+</head>
+<body>
+<h1>系统巡检报告 - {current_date}</h1>
+{OVERVIEW_LINK if overview else ''}{HTMLGenerator.generate_timing_summary(check_results)}<div class="device-list">
+{devices_html}
+</div>
+</body>
+</html>'''
+
+    @staticmethod
+    def build_index_data(check_results, degrading=None):
+        """把解析结果压缩为索引页使用的 JSON 数据
+
+        检查项名称和状态文本各建一张表，每台设备只记录
+        [ip, 主机名, 告警数, [检查项序号, 状态序号, ...], [趋势预警文字, ...]]。
+        状态等级：2 告警，1 正常，0 其他。
+        """
+        degrading = degrading or {}
+        checks, sections, check_index = [], [], {}
+        statuses, status_index = [], {}
+        devices = []
+        for device in check_results:
+            codes = []
+            alerts = 0
+            for name, status, severity in device.items:
+                if name not in check_index:
+                    check_index[name] = len(checks)
+                    checks.append(name)
+                    sections.append(section_name(name))
+                if status not in status_index:
+                    status_index[status] = len(statuses)
+                    statuses.append([status, severity])
+                if severity == SEVERITY_ALERT:
+                    alerts += 1
+                codes += [check_index[name], status_index[status]]
+            devices.append([device.ip, device.hostname, alerts, codes,
+                            degrading.get(device.ip, [])])
+        return {'checks': checks, 'sections': sections, 'statuses': statuses, 'devices': devices}
+
+    @staticmethod
+    def generate_virtual_index_page(check_results, assets=None, degrading=None, overview=True):
+        """生成虚拟滚动的索引页面
+
+        设备摘要以紧凑 JSON 内嵌在页面中，浏览器只渲染可见范围内的行，
+        支持按 IP、主机名、告警数排序以及按 IP/主机名、告警状态和趋势预警筛选，
+        适合上千台设备的报告。overview 与 generate_index_page 相同。
+        """
+        payload = json.dumps(HTMLGenerator.build_index_data(check_results, degrading),
+                             ensure_ascii=False, separators=(',', ':'))
+        # 防止主机名等内容提前结束 script 标签
+        payload = payload.replace('</', '<\\/')
+      
+        if assets:
+            script = f'<script src="{assets["virtual_js"]}"></script>'
+        else:
+            script = f'<script>{VIRTUAL_JS}</script>'
+      
+        from datetime import datetime
+        current_date = datetime.now().strftime('%Y-%m-%d')
+      
+        return f'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>系统巡检报告 - {current_date}</title>
+{HTMLGenerator.asset_tags(assets, 'virtual_css', VIRTUAL_CSS)}
+</head>
+<body>
+<h1>系统巡检报告 - {current_date}</h1>
+{OVERVIEW_LINK if overview else ''}{HTMLGenerator.generate_timing_summary(check_results)}<div class="device-list">
+    <div class="toolbar">
+        <input id="device-filter" type="search" placeholder="按 IP 或主机名筛选">
+        <select id="status-filter">
+            <option value="all">全部设备</option>
+            <option value="alert">仅告警设备</option>
+            <option value="ok">仅正常设备</option>
+            <option value="trend">仅趋势预警设备</option>
+        </select>
+        <span id="device-count" class="device-count"></span>
+    </div>
+    <div class="device-header">
+        <span class="col-ip sortable" data-key="ip">IP</span>
+        <span class="col-host sortable" data-key="hostname">主机名</span>
+        <span class="col-alerts sortable" data-key="alerts">告警数</span>
+        <span class="col-checks">巡检总结</span>
+    </div>
+    <div id="device-scroller">
+        <div id="device-spacer"><div id="device-rows"></div></div>
+    </div>
+</div>
+<script type="application/json" id="device-data">{payload}</script>
+{script}
+</body>
+</html>'''
+
+    @staticmethod
+    def build_overview_data(check_results, status_index=None):
+        """由 (检查项, 状态) 倒排索引生成告警总览页使用的 JSON 数据
+
+        status_index 为 report_model.build_status_index 的结果，为空时现算。
+        每台设备记录 [ip, 主机名, 告警数, [各检查项的状态序号，-1 表示没有该项]]；
+        alerting 为每个检查项告警的设备序号列表，点击表头筛选时直接使用。
+        """
+        if status_index is None:
+            status_index = build_status_index(check_results)
+        checks = list(dict.fromkeys(check for check, _ in status_index))
+        check_index = {check: i for i, check in enumerate(checks)}
+        cells = [[-1] * len(checks) for _ in check_results]
+        alerts = [0] * len(check_results)
+        statuses = []
+        alerting = [[] for _ in checks]
+        for (check, status), members in status_index.items():
+            c = check_index[check]
+            severity = status_severity(status)
+            code = len(statuses)
+            statuses.append([status, severity])
+            for i in members:
+                cells[i][c] = code
+            if severity == SEVERITY_ALERT:
+                alerting[c].extend(members)
+                for i in members:
+                    alerts[i] += 1
+        for members in alerting:
+            members.sort()
+        devices = [[device.ip, device.hostname, alerts[i], cells[i]] for i, device in enumerate(check_results)]
+        return {'checks': checks, 'sections': [section_name(check) for check in checks],
+                'statuses': statuses, 'devices': devices, 'alerting': alerting}
+
+    @staticmethod
+    def generate_overview_page(check_results, assets=None, status_index=None):
+        """生成告警总览页面：设备 × 检查项状态矩阵
+
+        表头显示每个检查项的告警设备数，点击只看该项告警的设备；
+        每个单元格链接到对应设备页面的该检查项。行与虚拟滚动索引页一样按需渲染。
+        """
+        data = HTMLGenerator.build_overview_data(check_results, status_index)
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+        headers = ''.join(
+            f'<span class="col-check filterable" data-check="{i}" title="点击只看该项告警的设备">'
+            f'{html.escape(check)}<span class="alert-count{"" if members else " none"}">'
+            f'{len(members)} 台告警</span></span>'
+            for i, (check, members) in enumerate(zip(data['checks'], data['alerting']))
+        )
+        alert_devices = sum(1 for device in data['devices'] if device[2])
+        # 列宽固定，矩阵总宽度 = IP + 主机名 + 告警数 + 各检查项，超出窗口时横向滚动
+        width = 140 + 200 + 70 + 110 * len(data['checks'])
+
+        if assets:
+            tags = (f'<link rel="stylesheet" href="{assets["virtual_css"]}">\n'
+                    f'<link rel="stylesheet" href="{assets["overview_css"]}">')
+            script = f'<script src="{assets["overview_js"]}"></script>'
+        else:
+            tags = f'<style>{VIRTUAL_CSS}{OVERVIEW_CSS}</style>'
+            script = f'<script>{OVERVIEW_JS}</script>'
+
+        from datetime import datetime
+        current_date = datetime.now().strftime('%Y-%m-%d')
+
+        return f'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>告警总览 - {current_date}</title>
+{tags}
+</head>
+<body>
+<h1>告警总览 - {current_date}</h1>
+<div class="device-list wide">
+    <div class="toolbar">
+        <a href="index.html">返回索引</a>
+        <input id="device-filter" type="search" placeholder="按 IP 或主机名筛选">
+        <span class="summary-line">{alert_devices} / {len(data['devices'])} 台设备有告警</span>
+        <span id="device-count" class="device-count"></span>
+    </div>
+    <div class="matrix">
+        <div style="width: {width}px;">
+            <div class="device-header">
+                <span class="col-ip">IP</span>
+                <span class="col-host">主机名</span>
+                <span class="col-alerts sortable" title="按告警数排序">告警数</span>{headers}
+            </div>
+            <div id="device-scroller">
+                <div id="device-spacer"><div id="device-rows"></div></div>
+            </div>
+        </div>
+    </div>
+</div>
+<script type="application/json" id="overview-data">{payload}</script>
+{script}
+</body>
+</html>'''
+
+    @staticmethod
+    def generate_bundle_scripts():
+        """单文件报告中设备页面共用的样式和脚本，以及查看设备页面的脚本
+
+        设备页面内容由调用方以 <script type="application/json" id="device-pages">
+        {ip: gzip 后 base64 编码的页面} 的形式另外写入。
+        """
+        device_assets = json.dumps({
+            'tags': HTMLGenerator.asset_tags(BUNDLE_DEVICE_ASSETS, 'device_css', DEVICE_CSS, 'device_js', DEVICE_JS),
+            'inline': HTMLGenerator.asset_tags(None, 'device_css', DEVICE_CSS, 'device_js', DEVICE_JS),
+        }, ensure_ascii=False).replace('</', '<\\/')
+        return (f'<script type="application/json" id="device-assets">{device_assets}</script>\n'
+                f'<script>{BUNDLE_VIEWER_JS}</script>\n')
+
+    @staticmethod
+    def format_service_status(content):
+        """保持原始格式显示服务状态"""
+        return SERVICE_PRE[0] + content + SERVICE_PRE[1]
+
+    @staticmethod
+    def contains_alert(chunks):
+        """分块检查正文中是否有告警标记，标记可能跨块"""
+        tail = ''
+        for chunk in chunks:
+            if ALERT_MARK in tail + chunk[:len(ALERT_MARK) - 1] or ALERT_MARK in chunk:
+                return True
+            tail = (tail + chunk)[-(len(ALERT_MARK) - 1):]
+        return False
+
+    @staticmethod
+    def write_highlighted(out, chunks):
+        """逐块转义正文并高亮告警标记后写入 out
+
+        块末尾可能是半个告警标记，这部分留到下一块再处理。
+        """
+        pending = ''
+        for chunk in chunks:
+            text = pending + chunk
+            cut = len(text)
+            start = text.find('[', max(0, len(text) - len(ALERT_MARK) + 1))
+            while start != -1:
+                if ALERT_MARK.startswith(text[start:]):
+                    cut = start
+                    break
+                start = text.find('[', start + 1)
+            pending = text[cut:]
+            out.write(html.escape(text[:cut], quote=False).replace(ALERT_MARK, ALERT_HTML))
+        out.write(html.escape(pending, quote=False))
+
+    @staticmethod
+    def generate_device_detail_page(device, assets=None):
+        """生成单个设备的详细信息页面，assets 为 write_assets 的返回值，为空时内联样式和脚本"""
+        out = io.StringIO()
+        HTMLGenerator.write_device_detail_page(device, out, assets)
+        return out.getvalue()
+
+    @staticmethod
+    def write_device_detail_page(device, out, assets=None, chunk_size=SECTION_CHUNK_SIZE):
+        """把单个设备的详细信息页面写入 out（文本文件对象）
+
+        分段正文按 chunk_size 分块读取，逐块做 HTML 转义和告警高亮后直接写出，
+        不在内存中拼接整页，峰值内存与分段大小无关。
+        """
+        # 添加可点击的链接，直接使用分段名称作为锚点
+        formatted_summary = [
+            f'<a href="javascript:void(0)" onclick="showSection(\'{section_name(name)}\')" '
+            f'style="margin-right: 15px; text-decoration: none; color: {SEVERITY_COLORS[severity]};">'
+            f'{name}: {status}</a>'
+            for name, status, severity in device.items
+        ]
+        warning_sections = device.warning_sections
+        sections = device.sections
+
+        # 各检查项耗时，按耗时从高到低排列
+        timing_html = ''
+        timings = device.timings
+        if timings:
+            fmt = HTMLGenerator.format_elapsed
+            rows_html = ''.join(
+                f'<tr><td><a href="javascript:void(0)" onclick="showSection(\'{name}\')">{name}</a></td>'
+                f'<td class="num">{fmt(elapsed_ms)}</td><td class="num">{commands}</td></tr>'
+                for name, (elapsed_ms, commands) in sorted(timings.items(), key=lambda item: item[1][0],
+                                                           reverse=True)
+            )
+            timing_html = f'''
+    <h3>检查耗时:</h3>
+    <table class="timing-table">
+    <tr><th>检查项</th><th>耗时</th><th>外部命令数</th></tr>
+    {rows_html}
+    </table>
+    <hr>'''
+        
+        # 获取当前日期
+        from datetime import datetime
+        current_date = datetime.now().strftime('%Y-%m-%d')
+      
+        out.write(f'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>设备 {device.ip} 巡检报告 - {current_date}</title>
+{HTMLGenerator.asset_tags(assets, 'device_css', DEVICE_CSS, 'device_js', DEVICE_JS)}
 </head>
 <body>
 <div class="header-fixed">
     <a href="index.html" class="back-link">返回设备列表</a>
-    <strong>IP: {device['ip']}</strong> | 
-    主机名: {device['hostname']} | 
-    检查时间: {device['check_time']}
+    <strong>IP: {device.ip}</strong> | 
+    主机名: {device.hostname} | 
+    检查时间: {device.check_time}
     <div class="control-buttons">
         <button class="control-button" onclick="toggleAll(true)">全部展开</button>
         <button class="control-button" onclick="toggleAll(false)">全部折叠</button>
@@ -388,8 +1255,37 @@ window.onload = function() {{
     <hr>
     <h3>巡检总结:</h3>
     <p style="line-height: 2;">{''.join(formatted_summary)}</p>
-    <hr>
-    <div>{sections_html}</div>
+    <hr>{timing_html}
+    <div>''')
+
+        # 逐段写出，分段名称作为ID，标题显示巡检总结中的检查项名称
+        for name in sections:
+            has_warning = (name in warning_sections
+                           or HTMLGenerator.contains_alert(iter_section(sections, name, chunk_size)))
+            if has_warning:
+                header_style = 'background-color: #FF4444; color: white;'
+                content_style = 'background-color: #FFEBEE;'
+            else:
+                header_style = 'background-color: #f0f0f0;'
+                content_style = ''
+            # 对服务状态部分进行特殊处理
+            pre_open, pre_close = SERVICE_PRE if name == '服务状态' else SECTION_PRE
+
+            out.write(f'''
+                <div class="section" id="section_{name}">
+                    <h3 onclick="toggleSection('{name}')" style="cursor: pointer; padding: 10px; {header_style}">
+                        ▶ {check_name(name)}
+                    </h3>
+                    <div id="content_{name}" style="display: none; {content_style}">
+                        {pre_open}''')
+            HTMLGenerator.write_highlighted(out, iter_section(sections, name, chunk_size))
+            out.write(f'''{pre_close}
+                    </div>
+                </div>
+                <hr>
+            ''')
+
+        out.write('''</div>
 </div>
 </body>
-</html>'''
\ No newline at end of file
+</html>''')
\ No newline at end of file
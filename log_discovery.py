@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""查找日志目录中的巡检日志
+
+一次 os.scandir 遍历同时取得文件名、大小和修改时间，可以进入按日期分的子目录，
+并按日志日期和 IP 前缀筛选。日志按 <ip>_check_<YYYYMMDD>.log 命名，
+文件名中没有日期时取所在目录名中的日期。
+"""
+
+import os
+import re
+
+# 同时支持 .log 和 .log.txt 结尾的文件
+LOG_SUFFIXES = ('.log', '.log.txt')
+# 文件名或目录名中独立的 8 位数字视为日期 YYYYMMDD
+DATE_PATTERN = re.compile(r'(?<!\d)(\d{8})(?!\d)')
+
+
+class LogFile:
+    """找到的一个日志文件，name 为相对日志目录、以 / 分隔的路径"""
+
+    __slots__ = ('name', 'size', 'mtime_ns')
+
+    def __init__(self, name, size, mtime_ns):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self):
+        return f'LogFile(name={self.name!r}, size={self.size!r})'
+
+def parse_log_date(text):
+    """把 'YYYY-MM-DD' 或 'YYYYMMDD' 转换为 'YYYYMMDD'，为空时返回 None"""
+    if not text:
+        return None
+    date = text.strip().replace('-', '')
+    if not (len(date) == 8 and date.isdigit()):
+        raise ValueError(f"无法识别的日期: {text}")
+    return date
+
+def name_date(name):
+    """文件名或目录名中最后一个 8 位数字日期，没有时返回 None"""
+    dates = DATE_PATTERN.findall(name)
+    return dates[-1] if dates else None
+
+def log_date(name):
+    """日志的日期 YYYYMMDD：先看文件名，再由近及远看所在目录名，都没有时返回 None"""
+    for part in reversed(name.split('/')):
+        date = name_date(part)
+        if date:
+            return date
+    return None
+
+def discover_logs(log_dir, recursive=False, since=None, until=None, ip_prefix=None):
+    """列出 log_dir 中的日志，返回按 name 排序的 LogFile 列表
+
+    recursive 为真时进入子目录（跳过以 . 开头的目录和目录符号链接）；
+    since/until 为 'YYYY-MM-DD' 或 'YYYYMMDD'，只保留日期在 [since, until) 内的日志，
+    此时没有日期的日志不保留，目录名本身是范围外日期的子目录整个跳过；
+    ip_prefix 只保留文件名以它开头的日志。
+    """
+    since, until = parse_log_date(since), parse_log_date(until)
+    dated = since is not None or until is not None
+
+    def in_range(date):
+        return (since is None or date >= since) and (until is None or date < until)
+
+    found = []
+    pending = ['']
+    while pending:
+        prefix = pending.pop()
+        with os.scandir(os.path.join(log_dir, prefix) if prefix else log_dir) as entries:
+            for entry in entries:
+                name = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.startswith('.'):
+                        date = name_date(entry.name)
+                        if not (dated and date == entry.name and not in_range(date)):
+                            pending.append(name + '/')
+                    continue
+                if not entry.name.endswith(LOG_SUFFIXES) or not entry.is_file():
+                    continue
+                if ip_prefix and not entry.name.startswith(ip_prefix):
+                    continue
+                if dated:
+                    date = log_date(name)
+                    if date is None or not in_range(date):
+                        continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # 列出目录后被删除
+                found.append(LogFile(name, stat.st_size, stat.st_mtime_ns))
+    found.sort(key=lambda log: log.name)
+    return found
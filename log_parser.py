@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+import mmap
+import os
+import re
+import sys
+from collections.abc import Mapping
+
+from report_model import DeviceReport
+
+
+HOSTNAME_MARK = '主机名: '.encode('utf-8')
+CHECK_TIME_MARK = '系统巡检报告 | '.encode('utf-8')
+CHECK_TIME_END = ' ====='.encode('utf-8')
+SUMMARY_MARK = '巡检总结: '.encode('utf-8')
+SECTION_PREFIX = b'---- '
+SECTION_SUFFIX = b' ----'
+# 巡检脚本在每部分末尾追加的耗时行：@timing elapsed_ms=耗时 commands=外部命令数；
+# 其后的 @timing ctcc ... 行是各条 ctcc_cmd 查询的耗时，不属于任何分段，解析时跳过
+TIMING_MARK = b'@timing '
+# system_check.sh -f json 输出的每行一条 JSON 记录中，原始文本固定是检查记录的最后一个字段
+JSON_TEXT_KEY = b'"text":'
+# 分块读取分段正文时每块的字节数
+SECTION_CHUNK_SIZE = 64 * 1024
+# JSON 字符串中最长的转义序列是 \\uXXXX 代理对，共 12 字节
+MAX_ESCAPE_LEN = 12
+HIGH_SURROGATE = re.compile(rb'\\u[dD][89abAB][0-9a-fA-F]{2}')
+LOW_SURROGATE = re.compile(rb'\\u[dD][c-fC-F][0-9a-fA-F]{2}')
+
+
+def _decode(data):
+    """日志按 UTF-8 解码，个别坏字节不影响整份报告；与文本模式读取一样统一换行符"""
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    return data.decode('utf-8', errors='replace')
+
+class LazySections(Mapping):
+    """按需读取的日志分段
+
+    只记录每段正文在日志文件中的字节范围，渲染器访问时才读取并解码，
+    可以被 pickle 传回主进程，也可以按 spans 存入缓存后重建。
+    """
+
+    __slots__ = ('file_path', 'spans')
+
+    def __init__(self, file_path, spans):
+        self.file_path = file_path
+        self.spans = spans  # {分段名称: (起始偏移, 结束偏移)}
+
+    @staticmethod
+    def decode(data):
+        return _decode(data)
+
+    def __getitem__(self, name):
+        start, end = self.spans[name]
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            return self.decode(f.read(end - start))
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def items(self):
+        """一次打开文件依次读取所有分段"""
+        with open(self.file_path, 'rb') as f:
+            for name, (start, end) in self.spans.items():
+                f.seek(start)
+                yield name, self.decode(f.read(end - start))
+
+    def values(self):
+        return (content for _, content in self.items())
+
+    def iter_text(self, name, chunk_size=SECTION_CHUNK_SIZE):
+        """分块读取一个分段的正文，每块约 chunk_size 字节，内存占用与分段大小无关
+
+        各块拼接起来与 self[name] 相同：多字节字符和跨块的 CRLF 不会被拆开。
+        """
+        start, end = self.spans[name]
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ''
+        with open(self.file_path, 'rb') as f:
+            for data, final in self.read_pieces(f, start, end, max(chunk_size, MAX_ESCAPE_LEN * 2)):
+                text = pending + self.unescape(decoder.decode(data, final))
+                # 块末尾的 \r 可能和下一块开头的 \n 是同一个 CRLF，留到下一块再统一换行符
+                if text.endswith('\r') and not final:
+                    text, pending = text[:-1], '\r'
+                else:
+                    pending = ''
+                if '\r' in text:
+                    text = text.replace('\r\n', '\n').replace('\r', '\n')
+                if text:
+                    yield text
+
+    @staticmethod
+    def read_pieces(f, start, end, chunk_size):
+        """依次返回 (字节块, 是否最后一块)"""
+        f.seek(start)
+        remaining = end - start
+        while True:
+            data = f.read(min(chunk_size, remaining))
+            remaining -= len(data)
+            final = remaining <= 0 or not data
+            yield data, final
+            if final:
+                return
+
+    @staticmethod
+    def unescape(text):
+        return text
+
+def iter_section(sections, name, chunk_size=SECTION_CHUNK_SIZE):
+    """分块返回分段正文；已经读入内存的普通 dict 按字符数切片"""
+    if isinstance(sections, LazySections):
+        yield from sections.iter_text(name, chunk_size)
+        return
+    content = sections[name]
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+
+def _is_escape_start(data, i):
+    """data[i] 是否为转义序列开头的反斜杠：前面连续的反斜杠为偶数个"""
+    if data[i] != 0x5C:
+        return False
+    run = 0
+    while i - run > 0 and data[i - run - 1] == 0x5C:
+        run += 1
+    return run % 2 == 0
+
+def _escape_boundary(data):
+    """data 末尾 MAX_ESCAPE_LEN 字节内第一个转义序列的起点，没有时返回 len(data)
+
+    data 必须从转义序列的边界开始。从返回的位置切开不会拆开转义序列，
+    也不会拆开 \\uXXXX\\uXXXX 代理对。
+    """
+    for i in range(max(0, len(data) - MAX_ESCAPE_LEN), len(data)):
+        if not _is_escape_start(data, i):
+            continue
+        # 低位代理的前面是同一字符的高位代理时，从高位代理之前切开
+        if (i >= 6 and LOW_SURROGATE.match(data, i) and HIGH_SURROGATE.match(data, i - 6)
+                and _is_escape_start(data, i - 6)):
+            return i - 6
+        return i
+    return len(data)
+
+class JsonSections(LazySections):
+    """JSON 记录格式日志的分段，字节范围指向记录中 text 字段的 JSON 字符串字面量"""
+
+    __slots__ = ()
+
+    @staticmethod
+    def decode(data):
+        text = json.loads(_decode(data))
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    @staticmethod
+    def read_pieces(f, start, end, chunk_size):
+        """去掉字面量两端的引号后分块返回，转义序列不会跨块；UTF-8 多字节字符不含反斜杠，不影响切分"""
+        f.seek(start)
+        head = f.read(min(MAX_ESCAPE_LEN, end - start))
+        quote = head.find(b'"')
+        if quote < 0 or end - start < quote + 2:
+            raise ValueError(f"{f.name}: 偏移 {start} 处不是 JSON 字符串")
+        start += quote + 1
+        end -= 1
+        f.seek(start)
+        remaining = end - start
+        carry = b''
+        while True:
+            chunk = f.read(min(chunk_size, remaining))
+            remaining -= len(chunk)
+            data = carry + chunk
+            if remaining <= 0 or not chunk:
+                yield data, True
+                return
+            cut = _escape_boundary(data)
+            carry = data[cut:]
+            yield data[:cut], False
+
+    @staticmethod
+    def unescape(text):
+        return json.loads(f'"{text}"')
+
+def _scan_lines(lines):
+    """单次扫描日志行，提取头部字段、分段范围和巡检总结
+
+    lines 为 (行起始偏移, 含换行符的行字节) 序列，换行符可以是 LF 或 CRLF。
+    分段正文从标记行的下一行开始，到下一个标记行之前的换行符为止；
+    最后一段延续到文件末尾。带耗时行的日志中，正文到耗时行之前为止，
+    耗时记录为 {分段名称: (耗时毫秒, 外部命令数)}。
+    """
+    hostname = check_time = summary = None
+    spans = {}
+    timings = {}
+    current_section = None
+    body_start = None
+    end = 0
+    newline_len = 0  # 上一行换行符的长度
+
+    for offset, line in lines:
+        end = offset + len(line)
+        if line.endswith(b'\r\n'):
+            stripped = line[:-2]
+        elif line.endswith(b'\n'):
+            stripped = line[:-1]
+        else:
+            stripped = line
+
+        if stripped.startswith(SECTION_PREFIX) and stripped.endswith(SECTION_SUFFIX):
+            if current_section and offset > body_start:
+                spans[current_section] = (body_start, offset - newline_len)
+            current_section = sys.intern(_decode(stripped[5:-5]))  # 去掉前后的 ---- 和空格
+            body_start = end if stripped is not line else None
+            newline_len = len(line) - len(stripped)
+            continue
+        newline_len = len(line) - len(stripped)
+
+        if stripped.startswith(TIMING_MARK):
+            if current_section:
+                if body_start is not None and offset > body_start:
+                    spans[current_section] = (body_start, offset)
+                fields = dict(field.split(b'=', 1) for field in stripped[len(TIMING_MARK):].split()
+                              if b'=' in field)
+                try:
+                    timings[current_section] = (int(fields[b'elapsed_ms']), int(fields[b'commands']))
+                except (KeyError, ValueError):
+                    pass
+                # 耗时行之后到下一个标记行之间的内容不属于任何分段
+                current_section = None
+            continue
+
+        # 与原正则一致：取全文第一次出现的位置
+        if hostname is None and HOSTNAME_MARK in stripped:
+            hostname = _decode(stripped.split(HOSTNAME_MARK, 1)[1])
+        if check_time is None and CHECK_TIME_MARK in stripped:
+            rest = stripped.split(CHECK_TIME_MARK, 1)[1]
+            if CHECK_TIME_END in rest:
+                check_time = _decode(rest[:rest.rindex(CHECK_TIME_END)])
+        if summary is None and SUMMARY_MARK in stripped:
+            summary = _decode(stripped.split(SUMMARY_MARK, 1)[1])
+
+    # 处理最后一个部分
+    if current_section and body_start is not None:
+        spans[current_section] = (body_start, end)
+
+    for value, field_name in ((hostname, '主机名'), (check_time, '巡检时间'), (summary, '巡检总结')):
+        if value is None:
+            raise ValueError(f"日志格式错误: 未找到{field_name}")
+    return hostname, check_time, spans, summary, timings
+
+def _scan_json(lines):
+    """逐行解码 JSON 记录，不做任何正则匹配，检查记录的 text 字段不在扫描时解码
+
+    返回 (hostname, check_time, spans, summary, timings, metrics)，spans 指向各检查记录
+    text 字段的字符串字面量，metrics 为各检查项上报的数值指标。
+    """
+    hostname = check_time = summary = None
+    spans = {}
+    timings = {}
+    metrics = {}
+
+    for offset, line in lines:
+        stripped = line.rstrip(b'\r\n')
+        if not stripped.strip():
+            continue
+        # 原始文本占记录的大部分，扫描时只解码它之前的字段，正文留到渲染时再解码
+        start = stripped.find(JSON_TEXT_KEY)
+        head = stripped if start < 0 else stripped[:start].rstrip(b', ') + b'}'
+        try:
+            record = json.loads(_decode(head))
+        except ValueError:
+            raise ValueError(f"日志格式错误: 偏移 {offset} 处不是有效的 JSON 记录") from None
+        kind = record.get('type')
+        if kind == 'header':
+            hostname = record.get('hostname')
+            check_time = record.get('check_time')
+        elif kind == 'check':
+            if start < 0 or not stripped.endswith(b'"}'):
+                raise ValueError(f"日志格式错误: 偏移 {offset} 处的检查记录缺少 text 字段")
+            title = sys.intern(record['title'])
+            spans[title] = (offset + start + len(JSON_TEXT_KEY), offset + len(stripped) - 1)
+            timings[title] = (int(record.get('elapsed_ms', 0)), int(record.get('commands', 0)))
+            for name, value in record.get('metrics', {}).items():
+                metrics[name] = float(value)
+        elif kind == 'summary':
+            summary = record.get('summary')
+
+    for value, field_name in ((hostname, '主机名'), (check_time, '巡检时间'), (summary, '巡检总结')):
+        if value is None:
+            raise ValueError(f"日志格式错误: 未找到{field_name}")
+    return hostname, check_time, spans, summary, timings, metrics
+
+def _iter_mmap_lines(mm):
+    """逐行遍历内存映射文件，返回 (偏移, 行字节)"""
+    offset = 0
+    for line in iter(mm.readline, b''):
+        yield offset, line
+        offset += len(line)
+
+def parse_check_log(file_path):
+    """解析日志文件
+
+    通过内存映射单次扫描全文，分段正文以 LazySections 形式返回，
+    只有渲染器读取时才会从文件中取出。以 { 开头的日志按 JSON 记录格式
+    （system_check.sh -f json）直接解码，结果中另有脚本上报的数值指标 metrics。
+    返回 DeviceReport。
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("日志格式错误: 文件为空")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:64].lstrip().startswith(b'{'):
+                hostname, check_time, spans, summary, timings, metrics = _scan_json(_iter_mmap_lines(mm))
+            else:
+                hostname, check_time, spans, summary, timings = _scan_lines(_iter_mmap_lines(mm))
+                metrics = None
+
+    return DeviceReport(
+        ip=os.path.basename(file_path).split('_')[0],
+        hostname=hostname,
+        check_time=check_time,
+        sections=(LazySections if metrics is None else JsonSections)(file_path, spans),
+        summary=summary,
+        timings=timings,
+        metrics=metrics,
+        log_format='text' if metrics is None else 'json'
+    )
+
+def materialize(result):
+    """把解析结果中的 LazySections 读成普通 dict，便于持久化或跨机器传递"""
+    return result.replace(sections=dict(result.sections.items()))
+
+def _parse_one(file_path):
+    """子进程入口：解析单个文件，异常转为错误信息返回"""
+    try:
+        return parse_check_log(file_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def parse_log_files(file_paths, jobs=None, progress=None, cancel=None):
+    """使用进程池并行解析日志文件
+
+    返回 (results, errors)。results 与 file_paths 顺序一致，解析失败的文件
+    不在其中；errors 为 (file_path, 错误信息) 列表，同样按输入顺序排列。
+    progress(done, total, file_path, error) 在每个文件完成时调用。
+    cancel.is_set() 为真时放弃尚未开始的文件，只返回已完成的部分。
+    """
+    total = len(file_paths)
+    outcomes = [None] * total
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, total))
+
+    if jobs == 1:
+        # 单进程时直接在当前进程解析，省去进程池启动开销
+        for i, path in enumerate(file_paths):
+            if cancel is not None and cancel.is_set():
+                break
+            outcomes[i] = _parse_one(path)
+            if progress:
+                progress(i + 1, total, path, outcomes[i][1])
+    else:
+        # 进程池只在需要时导入，单文件解析和定时采集不承担这部分启动开销
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(_parse_one, path): i for i, path in enumerate(file_paths)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    outcomes[i] = future.result()
+                except Exception as e:
+                    # 子进程异常退出等情况，同样只记录到对应文件
+                    outcomes[i] = (None, f"{type(e).__name__}: {e}")
+                if progress:
+                    progress(done, total, file_paths[i], outcomes[i][1])
+                if cancel is not None and cancel.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+    results = []
+    errors = []
+    for path, outcome in zip(file_paths, outcomes):
+        if outcome is None:
+            continue
+        result, error = outcome
+        if error is None:
+            results.append(result)
+        else:
+            errors.append((path, error))
+    return results, errors
+
+def normalize_check_time(check_time):
+    """把巡检报告头部的 date 输出转换为 'YYYY-MM-DD HH:MM:SS'，无法识别时返回 None
+
+    支持 C 语言环境（Mon Feb 17 17:19:02 CST 2025）、中文语言环境
+    （2025年 02月 17日 星期一 17:19:02 CST）以及 2025-02-17 17:19:02 这类格式。
+    时区按设备本地时间处理，直接丢弃。
+    """
+    from datetime import datetime
+
+    text = check_time.strip()
+    match = re.search(r'(\d{4})年\s*(\d{1,2})月\s*(\d{1,2})日.*?(\d{1,2}:\d{2}:\d{2})', text)
+    if match:
+        year, month, day, clock = match.groups()
+        text = f"{year}-{int(month):02d}-{int(day):02d} {clock}"
+    else:
+        tokens = text.split()
+        # 去掉时区（如 CST），只保留星期、月、日、时间、年
+        if len(tokens) == 6 and tokens[4].isalpha():
+            del tokens[4]
+        text = ' '.join(tokens)
+
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%a %b %d %H:%M:%S %Y'):
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    return None
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+
+from html_generator import HTMLGenerator
+from log_discovery import discover_logs, log_date
+from log_parser import materialize, normalize_check_time, parse_log_files
+from report_cache import ReportCache
+from report_model import build_status_index
+from report_store import ReportStore
+from trend import build_trends, find_degrading, format_warning
+
+
+# index_mode 为 auto 时，超过该设备数使用虚拟滚动索引页
+VIRTUAL_INDEX_THRESHOLD = 500
+
+
+class ReportCancelled(Exception):
+    """报告生成被用户取消"""
+
+def find_log_files(log_dir, **filters):
+    """列出目录中的日志文件，返回按相对 log_dir 的路径排序的 LogFile 列表
+
+    LogFile 带有遍历目录时取得的大小和修改时间，build_report 据此查缓存，不必再 stat。
+    filters 为 log_discovery.discover_logs 的 recursive、since、until、ip_prefix 参数。
+    """
+    return discover_logs(log_dir, **filters)
+
+def latest_per_device(results_by_file, log_files):
+    """同一 IP 有多份日志时（如递归查找多个日期目录）只保留最新的一份
+
+    设备页面按 IP 命名，每个 IP 只能对应一份结果。按巡检时间比较，相同或无法识别时
+    按文件名或目录名中的日期，再相同时取排在后面的文件。返回 (保留的结果, 被忽略的日志数)，
+    保留的结果按日志顺序排列。
+    """
+    latest = {}
+    for position, file in enumerate(log_files):
+        result = results_by_file.get(file)
+        if result is None:
+            continue
+        key = (normalize_check_time(result.check_time) or '', log_date(file) or '', position)
+        if result.ip not in latest or key > latest[result.ip][0]:
+            latest[result.ip] = (key, result)
+    kept = sorted(latest.values(), key=lambda item: item[0][2])
+    return [result for _, result in kept], len(results_by_file) - len(kept)
+
+def count_alerts(check_results):
+    """统计 (告警设备数, 告警项数)"""
+    alert_devices = alerts = 0
+    for device in check_results:
+        device_alerts = device.alerts
+        alerts += device_alerts
+        alert_devices += 1 if device_alerts else 0
+    return alert_devices, alerts
+
+def write_device_page(device, output_dir, assets):
+    """生成并写入 device_<ip>.html，页面边生成边写入文件"""
+    with open(os.path.join(output_dir, f'device_{device.ip}.html'), 'w', encoding='utf-8') as f:
+        HTMLGenerator.write_device_detail_page(device, f, assets)
+
+def generate_index_html(check_results, assets, index_mode='auto', degrading=None, overview=True):
+    """按 index_mode 生成索引页，degrading 为 {ip: [趋势预警文字]}，overview 为真时链接到告警总览页"""
+    if index_mode == 'virtual' or (index_mode == 'auto' and len(check_results) > VIRTUAL_INDEX_THRESHOLD):
+        return HTMLGenerator.generate_virtual_index_page(check_results, assets, degrading, overview)
+    return HTMLGenerator.generate_index_page(check_results, assets, degrading, overview)
+
+def write_index_page(check_results, output_dir, assets, index_mode='auto', degrading=None):
+    """生成并写入 index.html，degrading 为 {ip: [趋势预警文字]}"""
+    index_html = generate_index_html(check_results, assets, index_mode, degrading)
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(index_html)
+
+def write_overview_page(check_results, output_dir, assets, status_index=None):
+    """生成并写入告警总览页 overview.html，status_index 见 report_model.build_status_index"""
+    overview_html = HTMLGenerator.generate_overview_page(check_results, assets, status_index)
+    with open(os.path.join(output_dir, 'overview.html'), 'w', encoding='utf-8') as f:
+        f.write(overview_html)
+
+def load_degrading(db):
+    """根据结果库中的指标历史找出正在恶化但尚未告警的设备，返回 {ip: [预警文字]}"""
+    degrading = find_degrading(build_trends(db.metric_history()))
+    return {ip: [format_warning(warning) for warning in warnings] for ip, warnings in degrading.items()}
+
+def build_report(log_dir, progress=None, cancel=None, jobs=None, output_dir=None,
+                 index_mode='auto', store=None, bundle=None, log_files=None):
+    """解析日志目录并生成 index.html 和 device_<ip>.html
+
+    progress(stage, done, total, name) 在每个文件解析/渲染完成时调用，
+    stage 为 'parse' 或 'render'。cancel 为 threading.Event 之类带 is_set()
+    的对象，被设置后在下一个文件处抛出 ReportCancelled，此时不保存缓存，
+    下次运行会重新处理本次未完成的日志。output_dir 默认与 log_dir 相同，
+    缓存文件也保存在 output_dir 中。index_mode 为 'cards'（逐台设备卡片）、
+    'virtual'（内嵌 JSON 的虚拟滚动列表）或 'auto'（按设备数自动选择）。
+    store 为 SQLite 数据库路径，指定时把解析结果写入 ReportStore。
+    bundle 为 'zip' 或 'html' 时整份报告只写成 output_dir 中的一个文件（见 report_bundle），
+    不再逐个写入页面文件，返回值中的 bundle 为该文件路径。
+    log_files 为 find_log_files 返回的 LogFile 列表（如界面中已经找到的日志，可在子目录中），
+    为 None 时列出 log_dir 顶层的日志。
+    除索引页外还会写出告警总览页 overview.html（html 格式的单文件报告中没有）。
+    同一 IP 有多份日志时报告中只显示最新的一份（见 latest_per_device），较旧的仍写入 store。
+    返回包含设备数、告警数、更新页面数、解析错误、各阶段耗时和被忽略的较旧日志数的字典。
+    """
+    def check_cancel():
+        if cancel is not None and cancel.is_set():
+            raise ReportCancelled()
+
+    timings = {}
+    stage_started = time.perf_counter()
+
+    def end_stage(stage):
+        nonlocal stage_started
+        now = time.perf_counter()
+        timings[stage] = round(now - stage_started, 3)
+        stage_started = now
+
+    if log_files is None:
+        log_files = find_log_files(log_dir)
+    log_names = [log.name for log in log_files]
+    if not log_files:
+        end_stage('discover')
+        return {'devices': 0, 'alert_devices': 0, 'alerts': 0, 'rendered': 0,
+                'errors': [], 'timings': timings, 'bundle': None, 'superseded': 0}
+    output_dir = output_dir or log_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 未变化的日志直接使用缓存中的解析结果
+    cache = ReportCache.shared(output_dir, log_dir)
+    if not cache.entries:
+        # 没有缓存时无法判断哪些页面过期，按原方式清理旧的HTML文件
+        for file in os.listdir(output_dir):
+            if file.endswith('.html'):
+                try:
+                    os.remove(os.path.join(output_dir, file))
+                except Exception as e:
+                    print(f"删除文件 {file} 时出错: {str(e)}", file=sys.stderr)
+
+    results_by_file = {}
+    file_names = {}  # {日志路径: 相对 log_dir 的路径}
+    changed = []
+    for log in log_files:
+        file = log.name
+        file_path = os.path.join(log_dir, file)
+        file_names[file_path] = file
+        result, fingerprint = cache.lookup(file_path, log.size, log.mtime_ns)
+        if result is None:
+            changed.append((file_path, fingerprint))
+        else:
+            results_by_file[file] = result
+    end_stage('discover')
+
+    def on_parsed(done, total, file_path, error):
+        if progress:
+            progress('parse', done, total, os.path.basename(file_path))
+
+    # 多进程并行解析变化的文件，单个文件解析失败不影响其他文件
+    parsed, parse_errors = parse_log_files([path for path, _ in changed], jobs=jobs,
+                                           progress=on_parsed, cancel=cancel)
+    check_cancel()
+    end_stage('parse')
+    removed = cache.prune(log_names)
+    failed_paths = set()
+    for file_path, error in parse_errors:
+        print(f"解析文件 {os.path.basename(file_path)} 时出错: {error}", file=sys.stderr)
+        failed_paths.add(file_path)
+        old_ip = cache.discard(file_path)
+        if old_ip:
+            removed.append(old_ip)
+    for (file_path, fingerprint), result in zip(
+            [item for item in changed if item[0] not in failed_paths], parsed):
+        cache.store(file_path, fingerprint, result)
+        results_by_file[file_names[file_path]] = result
+
+    all_results = [results_by_file[f] for f in log_names if f in results_by_file]
+    check_results, superseded = latest_per_device(results_by_file, log_names)
+    # 删除的日志可能是某个 IP 最新的一份，此时该 IP 改为显示较旧的日志，页面也要重新生成
+    changed_ips = {device.ip for device in parsed} | set(removed)
+
+    # 删除已不存在的日志对应的设备页面
+    current_ips = {device.ip for device in check_results}
+    for ip in removed:
+        if ip not in current_ips:
+            page = os.path.join(output_dir, f'device_{ip}.html')
+            if os.path.exists(page):
+                os.remove(page)
+
+    rendered = 0
+    if bundle:
+        # 页面只写进单文件报告；已过期的页面文件删掉，以后按目录输出时会重新生成
+        for ip in changed_ips:
+            page = os.path.join(output_dir, f'device_{ip}.html')
+            if os.path.exists(page):
+                os.remove(page)
+    else:
+        # 样式和脚本写成共享资源文件；设备页面引用的资源版本变化时所有设备页面都要重新生成
+        assets = HTMLGenerator.write_assets(output_dir)
+        device_assets = {key: assets[key] for key in ('device_css', 'device_js')}
+        rerender_all = cache.meta.get('device_assets') != device_assets
+        cache.meta['device_assets'] = device_assets
+
+        # 只重新生成变化的设备页面，最后写 index.html，取消时不会留下指向缺失页面的索引
+        total = len(check_results)
+        for i, device in enumerate(check_results, 1):
+            check_cancel()
+            page = os.path.join(output_dir, f'device_{device.ip}.html')
+            if rerender_all or device.ip in changed_ips or not os.path.exists(page):
+                write_device_page(device, output_dir, assets)
+                rendered += 1
+            if progress:
+                progress('render', i, total, device.ip)
+
+        end_stage('render')
+
+    degrading = None
+    if store:
+        # 本次解析的结果覆盖写入，缓存命中但库中还没有的结果补充写入，
+        # 再根据历史指标计算趋势，在索引页标出正在恶化的设备
+        with ReportStore(store) as db:
+            existing = db.existing_keys()
+            parsed_ids = {id(result) for result in parsed}
+            # 同一设备较旧的日志不显示在报告中，但仍写入结果库作为历史记录
+            db.ingest(materialize(result) for result in all_results
+                      if id(result) in parsed_ids or (result.ip, result.check_time) not in existing)
+            degrading = load_degrading(db)
+        end_stage('store')
+
+    bundle_path = None
+    if bundle:
+        import report_bundle
+        bundle_path = report_bundle.write_bundle(bundle, check_results, output_dir, index_mode, degrading,
+                                                 progress, check_cancel)
+        rendered = len(check_results)
+        cache.save()
+        end_stage('bundle')
+    else:
+        write_overview_page(check_results, output_dir, assets, build_status_index(check_results))
+        end_stage('overview')
+        write_index_page(check_results, output_dir, assets, index_mode, degrading)
+        cache.save()
+        end_stage('index')
+
+    alert_devices, alerts = count_alerts(check_results)
+    return {'devices': len(check_results), 'alert_devices': alert_devices, 'alerts': alerts,
+            'rendered': rendered, 'errors': parse_errors, 'timings': timings, 'bundle': bundle_path,
+            'superseded': superseded}
+
+def render_from_store(db_path, output_dir, progress=None, cancel=None, index_mode='auto',
+                      since=None, until=None, bundle=None):
+    """不读取日志，直接用 ReportStore 中每台设备最新的巡检结果生成报告
+
+    since/until 限定巡检时间范围，bundle 与 build_report 相同，返回值格式与 build_report 相同。
+    """
+    timings = {}
+    started = time.perf_counter()
+    with ReportStore(db_path) as db:
+        check_results = db.load_results(since=since, until=until)
+        degrading = load_degrading(db)
+    timings['load'] = round(time.perf_counter() - started, 3)
+
+    def check_cancel():
+        if cancel is not None and cancel.is_set():
+            raise ReportCancelled()
+
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    total = len(check_results)
+    bundle_path = None
+    if bundle:
+        import report_bundle
+        bundle_path = report_bundle.write_bundle(bundle, check_results, output_dir, index_mode, degrading,
+                                                 progress, check_cancel)
+        timings['bundle'] = round(time.perf_counter() - started, 3)
+    else:
+        assets = HTMLGenerator.write_assets(output_dir)
+        for i, device in enumerate(check_results, 1):
+            check_cancel()
+            write_device_page(device, output_dir, assets)
+            if progress:
+                progress('render', i, total, device.ip)
+        timings['render'] = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        write_overview_page(check_results, output_dir, assets, build_status_index(check_results))
+        timings['overview'] = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        write_index_page(check_results, output_dir, assets, index_mode, degrading)
+        timings['index'] = round(time.perf_counter() - started, 3)
+
+    alert_devices, alerts = count_alerts(check_results)
+    return {'devices': total, 'alert_devices': alert_devices, 'alerts': alerts,
+            'rendered': total, 'errors': [], 'timings': timings, 'bundle': bundle_path, 'superseded': 0}
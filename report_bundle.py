@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""把整份报告写成单个文件
+
+上千台设备的报告是上千个小文件，从跳板机拷出、放到共享目录都很慢。
+zip 格式把 index.html、告警总览页、各设备页面和共享资源写进一个压缩包，每个页面单独压缩，
+解压后与普通输出目录相同；html 格式是一个自包含的 HTML 文件，设备页面 gzip
+压缩后内嵌，点击时才在浏览器中解压显示。两种格式都边生成边写入，
+写完后才替换目标文件。
+"""
+
+import base64
+import io
+import json
+import os
+import zipfile
+import zlib
+
+from html_generator import BUNDLE_DEVICE_ASSETS, HTMLGenerator
+from report_builder import generate_index_html
+
+# 单文件报告格式及默认文件名
+BUNDLE_FORMATS = {
+    'zip': 'system_check_report.zip',
+    'html': 'system_check_report.html',
+}
+# 压缩级别：9 比 6 只小几个百分点，耗时却多出一倍以上
+COMPRESS_LEVEL = 6
+# 攒够这么多压缩后的字节再做一次 base64 编码
+BASE64_BATCH = 48 * 1024
+
+
+class GzipBase64Writer:
+    """写入的文本依次做 UTF-8 编码、gzip 压缩和 base64 编码后写入 out，不缓存整页"""
+
+    def __init__(self, out, level=COMPRESS_LEVEL):
+        self.out = out
+        # wbits=31 输出 gzip 格式，头部时间戳为 0，相同内容得到相同结果
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        # 页面由许多小片段组成，压缩结果攒到一定大小再做 base64 编码；
+        # base64 按 3 字节一组编码，不足一组的留到下一次
+        self.pending = b''
+
+    def write(self, text):
+        self._emit(self.compressor.compress(text.encode('utf-8')))
+        return len(text)
+
+    def close(self):
+        self._emit(self.compressor.flush(), final=True)
+
+    def _emit(self, data, final=False):
+        data = self.pending + data
+        if not final and len(data) < BASE64_BATCH:
+            self.pending = data
+            return
+        cut = len(data) if final else len(data) - len(data) % 3
+        self.pending = data[cut:]
+        if cut:
+            self.out.write(base64.b64encode(data[:cut]).decode('ascii'))
+
+def _replace_when_done(path, write):
+    """write(临时文件路径) 成功后替换 path，失败或取消时删除临时文件"""
+    tmp_path = path + '.tmp'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_zip_bundle(check_results, path, index_mode='auto', degrading=None, progress=None,
+                     check_cancel=None):
+    """把报告写成 zip 压缩包，目录结构与普通输出目录相同"""
+    def write(tmp_path):
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zf:
+            assets = {}
+            for key, href, data in HTMLGenerator.asset_files():
+                zf.writestr(href, data)
+                assets[key] = href
+            total = len(check_results)
+            for i, device in enumerate(check_results, 1):
+                if check_cancel:
+                    check_cancel()
+                with io.TextIOWrapper(zf.open(f'device_{device.ip}.html', 'w'), encoding='utf-8') as f:
+                    HTMLGenerator.write_device_detail_page(device, f, assets)
+                if progress:
+                    progress('render', i, total, device.ip)
+            with io.TextIOWrapper(zf.open('overview.html', 'w'), encoding='utf-8') as f:
+                f.write(HTMLGenerator.generate_overview_page(check_results, assets))
+            with io.TextIOWrapper(zf.open('index.html', 'w'), encoding='utf-8') as f:
+                f.write(generate_index_html(check_results, assets, index_mode, degrading))
+
+    _replace_when_done(path, write)
+
+def write_html_bundle(check_results, path, index_mode='auto', degrading=None, progress=None,
+                      check_cancel=None):
+    """把报告写成单个 HTML 文件，样式和脚本内联，设备页面压缩后内嵌
+
+    查看脚本只处理设备页面，所以不包含告警总览页，索引页上也不显示它的链接。
+    """
+    index_html = generate_index_html(check_results, None, index_mode, degrading, overview=False)
+    head, tail = index_html.rsplit('</body>', 1)
+
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(head)
+            f.write('<script type="application/json" id="device-pages">{')
+            total = len(check_results)
+            for i, device in enumerate(check_results, 1):
+                if check_cancel:
+                    check_cancel()
+                key = json.dumps(device.ip, ensure_ascii=False).replace('</', '<\\/')
+                f.write(f'{"," if i > 1 else ""}{key}:"')
+                # base64 字符不需要 JSON 转义，也不会提前结束 script 标签
+                writer = GzipBase64Writer(f)
+                HTMLGenerator.write_device_detail_page(device, writer, BUNDLE_DEVICE_ASSETS)
+                writer.close()
+                f.write('"')
+                if progress:
+                    progress('render', i, total, device.ip)
+            f.write('}</script>\n')
+            f.write(HTMLGenerator.generate_bundle_scripts())
+            f.write('</body>' + tail)
+
+    _replace_when_done(path, write)
+
+def write_bundle(bundle, check_results, output_dir, index_mode='auto', degrading=None, progress=None,
+                 check_cancel=None):
+    """按 bundle（'zip' 或 'html'）在 output_dir 中写出单文件报告，返回文件路径"""
+    path = os.path.join(output_dir, BUNDLE_FORMATS[bundle])
+    writer = write_zip_bundle if bundle == 'zip' else write_html_bundle
+    writer(check_results, path, index_mode, degrading, progress, check_cancel)
+    return path
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from log_parser import JsonSections, LazySections
+from report_model import DeviceReport
+
+CACHE_FILE = '.report_cache.json'
+# 解析结果或页面格式变化时递增，使旧缓存整体失效
+CACHE_VERSION = 6
+
+# 同一进程中按缓存文件共用的 ReportCache 实例，见 ReportCache.shared
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+def file_digest(file_path):
+    """计算文件内容的 SHA-1"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ReportCache:
+    """日志解析/渲染缓存，按文件路径、大小、修改时间和内容哈希判断是否变化
+
+    缓存文件保存在 cache_dir 中。条目以日志相对 log_dir 的路径（/ 分隔）为键，
+    未指定 log_dir 时以文件名为键；日志都在 log_dir 顶层时两者相同。
+    各方法线程安全，图形界面生成报告和本地报告服务可以共用一个实例（见 shared）。
+    """
+
+    def __init__(self, cache_dir, log_dir=None):
+        self.path = os.path.join(cache_dir, CACHE_FILE)
+        self.log_dir = log_dir
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.meta = {}  # 与具体日志无关的信息，如上次生成页面时使用的静态资源
+        self.file_state = None  # 上次读取或保存后缓存文件的 (修改时间, 大小)
+        self.load()
+
+    def stat_file(self):
+        """缓存文件当前的 (修改时间, 大小)，不存在时返回 None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """读取缓存文件，版本不符或损坏时视为空缓存"""
+        self.entries, self.meta = {}, {}
+        self.file_state = self.stat_file()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == CACHE_VERSION:
+            self.entries = data.get('entries', {})
+            self.meta = data.get('meta', {})
+
+    @classmethod
+    def shared(cls, cache_dir, log_dir=None):
+        """返回本进程中该缓存文件共用的实例，第一次调用时从文件读取
+
+        同一进程中的多个使用者（如图形界面的 build_report 和本地报告服务）各自读写同一个
+        缓存文件时，后保存的会覆盖先保存的条目；共用一个实例则互相可见。
+        缓存文件被其他进程改写或删除（如删除了输出目录）时重新读取。
+        """
+        key = (os.path.abspath(os.path.join(cache_dir, CACHE_FILE)),
+               os.path.abspath(log_dir) if log_dir is not None else None)
+        with _shared_lock:
+            cache = _shared_caches.get(key)
+            if cache is None:
+                cache = _shared_caches[key] = cls(cache_dir, log_dir)
+        with cache.lock:
+            if cache.stat_file() != cache.file_state:
+                cache.load()
+        return cache
+
+    def save(self):
+        """写入缓存文件，先写临时文件再替换，避免中途失败留下半个文件
+
+        临时文件名由 mkstemp 生成，多个进程同时保存时不会写到同一个临时文件。
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix=CACHE_FILE + '.', suffix='.tmp',
+                                        dir=os.path.dirname(self.path) or '.')
+        try:
+            with self.lock:
+                with open(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'version': CACHE_VERSION, 'meta': self.meta, 'entries': self.entries},
+                              f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self.file_state = self.stat_file()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def key(self, file_path):
+        """文件在缓存中的键"""
+        if self.log_dir is None:
+            return os.path.basename(file_path)
+        return os.path.relpath(file_path, self.log_dir).replace(os.sep, '/')
+
+    def lookup(self, file_path, size=None, mtime_ns=None):
+        """返回 (缓存的解析结果或 None, 当前文件指纹)
+
+        size/mtime_ns 为查找日志时已经取得的文件大小和修改时间（见 log_discovery.LogFile），
+        未提供时 stat 文件。
+        """
+        if size is None or mtime_ns is None:
+            stat = os.stat(file_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        fingerprint = {'size': size, 'mtime_ns': mtime_ns}
+        with self.lock:
+            entry = self.entries.get(self.key(file_path))
+            if entry is None or entry['size'] != size:
+                return None, fingerprint
+            if entry['mtime_ns'] != mtime_ns:
+                # 修改时间变了但内容可能没变（如重新拷贝），用哈希确认
+                fingerprint['sha1'] = file_digest(file_path)
+                if fingerprint['sha1'] != entry['sha1']:
+                    return None, fingerprint
+                entry['mtime_ns'] = mtime_ns
+            result = entry['result']
+        # 缓存中只保存分段的字节范围，正文在渲染时再从日志中读取
+        spans = {sys.intern(name): tuple(span) for name, span in result['sections'].items()}
+        sections_class = JsonSections if result.get('log_format') == 'json' else LazySections
+        return DeviceReport.from_dict(dict(result, sections=sections_class(file_path, spans))), fingerprint
+
+    def store(self, file_path, fingerprint, result):
+        """记录文件的解析结果"""
+        if 'sha1' not in fingerprint:
+            fingerprint['sha1'] = file_digest(file_path)
+        result = dict(result.to_dict(), sections=result.sections.spans)
+        with self.lock:
+            self.entries[self.key(file_path)] = dict(fingerprint, result=result)
+
+    def discard(self, file_path):
+        """删除文件对应的条目，返回原结果的设备 IP（不存在时为 None）"""
+        with self.lock:
+            entry = self.entries.pop(self.key(file_path), None)
+        return entry['result']['ip'] if entry else None
+
+    def prune(self, file_names):
+        """删除不在 file_names（键的列表）中的条目，返回被删除条目的设备 IP"""
+        keep = set(file_names)
+        with self.lock:
+            removed = [name for name in self.entries if name not in keep]
+            return [self.entries.pop(name)['result']['ip'] for name in removed]
@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+from log_discovery import parse_log_date
+from report_builder import build_report, find_log_files, ReportCancelled
+
+# 文件列表最多显示的行数，更多的文件通过筛选框查找
+FILE_LIST_LIMIT = 2000
+# 筛选框停止输入这么久（毫秒）后再刷新文件列表
+FILTER_DELAY_MS = 150
+
+
+class SystemCheckGUI:
+    def __init__(self, root):
+        """初始化GUI界面"""
+        self.root = root
+        self.root.title("系统巡检报告生成器")
+      
+        # 设置窗口大小和位置
+        window_width = 600
+        window_height = 640
+        screen_width = root.winfo_screenwidth()
+        screen_height = root.winfo_screenheight()
+        x = (screen_width - window_width) // 2
+        y = (screen_height - window_height) // 2
+        self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
+      
+        # 设置整体样式
+        self.root.configure(bg='#f0f0f0')
+        style = ttk.Style()
+        style.configure('TButton', padding=6)
+        style.configure('TLabel', background='#f0f0f0')
+        style.configure('TFrame', background='#f0f0f0')
+      
+        # 创建主框架，使用固定的padding
+        main_frame = ttk.Frame(root, padding="20 20 20 20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+      
+        # 标题
+        title_label = ttk.Label(
+            main_frame, 
+            text="系统巡检报告生成器", 
+            font=('Arial', 16, 'bold')
+        )
+        title_label.pack(pady=(0, 20))
+      
+        # 创建输入区域框架，使用Grid布局
+        input_frame = ttk.Frame(main_frame)
+        input_frame.pack(fill=tk.X, pady=(0, 20))
+        input_frame.grid_columnconfigure(1, weight=1)  # 让输入框列可以扩展
+      
+        # 日志目录选择（使用Grid布局）
+        dir_label = ttk.Label(
+            input_frame, 
+            text="日志目录:",
+            width=10,
+            anchor='e'  # 右对齐
+        )
+        dir_label.grid(row=0, column=0, padx=(0, 10), pady=5, sticky='e')
+      
+        self.dir_entry = ttk.Entry(input_frame)
+        self.dir_entry.grid(row=0, column=1, padx=(0, 10), pady=5, sticky='ew')
+      
+        browse_btn = ttk.Button(
+            input_frame,
+            text="浏览",
+            command=self.browse_directory,
+            width=10
+        )
+        browse_btn.grid(row=0, column=2, pady=5)
+        # 手工输入目录后回车也可以查找
+        self.dir_entry.bind('<Return>', self.on_directory_entered)
+      
+        # 日志查找条件：子目录、日期范围和 IP 前缀，修改后重新查找
+        filter_frame = ttk.Frame(main_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+      
+        self.recursive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            filter_frame,
+            text="包含子目录",
+            variable=self.recursive_var,
+            command=self.start_discovery
+        ).pack(side=tk.LEFT, padx=(5, 10))
+      
+        ttk.Label(filter_frame, text="日期").pack(side=tk.LEFT)
+        self.since_entry = ttk.Entry(filter_frame, width=11)
+        self.since_entry.pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(filter_frame, text="至").pack(side=tk.LEFT, padx=3)
+        self.until_entry = ttk.Entry(filter_frame, width=11)
+        self.until_entry.pack(side=tk.LEFT)
+      
+        ttk.Label(filter_frame, text="IP 前缀").pack(side=tk.LEFT, padx=(10, 5))
+        self.ip_prefix_entry = ttk.Entry(filter_frame, width=14)
+        self.ip_prefix_entry.pack(side=tk.LEFT)
+      
+        for entry in (self.since_entry, self.until_entry, self.ip_prefix_entry):
+            entry.bind('<Return>', lambda event: self.start_discovery())
+      
+        ttk.Button(
+            filter_frame,
+            text="查找",
+            command=self.start_discovery,
+            width=8
+        ).pack(side=tk.LEFT, padx=(10, 0))
+      
+        # 创建文件列表框架，减小高度占比
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+      
+        # 标签和筛选框，筛选只影响列表显示，生成报告时使用全部找到的日志
+        list_header = ttk.Frame(list_frame)
+        list_header.pack(fill=tk.X, padx=5, pady=(0, 5))
+      
+        self.list_label = ttk.Label(
+            list_header,
+            text="发现的日志文件:",
+            anchor='w'
+        )
+        self.list_label.pack(side=tk.LEFT)
+      
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', self.schedule_file_list)
+        search_entry = ttk.Entry(list_header, textvariable=self.search_var, width=24)
+        search_entry.pack(side=tk.RIGHT)
+        ttk.Label(list_header, text="筛选:").pack(side=tk.RIGHT, padx=(0, 5))
+      
+        # 创建文件列表框和滚动条，设置合适的高度
+        list_scroll = ttk.Scrollbar(list_frame)
+        list_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+      
+        self.file_listbox = tk.Listbox(
+            list_frame,
+            height=8,  # 调整显示行数
+            yscrollcommand=list_scroll.set,
+            selectmode=tk.EXTENDED,
+            font=('Courier', 9)
+        )
+        self.file_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
+        list_scroll.config(command=self.file_listbox.yview)
+      
+        # 创建按钮区域框架
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(10, 20))  # 增加上边距
+      
+        # 按钮水平布局框架
+        buttons_horizontal = ttk.Frame(button_frame)
+        buttons_horizontal.pack()
+      
+        # 生成报告按钮
+        self.generate_btn = ttk.Button(
+            buttons_horizontal,
+            text="生成报告",
+            command=self.generate_report,
+            width=20
+        )
+        self.generate_btn.pack(side=tk.LEFT, padx=5)
+      
+        # 取消按钮，仅在生成报告过程中可用
+        self.cancel_btn = ttk.Button(
+            buttons_horizontal,
+            text="取消",
+            command=self.cancel_report,
+            width=10,
+            state='disabled'
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+      
+        # 查看报告按钮
+        self.view_btn = ttk.Button(
+            buttons_horizontal,
+            text="查看报告",
+            command=self.view_report,
+            width=20,
+            state='disabled'  # 初始状态为禁用
+        )
+        self.view_btn.pack(side=tk.LEFT, padx=5)
+      
+        # 状态显示区域
+        self.status_label = ttk.Label(
+            main_frame,
+            text="请选择日志文件目录",
+            wraplength=500,
+            justify=tk.CENTER,
+            font=('Arial', 10)
+        )
+        self.status_label.pack(fill=tk.X, pady=10)
+      
+        # 进度条和耗时/剩余时间/速度
+        self.progress_bar = ttk.Progressbar(main_frame, mode='determinate')
+        self.progress_bar.pack(fill=tk.X, padx=5)
+      
+        self.progress_label = ttk.Label(
+            main_frame,
+            text="",
+            justify=tk.CENTER,
+            font=('Arial', 9)
+        )
+        self.progress_label.pack(fill=tk.X, pady=5)
+      
+        # 版权信息
+        copyright_label = ttk.Label(
+            main_frame,
+            text="© 2024 系统巡检报告生成器",
+            font=('Arial', 8),
+            foreground='gray'
+        )
+        copyright_label.pack(side=tk.BOTTOM, pady=10)
+      
+        # 存储日志目录路径
+        self.log_dir = ""
+      
+        # 后台查找日志的结果：LogFile 列表，查找进行中为 None；log_names 为其中的相对路径，用于筛选显示
+        self.log_files = []
+        self.log_names = []
+        self.filters = {}
+        self.discovery_id = 0
+        self.discovering = False
+        self.discovery_events = queue.Queue()
+        self.filter_job = None
+      
+        # 后台生成报告的线程及其消息队列
+        self.worker = None
+        self.events = queue.Queue()
+        # 查看报告时启动的本地报告服务
+        self.report_server = None
+        # 本次运行中生成的报告：(日志目录, 查找序号, index.html 的修改时间)，用于判断页面是否最新
+        self.report_built = None
+
+    def browse_directory(self):
+        """选择目录对话框"""
+        directory = filedialog.askdirectory(
+            title="选择日志文件目录",
+            initialdir="."
+        )
+        if directory:
+            self.dir_entry.delete(0, tk.END)
+            self.dir_entry.insert(0, directory)
+            self.set_directory(directory)
+
+    def on_directory_entered(self, event):
+        """目录输入框中回车"""
+        directory = self.dir_entry.get().strip()
+        if directory:
+            self.set_directory(directory)
+
+    def set_directory(self, directory):
+        """切换日志目录并在后台查找日志"""
+        self.log_dir = directory
+      
+        # 检查日志文件
+        self.start_discovery()
+      
+        # 检查是否存在报告文件
+        if os.path.exists(os.path.join(directory, 'index.html')):
+            self.view_btn.config(state='normal')
+        else:
+            self.view_btn.config(state='disabled')
+
+    def discovery_filters(self):
+        """界面上的查找条件，日期格式不对时抛出 ValueError"""
+        since = self.since_entry.get().strip()
+        until = self.until_entry.get().strip()
+        # 先校验，避免到后台线程里才报错
+        parse_log_date(since)
+        parse_log_date(until)
+        return {'recursive': self.recursive_var.get(), 'since': since or None, 'until': until or None,
+                'ip_prefix': self.ip_prefix_entry.get().strip() or None}
+
+    def start_discovery(self):
+        """在后台线程中查找日志，大目录也不会卡住界面；之前未完成的查找结果会被丢弃"""
+        if not self.log_dir:
+            return
+        try:
+            filters = self.discovery_filters()
+        except ValueError as e:
+            self.status_label.config(text=f"{str(e)}，请输入 YYYY-MM-DD 格式的日期")
+            return
+          
+        self.discovery_id += 1
+        self.filters = filters
+        self.log_files = None
+        self.status_label.config(text="正在查找日志文件...")
+        threading.Thread(
+            target=self.run_discovery_worker,
+            args=(self.discovery_id, self.log_dir, filters),
+            daemon=True
+        ).start()
+        if not self.discovering:
+            self.discovering = True
+            self.root.after(100, self.poll_discovery)
+
+    def run_discovery_worker(self, discovery_id, log_dir, filters):
+        """后台线程：一次遍历目录找出日志，结果通过队列交给界面线程"""
+        started = time.monotonic()
+        try:
+            log_files = find_log_files(log_dir, **filters)
+            self.discovery_events.put((discovery_id, log_files, None, time.monotonic() - started))
+        except Exception as e:
+            self.discovery_events.put((discovery_id, [], str(e), 0))
+
+    def poll_discovery(self):
+        """定时读取查找结果，只显示最近一次查找的结果"""
+        try:
+            while True:
+                discovery_id, log_files, error, elapsed = self.discovery_events.get_nowait()
+                if discovery_id == self.discovery_id:
+                    self.show_log_files(log_files, error, elapsed)
+        except queue.Empty:
+            pass
+          
+        if self.log_files is None:
+            self.root.after(100, self.poll_discovery)
+        else:
+            self.discovering = False
+
+    def show_log_files(self, log_files, error, elapsed):
+        """保存查找结果并刷新文件列表"""
+        self.log_files = log_files
+        self.log_names = [log.name for log in log_files]
+        self.refresh_file_list()
+        if error:
+            self.status_label.config(text=f"读取目录出错: {error}")
+        elif not log_files:
+            self.status_label.config(text="未找到日志文件")
+        else:
+            self.status_label.config(text=f"找到 {len(log_files)} 个日志文件（耗时 {elapsed:.1f}s）")
+
+    def schedule_file_list(self, *args):
+        """筛选框内容变化后稍等片刻再刷新，连续输入时只刷新一次"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(FILTER_DELAY_MS, self.refresh_file_list)
+
+    def refresh_file_list(self):
+        """按筛选框内容显示文件列表，最多 FILE_LIST_LIMIT 行，一次插入"""
+        self.filter_job = None
+        log_files = self.log_names
+        query = self.search_var.get().strip().lower()
+        matches = [name for name in log_files if query in name.lower()] if query else log_files
+          
+        self.file_listbox.delete(0, tk.END)  # 清空列表
+        if not log_files:
+            self.file_listbox.insert(tk.END, "未找到日志文件")
+        elif not matches:
+            self.file_listbox.insert(tk.END, "没有匹配的日志文件")
+        else:
+            self.file_listbox.insert(tk.END, *matches[:FILE_LIST_LIMIT])
+            if len(matches) > FILE_LIST_LIMIT:
+                self.file_listbox.insert(tk.END, f"…… 另有 {len(matches) - FILE_LIST_LIMIT} 个文件未显示，请输入关键字筛选")
+        shown = f"{len(matches)} / {len(log_files)}" if query else f"{len(log_files)}"
+        self.list_label.config(text=f"发现的日志文件: {shown}")
+
+    def format_service_status(self, content):
+        """格式化服务状态内容"""
+        # 移除所有的 '---' 和 '|'
+        lines = content.split('\n')
+        formatted_lines = []
+      
+        for line in lines:
+            # 跳过空行和只包含分隔符的行
+            if not line.strip() or line.strip().replace('-', '') == '':
+                continue
+          
+            # 移除 '|' 并分割字段
+            fields = [field.strip() for field in line.replace('|', '').split('  ') if field.strip()]
+          
+            # 确保至少有4个字段（服务名称、状态、版本、运行时长）
+            if len(fields) >= 4:
+                # 使用固定宽度格式化每个字段
+                formatted_line = f"{fields[0]:<20} {fields[1]:<10} {fields[2]:<20} {fields[3]:<15}"
+                formatted_lines.append(formatted_line)
+      
+        return '\n'.join(formatted_lines)
+
+    def generate_report(self):
+        """在后台线程中生成报告"""
+        if not self.log_dir:
+            self.status_label.config(text="请先选择日志文件目录")
+            return
+        if self.worker is not None:
+            return
+        if self.log_files is None:
+            self.status_label.config(text="正在查找日志文件，请稍候")
+            return
+        if not self.log_files:
+            self.status_label.config(text="未找到日志文件")
+            return
+          
+        self.generate_btn.config(state='disabled')
+        self.cancel_btn.config(state='normal')
+        self.progress_bar.config(value=0, maximum=1)
+        self.progress_label.config(text="")
+        self.status_label.config(text="正在生成报告...")
+          
+        self.cancel_event = threading.Event()
+        self.started_at = time.monotonic()
+        self.stage = None
+        self.building = (self.log_dir, self.discovery_id)
+        self.worker = threading.Thread(
+            target=self.run_report_worker,
+            args=(self.log_dir, list(self.log_files), self.cancel_event),
+            daemon=True
+        )
+        self.worker.start()
+        self.root.after(100, self.poll_worker)
+
+    def run_report_worker(self, log_dir, log_files, cancel_event):
+        """后台线程：用已经找到的日志生成报告，通过队列把进度和结果交给界面线程"""
+        def on_progress(stage, done, total, name):
+            self.events.put(('progress', stage, done, total, name))
+          
+        try:
+            summary = build_report(log_dir, progress=on_progress, cancel=cancel_event, log_files=log_files)
+            self.events.put(('done', summary))
+        except ReportCancelled:
+            self.events.put(('cancelled',))
+        except Exception as e:
+            print(f"生成报告时出错: {str(e)}")
+            self.events.put(('error', str(e)))
+
+    def poll_worker(self):
+        """定时读取后台线程的消息并刷新界面"""
+        finished = False
+        try:
+            while True:
+                event = self.events.get_nowait()
+                if event[0] == 'progress':
+                    self.show_progress(*event[1:])
+                else:
+                    self.finish_report(event)
+                    finished = True
+        except queue.Empty:
+            pass
+          
+        if not finished:
+            self.root.after(100, self.poll_worker)
+
+    def show_progress(self, stage, done, total, name):
+        """更新进度条、耗时、剩余时间和处理速度"""
+        now = time.monotonic()
+        if stage != self.stage:
+            # 每个阶段单独计算速度和剩余时间
+            self.stage = stage
+            self.stage_started_at = now
+        stage_elapsed = now - self.stage_started_at
+        rate = done / stage_elapsed if stage_elapsed > 0 else 0
+        eta = (total - done) / rate if rate > 0 else 0
+          
+        stage_text = "正在解析" if stage == 'parse' else "正在生成设备报告"
+        self.progress_bar.config(maximum=max(total, 1), value=done)
+        self.status_label.config(text=f"{stage_text}: {name} ({done}/{total})")
+        self.progress_label.config(
+            text=f"已用时 {now - self.started_at:.1f}s | 剩余约 {eta:.1f}s | {rate:.1f} 个文件/秒"
+        )
+
+    def finish_report(self, event):
+        """后台线程结束后恢复界面状态并显示结果"""
+        self.worker = None
+        self.generate_btn.config(state='normal')
+        self.cancel_btn.config(state='disabled')
+        elapsed = time.monotonic() - self.started_at
+          
+        if event[0] == 'cancelled':
+            self.status_label.config(text="已取消生成报告")
+            return
+        if event[0] == 'error':
+            self.status_label.config(text=f"错误: {event[1]}")
+            return
+          
+        summary = event[1]
+        if not summary['devices'] and not summary['errors']:
+            self.status_label.config(text="未找到日志文件")
+            return
+          
+        parse_errors = summary['errors']
+        message = f"成功生成报告！处理了 {summary['devices']} 个设备的数据，更新 {summary['rendered']} 个设备页面"
+        if summary['superseded']:
+            message += f"，同一设备只显示最新的日志，忽略较旧的 {summary['superseded']} 个"
+        if parse_errors:
+            failed = ', '.join(os.path.basename(path) for path, _ in parse_errors[:5])
+            more = ' 等' if len(parse_errors) > 5 else ''
+            message += f"，{len(parse_errors)} 个文件解析失败: {failed}{more}"
+        self.status_label.config(text=message)
+        self.progress_label.config(text=f"总耗时 {elapsed:.1f}s")
+        self.view_btn.config(state='normal')
+        index_mtime = self.index_mtime(self.building[0])
+        self.report_built = self.building + (index_mtime,) if index_mtime is not None else None
+
+    def cancel_report(self):
+        """请求取消正在进行的报告生成"""
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state='disabled')
+            self.status_label.config(text="正在取消...")
+
+    @staticmethod
+    def index_mtime(log_dir):
+        """报告目录中 index.html 的修改时间，不存在时返回 None"""
+        try:
+            return os.stat(os.path.join(log_dir, 'index.html')).st_mtime_ns
+        except OSError:
+            return None
+
+    def report_is_fresh(self):
+        """本次运行中为当前目录和当前找到的日志生成过报告，且之后没有被改写"""
+        if self.report_built is None:
+            return False
+        log_dir, discovery_id, index_mtime = self.report_built
+        return ((log_dir, discovery_id) == (self.log_dir, self.discovery_id)
+                and self.index_mtime(log_dir) == index_mtime)
+
+    def view_report(self):
+        """打开报告
+
+        本次运行中刚生成的报告直接打开页面文件；否则通过本地报告服务打开，
+        设备页面在浏览器访问时才生成。
+        """
+        if not self.log_dir:
+            self.status_label.config(text="未找到报告目录")
+            return
+
+        try:
+            import webbrowser
+            if self.report_is_fresh():
+                # 页面已经全部生成，不必让服务再加载一遍日志
+                from pathlib import Path
+                index_path = Path(self.log_dir, 'index.html').resolve()
+                webbrowser.open(index_path.as_uri())
+                self.status_label.config(text=f"已打开报告: {index_path}")
+                return
+
+            import report_server
+            server = self.report_server
+            if (server is None or server.library.log_dir != self.log_dir
+                    or server.library.filters != self.filters):
+                if server is not None:
+                    server.shutdown()
+                    server.server_close()
+                server = self.report_server = report_server.serve_in_background(self.log_dir,
+                                                                                filters=self.filters)
+            webbrowser.open(server.url)
+            self.status_label.config(text=f"已打开报告: {server.url}")
+        except Exception as e:
+            self.status_label.config(text=f"打开报告失败: {str(e)}")
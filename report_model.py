@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import sys
+from functools import lru_cache
+
+# 巡检总结中的检查项与日志分段名称的对应关系
+SECTION_MAPPING = {
+    '内存': '内存使用',
+    '磁盘': '磁盘使用',
+    '服务状态': '服务状态',
+    '硬件状态': '硬件错误检查',
+    'Core文件': 'Core文件检查',
+    '内存池': 'Updpi内存池检查',
+    '回填率': '回填率',
+    '流量情况': '流量情况',
+    '策略加载': '策略加载信息',
+    '策略下发': '策略下发检查'
+}
+# 分段名称到检查项的反向映射
+CHECK_MAPPING = {section: check for check, section in SECTION_MAPPING.items()}
+
+# 状态等级
+SEVERITY_OTHER = 0
+SEVERITY_OK = 1
+SEVERITY_ALERT = 2
+
+# 不同的巡检总结文本数量有限（主要是各项 OK/告警 的组合），缓存解析结果
+SUMMARY_CACHE_SIZE = 4096
+
+
+def section_name(check):
+    """检查项对应的分段名称，没有对应关系时原样返回"""
+    return SECTION_MAPPING.get(check, check)
+
+def check_name(section):
+    """分段名称对应的检查项，没有对应关系时原样返回"""
+    return CHECK_MAPPING.get(section, section)
+
+def status_severity(status):
+    """状态文本的等级：含"告警"为告警，含 OK 为正常，其余为其他"""
+    if '告警' in status:
+        return SEVERITY_ALERT
+    if 'OK' in status.upper():
+        return SEVERITY_OK
+    return SEVERITY_OTHER
+
+@lru_cache(maxsize=SUMMARY_CACHE_SIZE)
+def parse_summary(summary):
+    """把巡检总结拆成 ((检查项, 状态, 等级), ...)，检查项名称驻留为同一个字符串对象"""
+    items = []
+    for item in summary.split(', '):
+        if ': ' not in item:
+            continue
+        check, status = item.split(': ', 1)
+        items.append((sys.intern(check), status, status_severity(status)))
+    return tuple(items)
+
+def build_status_index(reports):
+    """一次遍历巡检总结，建立 {(检查项, 状态): [设备序号, ...]} 倒排索引
+
+    设备序号为 reports 中的位置，升序排列；键按首次出现的顺序排列。
+    """
+    index = {}
+    for i, report in enumerate(reports):
+        for check, status, _ in report.items:
+            members = index.get((check, status))
+            if members is None:
+                index[(check, status)] = [i]
+            else:
+                members.append(i)
+    return index
+
+class DeviceReport:
+    """一台设备一次巡检的解析结果
+
+    sections 为 {分段名称: 正文} 映射，解析日志时是按需读取的 LazySections；
+    timings 为 {分段名称: (耗时毫秒, 外部命令数)}；metrics 为 JSON 记录格式日志中
+    脚本上报的数值指标，文本日志为 None；log_format 为 'text' 或 'json'。
+    """
+
+    __slots__ = ('ip', 'hostname', 'check_time', 'sections', 'summary', 'timings', 'metrics',
+                 'log_format')
+
+    def __init__(self, ip, hostname, check_time, sections, summary, timings=None, metrics=None,
+                 log_format='text'):
+        self.ip = ip
+        self.hostname = hostname
+        self.check_time = check_time
+        self.sections = sections
+        self.summary = summary
+        self.timings = timings if timings is not None else {}
+        self.metrics = metrics
+        self.log_format = log_format
+
+    def __repr__(self):
+        return f'DeviceReport(ip={self.ip!r}, hostname={self.hostname!r}, check_time={self.check_time!r})'
+
+    @property
+    def items(self):
+        """解析后的巡检总结 ((检查项, 状态, 等级), ...)"""
+        return parse_summary(self.summary)
+
+    @property
+    def alerts(self):
+        """告警项数"""
+        return sum(1 for _, _, severity in self.items if severity == SEVERITY_ALERT)
+
+    @property
+    def warning_sections(self):
+        """巡检总结中告警的检查项对应的分段名称"""
+        return {section_name(check) for check, _, severity in self.items if severity == SEVERITY_ALERT}
+
+    def replace(self, **changes):
+        """返回替换部分字段后的新对象"""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return DeviceReport(**fields)
+
+    def to_dict(self):
+        """转换为可 JSON 序列化的 dict（sections 原样保留，由调用方决定如何保存）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """由 to_dict 的结果重建，缺少的可选字段取默认值；JSON 中的元组会变成列表，这里还原"""
+        timings = {name: tuple(value) for name, value in data.get('timings', {}).items()}
+        return cls(data['ip'], data['hostname'], data['check_time'], data['sections'], data['summary'],
+                   timings, data.get('metrics'), data.get('log_format', 'text'))
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""本地报告服务
+
+解析结果常驻内存，index.html、overview.html 和 device_<ip>.html 在第一次被请求时才生成，
+生成的页面放在按字节数限制大小的 LRU 缓存中。响应带 ETag 和 Last-Modified，
+浏览器再次请求未变化的页面时返回 304；客户端支持时以 gzip 压缩传输。
+每次请求前检查日志目录（至多每 RELOAD_INTERVAL 秒一次），只重新解析变化的日志，
+并只让这些设备的页面以及索引页、告警总览页失效。
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from html_generator import HTMLGenerator
+from log_parser import parse_log_files
+from log_discovery import discover_logs
+from report_builder import generate_index_html, latest_per_device
+from report_cache import ReportCache
+
+DEFAULT_PORT = 8765
+# 页面缓存的总字节数上限（未压缩和 gzip 后的内容都计入）
+PAGE_CACHE_BYTES = 64 * 1024 * 1024
+# 两次检查日志目录的最短间隔（秒）
+RELOAD_INTERVAL = 2.0
+# 小于该字节数的响应不压缩
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+HTML_TYPE = 'text/html; charset=utf-8'
+ASSET_TYPES = {'css': 'text/css; charset=utf-8', 'js': 'application/javascript; charset=utf-8'}
+# 由全部设备汇总生成的页面，任一设备变化都会失效
+SUMMARY_PAGES = ('index.html', 'overview.html')
+
+
+class RenderedPage:
+    """生成好的页面：正文、校验值和按需生成的 gzip 内容"""
+
+    __slots__ = ('body', 'content_type', 'etag', 'last_modified', 'gzipped')
+
+    def __init__(self, body, content_type, last_modified):
+        self.body = body
+        self.content_type = content_type
+        # ETag 取内容哈希，页面生成方式变化时也能正确失效
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.last_modified = last_modified
+        self.gzipped = None
+
+    @property
+    def size(self):
+        return len(self.body) + len(self.gzipped or b'')
+
+    def gzip_body(self):
+        if self.gzipped is None:
+            self.gzipped = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+        return self.gzipped
+
+class PageCache:
+    """按字节数限制大小的 LRU 缓存，{文件名: RenderedPage}"""
+
+    def __init__(self, max_bytes=PAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.pages = OrderedDict()
+        self.sizes = {}  # 记录放入时的大小，gzip 内容生成后在下次访问时补记
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name):
+        page = self.pages.get(name)
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.pages.move_to_end(name)
+        self._resize(name, page.size)
+        return page
+
+    def put(self, name, page):
+        self.discard(name)
+        self.pages[name] = page
+        self.sizes[name] = 0
+        self._resize(name, page.size)
+
+    def discard(self, name):
+        if self.pages.pop(name, None) is not None:
+            self.total -= self.sizes.pop(name)
+
+    def clear(self):
+        self.pages.clear()
+        self.sizes.clear()
+        self.total = 0
+
+    def _resize(self, name, size):
+        self.total += size - self.sizes[name]
+        self.sizes[name] = size
+        # 至少保留刚访问的页面，单个页面超过上限时也能返回
+        while self.total > self.max_bytes and len(self.pages) > 1:
+            oldest = next(iter(self.pages))
+            if oldest == name:
+                break
+            self.discard(oldest)
+
+class ReportLibrary:
+    """内存中的解析结果和页面缓存，线程安全
+
+    解析结果与 build_report 共用 ReportCache，cache_dir 为报告输出目录，默认与
+    日志目录相同。命令行或图形界面生成过报告后，启动服务时不需要重新解析日志。
+    filters 为 log_discovery.discover_logs 的筛选参数，每次检查日志目录时使用。
+    """
+
+    def __init__(self, log_dir, jobs=None, index_mode='auto', cache_dir=None, cache_bytes=PAGE_CACHE_BYTES,
+                 filters=None):
+        self.log_dir = log_dir
+        self.filters = dict(filters or {})
+        self.jobs = jobs
+        self.index_mode = index_mode
+        self.lock = threading.Lock()
+        self.cache = ReportCache.shared(cache_dir or log_dir, log_dir)
+        self.results = {}  # {文件名: DeviceReport}，按文件名排序；文件名为相对日志目录的路径
+        self.stats = {}  # {文件名: (大小, 修改时间)}，未变化的文件不再查缓存
+        self.reports = []  # 每个 IP 最新的一份结果，用于索引页和告警总览页
+        self.devices = {}  # {页面文件名: (DeviceReport, 日志修改时间)}
+        self.errors = {}  # {文件名: 解析错误}
+        self.pages = PageCache(cache_bytes)
+        # 页面被 LRU 淘汰后仍保留校验值，浏览器带着旧 ETag 请求时不用重新生成就能返回 304
+        self.validators = {}  # {文件名: (ETag, 修改时间)}
+        self.index_modified = time.time()
+        self.date = None
+        self.last_check = 0.0
+        self.reloads = 0
+
+        self.assets = {}  # {相对路径: RenderedPage}
+        self.asset_hrefs = {}  # {键: 相对路径}
+        for key, href, data in HTMLGenerator.asset_files():
+            self.assets[href] = RenderedPage(data, ASSET_TYPES[href.rsplit('.', 1)[1]], self.index_modified)
+            self.asset_hrefs[key] = href
+
+    def refresh(self, force=False):
+        """检查日志目录，只重新解析新增或变化的日志，返回变化的文件数"""
+        with self.lock:
+            now = time.monotonic()
+            if not force and now - self.last_check < RELOAD_INTERVAL:
+                return 0
+            self.last_check = now
+
+            # 页面中显示生成日期，跨天后全部失效
+            today = datetime.now().strftime('%Y-%m-%d')
+            if today != self.date:
+                self.date = today
+                self.pages.clear()
+                self.validators.clear()
+
+            # 遍历目录时已取得大小和修改时间，未变化的文件不必再 stat
+            log_files = []
+            results, stats, changed, file_names = {}, {}, [], {}
+            for log in discover_logs(self.log_dir, **self.filters):
+                file = log.name
+                file_path = os.path.join(self.log_dir, file)
+                log_files.append(file)
+                file_names[file_path] = file
+                stats[file] = (log.size, log.mtime_ns)
+                if self.stats.get(file) == stats[file]:
+                    # 解析失败的文件没有结果，文件再次变化前不重试
+                    if file in self.results:
+                        results[file] = self.results[file]
+                    continue
+                try:
+                    result, fingerprint = self.cache.lookup(file_path, log.size, log.mtime_ns)
+                except OSError:
+                    continue  # 列出目录后被删除
+                if result is None:
+                    changed.append((file_path, fingerprint))
+                else:
+                    results[file] = result
+
+            parsed, errors = parse_log_files([path for path, _ in changed], jobs=self.jobs)
+            failed_paths = set()
+            for file_path, error in errors:
+                failed_paths.add(file_path)
+                self.cache.discard(file_path)
+                self.errors[file_names[file_path]] = error
+            for (file_path, fingerprint), result in zip(
+                    [item for item in changed if item[0] not in failed_paths], parsed):
+                self.cache.store(file_path, fingerprint, result)
+                results[file_names[file_path]] = result
+
+            # 与上次结果不是同一个对象的文件都算变化（新增、修改、缓存命中的替换和删除）
+            changed_files = {file for file in set(results) | set(self.results)
+                             if results.get(file) is not self.results.get(file)}
+            self.errors = {file: error for file, error in self.errors.items()
+                           if file in stats and file not in results}
+            if not changed_files:
+                self.stats = stats
+                return 0
+
+            for file in changed_files:
+                for result in (self.results.get(file), results.get(file)):
+                    if result is not None:
+                        self.invalidate(f'device_{result.ip}.html')
+            for name in SUMMARY_PAGES:
+                self.invalidate(name)
+            self.index_modified = time.time()
+
+            self.results = {file: results[file] for file in log_files if file in results}
+            self.stats = stats
+            # 同一 IP 有多份日志时只显示最新的一份，与 build_report 相同
+            self.reports, _ = latest_per_device(self.results, log_files)
+            files = {id(result): file for file, result in self.results.items()}
+            self.devices = {f'device_{result.ip}.html': (result, stats[files[id(result)]][1] / 1e9)
+                            for result in self.reports}
+            # 首次加载时结果全部来自缓存，不必重写缓存文件
+            if self.cache.prune(log_files) or changed:
+                self.cache.save()
+            self.reloads += 1
+            return len(changed_files)
+
+    def invalidate(self, name):
+        self.pages.discard(name)
+        self.validators.pop(name, None)
+
+    def resolve(self, path):
+        """URL 路径对应的页面文件名，不存在时返回 None"""
+        name = path.lstrip('/') or 'index.html'
+        if name in SUMMARY_PAGES or name in self.devices:
+            return name
+        return None
+
+    def validator(self, name):
+        """页面当前的 (ETag, 修改时间)，尚未生成过时返回 None"""
+        with self.lock:
+            return self.validators.get(name)
+
+    def page(self, name):
+        """返回页面，缓存中没有时生成；页面已不存在时返回 None"""
+        with self.lock:
+            page = self.pages.get(name)
+            if page is not None:
+                return page
+            if name == 'index.html':
+                html = generate_index_html(self.reports, self.asset_hrefs, self.index_mode)
+                page = RenderedPage(html.encode('utf-8'), HTML_TYPE, self.index_modified)
+            elif name == 'overview.html':
+                html = HTMLGenerator.generate_overview_page(self.reports, self.asset_hrefs)
+                page = RenderedPage(html.encode('utf-8'), HTML_TYPE, self.index_modified)
+            elif name in self.devices:
+                device, modified = self.devices[name]
+                out = io.StringIO()
+                HTMLGenerator.write_device_detail_page(device, out, self.asset_hrefs)
+                page = RenderedPage(out.getvalue().encode('utf-8'), HTML_TYPE, modified)
+            else:
+                return None
+            self.pages.put(name, page)
+            self.validators[name] = (page.etag, page.last_modified)
+            return page
+
+    def status(self):
+        """设备数、解析错误数和缓存命中情况"""
+        with self.lock:
+            return {'devices': len(self.reports), 'errors': len(self.errors), 'reloads': self.reloads,
+                    'cached_pages': len(self.pages.pages), 'cached_bytes': self.pages.total,
+                    'hits': self.pages.hits, 'misses': self.pages.misses}
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'SystemCheckReport/1.0'
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        path = unquote(urlsplit(self.path).path)
+        library = self.server.library
+
+        name = path.lstrip('/')
+        if name in library.assets:
+            # 资源文件名带内容哈希，可以长期缓存
+            self.send_page(library.assets[name], send_body, 'public, max-age=31536000, immutable')
+            return
+
+        library.refresh()
+        name = library.resolve(path)
+        if name is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        validator = library.validator(name)
+        if validator and self.not_modified(*validator):
+            self.send_not_modified(*validator)
+            return
+        page = library.page(name)
+        if page is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        if self.not_modified(page.etag, page.last_modified):
+            self.send_not_modified(page.etag, page.last_modified)
+            return
+        # 页面随日志变化，每次使用前都要向服务端确认
+        self.send_page(page, send_body, 'no-cache')
+
+    def not_modified(self, etag, last_modified):
+        """If-None-Match 优先；没有时按 If-Modified-Since（秒级）判断"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_not_modified(self, etag, last_modified):
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(last_modified, usegmt=True))
+        self.end_headers()
+
+    def send_page(self, page, send_body, cache_control):
+        body = page.body
+        accept_encoding = self.headers.get('Accept-Encoding', '')
+        gzipped = len(body) >= GZIP_MIN_SIZE and 'gzip' in accept_encoding
+        if gzipped:
+            body = page.gzip_body()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', page.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', page.etag)
+        self.send_header('Last-Modified', formatdate(page.last_modified, usegmt=True))
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ReportServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, library, host='127.0.0.1', port=DEFAULT_PORT, verbose=False):
+        super().__init__((host, port), ReportRequestHandler)
+        self.library = library
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+def serve_in_background(log_dir, host='127.0.0.1', port=0, **library_options):
+    """在后台线程中启动服务，port 为 0 时使用任意空闲端口，返回 ReportServer
+
+    日志在第一次请求时才加载。调用 shutdown() 停止。
+    """
+    server = ReportServer(ReportLibrary(log_dir, **library_options), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+from log_parser import normalize_check_time
+from report_model import SEVERITY_ALERT, DeviceReport
+from trend import extract_metrics
+
+# 每个事务插入的报告数
+INSERT_BATCH_SIZE = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    ip TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    check_time TEXT NOT NULL,       -- 日志中的原始时间文本
+    checked_at TEXT,                -- 归一化为 YYYY-MM-DD HH:MM:SS，用于按时间查询
+    summary TEXT NOT NULL,
+    UNIQUE (ip, check_time)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_ip ON reports (ip, checked_at);
+CREATE INDEX IF NOT EXISTS idx_reports_checked_at ON reports (checked_at);
+
+CREATE TABLE IF NOT EXISTS checks (
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,             -- 巡检总结中的检查项，如 回填率
+    status TEXT NOT NULL,           -- 原始状态文本，如 告警 (85.2%)
+    is_alert INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checks_report ON checks (report_id);
+CREATE INDEX IF NOT EXISTS idx_checks_status ON checks (name, is_alert, report_id);
+
+CREATE TABLE IF NOT EXISTS sections (
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sections_report ON sections (report_id);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,             -- 指标名，如 内存使用率、Port0 Mbps
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_report ON metrics (report_id);
+
+CREATE TABLE IF NOT EXISTS timings (
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,             -- 分段名称，如 Updpi内存池检查
+    elapsed_ms INTEGER NOT NULL,
+    commands INTEGER NOT NULL       -- 该检查启动的外部命令数
+);
+CREATE INDEX IF NOT EXISTS idx_timings_report ON timings (report_id);
+'''
+
+
+def metrics_of(result):
+    """JSON 记录格式的日志直接使用脚本上报的指标，文本日志从正文中提取"""
+    if result.metrics is not None:
+        return result.metrics
+    return extract_metrics(result.sections)
+
+class ReportStore:
+    """保存解析结果的本地 SQLite 数据库"""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        # WAL 模式下批量写入不阻塞查询，synchronous=NORMAL 减少 fsync 次数
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def existing_keys(self):
+        """返回库中已有的 (ip, check_time) 集合"""
+        return set(self.conn.execute('SELECT ip, check_time FROM reports'))
+
+    def ingest(self, results):
+        """批量写入解析结果，同一设备同一巡检时间的旧记录会被替换，返回写入条数"""
+        count = 0
+        batch = []
+        for result in results:
+            batch.append(result)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                count += self._insert_batch(batch)
+                batch = []
+        if batch:
+            count += self._insert_batch(batch)
+        return count
+
+    def _insert_batch(self, results):
+        """在一个事务中写入一批解析结果"""
+        with self.conn:
+            for result in results:
+                self.conn.execute('DELETE FROM reports WHERE ip = ? AND check_time = ?',
+                                  (result.ip, result.check_time))
+                report_id = self.conn.execute(
+                    'INSERT INTO reports (ip, hostname, check_time, checked_at, summary) VALUES (?, ?, ?, ?, ?)',
+                    (result.ip, result.hostname, result.check_time,
+                     normalize_check_time(result.check_time), result.summary)
+                ).lastrowid
+                self.conn.executemany(
+                    'INSERT INTO checks (report_id, name, status, is_alert) VALUES (?, ?, ?, ?)',
+                    [(report_id, name, status, int(severity == SEVERITY_ALERT))
+                     for name, status, severity in result.items]
+                )
+                self.conn.executemany(
+                    'INSERT INTO sections (report_id, name, body) VALUES (?, ?, ?)',
+                    [(report_id, name, body) for name, body in result.sections.items()]
+                )
+                self.conn.executemany(
+                    'INSERT INTO metrics (report_id, name, value) VALUES (?, ?, ?)',
+                    [(report_id, name, value) for name, value in metrics_of(result).items()]
+                )
+                self.conn.executemany(
+                    'INSERT INTO timings (report_id, name, elapsed_ms, commands) VALUES (?, ?, ?, ?)',
+                    [(report_id, name, elapsed_ms, commands)
+                     for name, (elapsed_ms, commands) in result.timings.items()]
+                )
+        return len(results)
+
+    def load_results(self, ip=None, since=None, until=None, latest=True):
+        """读取解析结果，返回 DeviceReport 列表（sections 为普通 dict）
+
+        since/until 为 'YYYY-MM-DD[ HH:MM:SS]'，按归一化后的巡检时间过滤；
+        latest 为真时每台设备只返回时间范围内最新的一次巡检。
+        """
+        conditions, params = [], []
+        if ip:
+            conditions.append('ip = ?')
+            params.append(ip)
+        if since:
+            conditions.append('checked_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('checked_at < ?')
+            params.append(until)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+
+        if latest:
+            sql = f'''
+                SELECT id, ip, hostname, check_time, summary FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY ip ORDER BY checked_at DESC, id DESC) AS rn
+                    FROM reports {where}
+                ) WHERE rn = 1 ORDER BY ip'''
+        else:
+            sql = f'SELECT id, ip, hostname, check_time, summary FROM reports {where} ORDER BY ip, checked_at'
+        rows = self.conn.execute(sql, params).fetchall()
+
+        sections = {}
+        for report_id, name, body in self.conn.execute(
+                f'SELECT report_id, name, body FROM sections WHERE report_id IN (SELECT id FROM ({sql})) '
+                f'ORDER BY report_id, rowid', params):
+            sections.setdefault(report_id, {})[name] = body
+
+        timings = {}
+        for report_id, name, elapsed_ms, commands in self.conn.execute(
+                f'SELECT report_id, name, elapsed_ms, commands FROM timings '
+                f'WHERE report_id IN (SELECT id FROM ({sql})) ORDER BY report_id, rowid', params):
+            timings.setdefault(report_id, {})[name] = (elapsed_ms, commands)
+
+        return [DeviceReport(ip, hostname, check_time, sections.get(report_id, {}), summary,
+                             timings.get(report_id, {}))
+                for report_id, ip, hostname, check_time, summary in rows]
+
+    def alerting_devices(self, check_name, since=None, until=None):
+        """查询某检查项告警过的设备，返回 [(ip, hostname, check_time, status)]"""
+        conditions, params = ['c.name = ?', 'c.is_alert = 1'], [check_name]
+        if since:
+            conditions.append('r.checked_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('r.checked_at < ?')
+            params.append(until)
+        return self.conn.execute(f'''
+            SELECT r.ip, r.hostname, r.check_time, c.status
+            FROM checks c JOIN reports r ON r.id = c.report_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY r.ip, r.checked_at''', params).fetchall()
+
+    def metric_history(self, lookback_days=30):
+        """读取最近 lookback_days 天（以库中最新巡检时间为准）的指标记录
+
+        返回按时间排序的 [(ip, checked_at, 指标名, 数值)]，供 trend.build_trends 使用。
+        """
+        return self.conn.execute('''
+            SELECT r.ip, r.checked_at, m.name, m.value
+            FROM metrics m JOIN reports r ON r.id = m.report_id
+            WHERE r.checked_at >= datetime((SELECT MAX(checked_at) FROM reports), ?)
+            ORDER BY r.checked_at, r.id''', (f'-{lookback_days} days',)).fetchall()
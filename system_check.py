@@ -1,18 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import psutil
-import subprocess
+# 顶层只导入启动必需的轻量模块；psutil、csv、subprocess、tkinter 和报告生成相关
+# 模块都在用到的函数里再导入，避免定时采集和图形界面互相拖慢启动
 import time
 from datetime import datetime
-import csv
-import socket
 import os
-import re
-import tkinter as tk
-from tkinter import ttk, filedialog
-import webbrowser
-from html_generator import HTMLGenerator
+import sys
 
 # 配置告警阈值
 MEMORY_THRESHOLD = 80  # 内存使用率告警阈值（%）
@@ -71,11 +65,9 @@ document.addEventListener('DOMContentLoaded', function() {{
 
 def get_hostname():
     """获取主机名"""
+    import socket
     return socket.gethostname()
 
-# 在文件顶部导入部分添加
-import sys
-
 def get_system_version():
     """获取系统版本"""
     try:
@@ -89,38 +81,88 @@ def get_system_version():
     except:
         return "Unknown"
 
-def get_uptime():
-    """获取系统运行时间"""
+def get_uptime_seconds():
+    """获取系统运行秒数，获取失败时返回 None"""
     try:
         # 在Windows系统上，使用不同的方法获取系统运行时间
         if os.name == 'nt':
-            import time
             import ctypes
             
             lib = ctypes.windll.kernel32
-            t = lib.GetTickCount64()
-            t = int(t / 1000)
-            
-            return time.strftime('%d天%H小时%M分钟', time.gmtime(t))
+            return int(lib.GetTickCount64() / 1000)
         else:
             with open('/proc/uptime', 'r') as f:
-                uptime_seconds = float(f.readline().split()[0])
-                return time.strftime('%d天%H小时%M分钟', time.gmtime(uptime_seconds))
+                return float(f.readline().split()[0])
     except:
+        return None
+
+def get_uptime():
+    """获取系统运行时间"""
+    uptime_seconds = get_uptime_seconds()
+    if uptime_seconds is None:
         return "Unknown"
+    return time.strftime('%d天%H小时%M分钟', time.gmtime(uptime_seconds))
+
+# systemctl show 一次查询的属性
+SYSTEMCTL_PROPERTIES = 'LoadState,ActiveState,ActiveEnterTimestamp'
+
+# 单次服务查询的超时时间（秒）
+SERVICE_PROBE_TIMEOUT = 5
+
+def _run_systemctl_show(services, timeout):
+    """不经过 shell 调用 systemctl show，返回每个单元的属性字典，顺序与 services 一致"""
+    import subprocess
+
+    output = subprocess.run(
+        ['systemctl', 'show', '--property=' + SYSTEMCTL_PROPERTIES, '--'] + list(services),
+        capture_output=True, check=True, timeout=timeout,
+        env=dict(os.environ, LC_ALL='C')  # 固定英文输出，保证时间格式可解析
+    ).stdout.decode(errors='replace')
+
+    # 每个单元输出一段 key=value，段之间以空行分隔
+    units = []
+    current = {}
+    for line in output.splitlines():
+        if not line.strip():
+            if current:
+                units.append(current)
+                current = {}
+            continue
+        key, _, value = line.partition('=')
+        current[key] = value
+    if current:
+        units.append(current)
 
-def check_service_status(service_name):
+    if len(units) != len(services):
+        raise ValueError(f"systemctl show 返回 {len(units)} 个单元，预期 {len(services)} 个")
+    return units
+
+def _unit_status(properties):
+    """把 systemctl show 的属性转换为 (状态, 运行时间)"""
+    if properties.get('LoadState') == 'not-found':
+        return "unknown", "未知"
+    status = properties.get('ActiveState') or "unknown"
+    if status != "active":
+        return status, "未运行"
+    try:
+        # 例如 Mon 2025-02-17 17:19:02 CST，时区即本机时区，去掉后按本地时间解析
+        start_time = properties['ActiveEnterTimestamp'].rsplit(' ', 1)[0]
+        start_datetime = datetime.strptime(start_time, '%a %Y-%m-%d %H:%M:%S')
+    except (KeyError, ValueError):
+        return status, "未知"
+    running_time = datetime.now() - start_datetime
+    return status, str(running_time).split('.')[0]
+
+def check_service_status(service_name, timeout=SERVICE_PROBE_TIMEOUT):
     """检查服务状态和运行时间"""
+    import subprocess
     try:
         # 在Windows系统上，使用不同的方法检查服务状态
         if os.name == 'nt':
-            import subprocess
-            import re
-            from datetime import datetime, timedelta
-            
             # 使用sc查询服务状态
-            status_cmd = f"sc query {service_name}"
-            status_output = subprocess.check_output(status_cmd, shell=True).decode()
+            status_output = subprocess.run(
+                ['sc', 'query', service_name], capture_output=True, timeout=timeout
+            ).stdout.decode(errors='replace')
             
             # 解析状态
             if "RUNNING" in status_output:
@@ -130,27 +172,41 @@ def check_service_status(service_name):
                 status = "inactive"
                 return status, "未运行"
         else:
-            status_cmd = "systemctl is-active {}".format(service_name)
-            status = subprocess.check_output(status_cmd, shell=True).decode().strip()
-          
-            if status == "active":
-                time_cmd = "systemctl show {} --property=ActiveEnterTimestamp".format(service_name)
-                time_output = subprocess.check_output(time_cmd, shell=True).decode().strip()
-                start_time = time_output.split('=')[1]
-                start_datetime = datetime.strptime(start_time, '%a %Y-%m-%d %H:%M:%S %Z')
-                running_time = datetime.now() - start_datetime
-                return status, str(running_time).split('.')[0]
-            return status, "未运行"
+            return _unit_status(_run_systemctl_show([service_name], timeout)[0])
     except:
         return "unknown", "未知"
 
+def check_services_status(services=None, timeout=SERVICE_PROBE_TIMEOUT):
+    """批量检查服务状态，返回按 services 顺序排列的 {服务名: (状态, 运行时间)}
+
+    Linux 上用一次 systemctl show 查询所有单元；批量查询失败时（或在 Windows 上）
+    退回到逐个服务并发查询，每个查询都有超时。
+    """
+    services = list(SERVICES if services is None else services)
+    if not services:
+        return {}
+    if os.name != 'nt':
+        try:
+            units = _run_systemctl_show(services, timeout)
+            return {service: _unit_status(properties) for service, properties in zip(services, units)}
+        except Exception:
+            pass
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=len(services)) as executor:
+        results = executor.map(lambda service: check_service_status(service, timeout), services)
+        return dict(zip(services, results))
+
 def get_memory_usage():
     """获取内存使用率"""
+    import psutil
     memory = psutil.virtual_memory()
     return memory.percent
 
 def get_disk_usage():
     """获取根分区磁盘使用率"""
+    import psutil
     disk = psutil.disk_usage('/')
     return disk.percent
 
@@ -174,410 +230,481 @@ def generate_csv_data():
   
     data['系统运行时间'] = get_uptime()
   
-    # 服务状态
-    for service in SERVICES:
-        status, running_time = check_service_status(service)
+    # 服务状态，一次批量查询所有服务
+    for service, (status, running_time) in check_services_status().items():
         data[service + '_状态'] = status
         data[service + '_运行时间'] = running_time
         data[service + '_告警'] = "告警" if status != "active" else "正常"
   
     return data
 
-def main():
-    """主函数"""
-    csv_file = 'system_check_report.csv'
-    data = generate_csv_data()
-  
-    # 检查文件是否存在
-    file_exists = os.path.isfile(csv_file)
-  
-    # 使用 GBK 编码，并使用逗号作为分隔符
-    with open(csv_file, 'a', newline='', encoding='gbk') as f:
-        writer = csv.DictWriter(f, fieldnames=data.keys(), delimiter=',', quoting=csv.QUOTE_ALL)
-      
-        # 如果文件不存在，写入表头
-        if not file_exists:
-            writer.writeheader()
-      
-        writer.writerow(data)
+def collect_sample():
+    """采集一次本机状态，返回写入 HistoryStore 的数值样本"""
+    return {
+        'time': time.time(),
+        'hostname': get_hostname(),
+        'system_version': get_system_version(),
+        'memory': get_memory_usage(),
+        'disk': get_disk_usage(),
+        'uptime': get_uptime_seconds(),
+        # 服务状态，一次批量查询所有服务
+        'services': [(service, status, running_time)
+                     for service, (status, running_time) in check_services_status().items()],
+        'thresholds': {'memory': MEMORY_THRESHOLD, 'disk': DISK_THRESHOLD},
+    }
+
+def collect_command(args):
+    """采集本机状态并追加到历史库"""
+    from history_store import HistoryStore
+
+    sample = collect_sample()
+    HistoryStore(args.history).append(sample)
+    print("已记录到: {}（内存 {:.1f}%，磁盘 {:.1f}%）".format(args.history, sample['memory'], sample['disk']))
+    print("使用 export 子命令导出 CSV 报告")
+    return 0
+
+def agent_command(args):
+    """常驻采样，每个窗口向历史库追加一行汇总，收到 SIGTERM 或 Ctrl+C 时写出未满的窗口后退出"""
+    import signal
+    import threading
+    import agent as sampling
+    from history_store import HistoryStore
+
+    interval = args.interval or sampling.SAMPLE_INTERVAL
+    window = args.window or sampling.WINDOW_SECONDS
+    if interval <= 0 or window < interval:
+        print("采样间隔必须大于 0 且不大于汇总窗口", file=sys.stderr)
+        return 2
+    store = HistoryStore(args.history)
+    started = time.process_time()
+
+    def describe():
+        return {
+            'hostname': get_hostname(),
+            'system_version': get_system_version(),
+            'uptime': get_uptime_seconds(),
+            'thresholds': {'memory': MEMORY_THRESHOLD, 'disk': DISK_THRESHOLD},
+        }
+
+    def write(summary):
+        store.append_window(summary)
+        if args.verbose:
+            memory_min, memory_max, memory_mean, memory_p95 = summary['memory']
+            print("{} 内存 最低 {:.1f}% 平均 {:.1f}% P95 {:.1f}% 最高 {:.1f}%，磁盘最高 {:.1f}%，{} 次采样，单次采样平均 {:.2f}ms、最长 {:.2f}ms".format(
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary['time'])),
+                memory_min, memory_mean, memory_p95, memory_max, summary['disk'][1],
+                summary['samples'], summary['cost_mean'], summary['cost_max']), flush=True)
+
+    agent = sampling.SamplingAgent(
+        lambda: (get_memory_usage(), get_disk_usage()),
+        lambda: [(service, status, running_time)
+                 for service, (status, running_time) in check_services_status().items()],
+        describe, write, interval=interval, window=window,
+        service_interval=args.service_interval or sampling.SERVICE_INTERVAL)
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    print("开始采样：每 {} 秒一次，每 {} 秒汇总写入 {}".format(interval, window, args.history), flush=True)
+    agent.run(stop)
+
+    stats = agent.stats()
+    print("已停止：共采样 {} 次，写入 {} 个窗口，跳过 {} 次；单次采样平均 {:.2f}ms、最长 {:.2f}ms，"
+          "进程 CPU 时间 {:.2f} 秒".format(stats['ticks'], stats['windows'], stats['missed'],
+                                        stats['cost_mean'], stats['cost_max'],
+                                        time.process_time() - started))
+    return 0
+
+def parse_time_arg(text):
+    """把 'YYYY-MM-DD[ HH:MM:SS]' 转换为本地时间的 Unix 时间戳，用作 argparse 的 type"""
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间: {text}")
+
+def export_command(args):
+    """从历史库导出指定时间范围的 CSV 报告"""
+    from history_store import HistoryStore
+
+    count = HistoryStore(args.history).export_csv(args.output, args.since, args.until)
   
     # 创建用于打开 CSV 的 bat 文件
     bat_content = '''@echo off
-    start excel.exe "%~dp0system_check_report.csv"'''
+    start excel.exe "%~dp0{}"'''.format(os.path.basename(args.output))
   
-    with open('open_report.bat', 'w') as f:
+    with open(os.path.join(os.path.dirname(os.path.abspath(args.output)), 'open_report.bat'), 'w') as f:
         f.write(bat_content)
   
-    print("报告已保存到: {}".format(csv_file))
+    print("已导出 {} 条记录到: {}".format(count, args.output))
     print("请使用 open_report.bat 打开报告文件")
+    return 0
 
-def parse_check_log(file_path):
-    """解析日志文件"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-  
-    # 解析基本信息
-    ip = os.path.basename(file_path).split('_')[0]
-    hostname = re.search(r'主机名: (.*)', content).group(1)
-    check_time = re.search(r'系统巡检报告 \| (.*) =====', content).group(1)
-  
-    # 直接提取两个 ---- 之间的内容
-    sections = {}
-    current_section = None
-    section_content = []
-  
-    for line in content.split('\n'):
-        if line.startswith('---- ') and line.endswith(' ----'):
-            if current_section and section_content:
-                sections[current_section] = '\n'.join(section_content)
-                section_content = []
-            current_section = line[5:-5]  # 去掉前后的 ---- 和空格
-        elif current_section:
-            section_content.append(line)
-  
-    # 处理最后一个部分
-    if current_section and section_content:
-        sections[current_section] = '\n'.join(section_content)
-  
-    summary = re.search(r'巡检总结: (.*)', content).group(1)
-  
-    return {
-        'ip': ip,
-        'hostname': hostname,
-        'check_time': check_time,
-        'sections': sections,
-        'summary': summary
-    }
+def report_command(args):
+    """无界面生成报告，输出机器可读的汇总信息"""
+    import json
+    from log_discovery import parse_log_date
+    from report_builder import build_report, find_log_files, render_from_store
 
-class SystemCheckGUI:
-    def __init__(self, root):
-        """初始化GUI界面"""
-        self.root = root
-        self.root.title("系统巡检报告生成器")
-      
-        # 设置窗口大小和位置
-        window_width = 600
-        window_height = 500
-        screen_width = root.winfo_screenwidth()
-        screen_height = root.winfo_screenheight()
-        x = (screen_width - window_width) // 2
-        y = (screen_height - window_height) // 2
-        self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
-      
-        # 设置整体样式
-        self.root.configure(bg='#f0f0f0')
-        style = ttk.Style()
-        style.configure('TButton', padding=6)
-        style.configure('TLabel', background='#f0f0f0')
-        style.configure('TFrame', background='#f0f0f0')
-      
-        # 创建主框架，使用固定的padding
-        main_frame = ttk.Frame(root, padding="20 20 20 20")
-        main_frame.pack(fill=tk.BOTH, expand=True)
-      
-        # 标题
-        title_label = ttk.Label(
-            main_frame, 
-            text="系统巡检报告生成器", 
-            font=('Arial', 16, 'bold')
-        )
-        title_label.pack(pady=(0, 20))
-      
-        # 创建输入区域框架，使用Grid布局
-        input_frame = ttk.Frame(main_frame)
-        input_frame.pack(fill=tk.X, pady=(0, 20))
-        input_frame.grid_columnconfigure(1, weight=1)  # 让输入框列可以扩展
-      
-        # 日志目录选择（使用Grid布局）
-        dir_label = ttk.Label(
-            input_frame, 
-            text="日志目录:",
-            width=10,
-            anchor='e'  # 右对齐
-        )
-        dir_label.grid(row=0, column=0, padx=(0, 10), pady=5, sticky='e')
-      
-        self.dir_entry = ttk.Entry(input_frame)
-        self.dir_entry.grid(row=0, column=1, padx=(0, 10), pady=5, sticky='ew')
-      
-        browse_btn = ttk.Button(
-            input_frame,
-            text="浏览",
-            command=self.browse_directory,
-            width=10
-        )
-        browse_btn.grid(row=0, column=2, pady=5)
-      
-        # 创建文件列表框架，减小高度占比
-        list_frame = ttk.Frame(main_frame)
-        list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-      
-        # 添加标签
-        list_label = ttk.Label(
-            list_frame,
-            text="发现的日志文件:",
-            anchor='w'
-        )
-        list_label.pack(fill=tk.X, padx=5, pady=(0, 5))
-      
-        # 创建文件列表框和滚动条，设置合适的高度
-        list_scroll = ttk.Scrollbar(list_frame)
-        list_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-      
-        self.file_listbox = tk.Listbox(
-            list_frame,
-            height=8,  # 调整显示行数
-            yscrollcommand=list_scroll.set,
-            selectmode=tk.EXTENDED,
-            font=('Courier', 9)
-        )
-        self.file_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
-        list_scroll.config(command=self.file_listbox.yview)
-      
-        # 创建按钮区域框架
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(fill=tk.X, pady=(10, 20))  # 增加上边距
-      
-        # 按钮水平布局框架
-        buttons_horizontal = ttk.Frame(button_frame)
-        buttons_horizontal.pack()
-      
-        # 生成报告按钮
-        generate_btn = ttk.Button(
-            buttons_horizontal,
-            text="生成报告",
-            command=self.generate_report,
-            width=20
-        )
-        generate_btn.pack(side=tk.LEFT, padx=5)
-      
-        # 查看报告按钮
-        self.view_btn = ttk.Button(
-            buttons_horizontal,
-            text="查看报告",
-            command=self.view_report,
-            width=20,
-            state='disabled'  # 初始状态为禁用
-        )
-        self.view_btn.pack(side=tk.LEFT, padx=5)
-      
-        # 状态显示区域
-        self.status_label = ttk.Label(
-            main_frame,
-            text="请选择日志文件目录",
-            wraplength=500,
-            justify=tk.CENTER,
-            font=('Arial', 10)
-        )
-        self.status_label.pack(fill=tk.X, pady=10)
-      
-        # 版权信息
-        copyright_label = ttk.Label(
-            main_frame,
-            text="© 2024 系统巡检报告生成器",
-            font=('Arial', 8),
-            foreground='gray'
-        )
-        copyright_label.pack(side=tk.BOTTOM, pady=10)
-      
-        # 存储日志目录路径
-        self.log_dir = ""
-
-    def browse_directory(self):
-        """选择目录对话框"""
-        directory = filedialog.askdirectory(
-            title="选择日志文件目录",
-            initialdir="."
+    started = time.perf_counter()
+    try:
+        if args.from_store:
+            since, until = (f'{date[:4]}-{date[4:6]}-{date[6:]}' if date else None
+                            for date in map(parse_log_date, (args.since, args.until)))
+            summary = render_from_store(args.from_store, args.output, index_mode=args.index_mode,
+                                        since=since, until=until, bundle=args.bundle)
+        else:
+            # 只在顶层查找且不筛选时由 build_report 自己列出目录
+            log_files = None
+            if args.recursive or args.since or args.until or args.ip_prefix:
+                log_files = find_log_files(args.input, recursive=args.recursive, since=args.since,
+                                           until=args.until, ip_prefix=args.ip_prefix)
+            summary = build_report(args.input, output_dir=args.output, jobs=args.jobs,
+                                   index_mode=args.index_mode, store=args.store, bundle=args.bundle,
+                                   log_files=log_files)
+        if summary['errors']:
+            status = 'partial'
+        elif not summary['devices']:
+            status = 'failed'
+            summary['error'] = "未找到日志文件"
+        else:
+            status = 'ok'
+    except Exception as e:
+        summary = {'devices': 0, 'rendered': 0, 'errors': [], 'alert_devices': 0,
+                   'alerts': 0, 'timings': {}, 'bundle': None, 'superseded': 0,
+                   'error': f"{type(e).__name__}: {e}"}
+        status = 'failed'
+    summary['timings']['total'] = round(time.perf_counter() - started, 3)
+    summary['status'] = status
+    summary['errors'] = [{'file': path, 'error': error} for path, error in summary['errors']]
+
+    if args.format == 'json':
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print(f"状态: {status}")
+        print(f"设备数: {summary['devices']}  告警设备: {summary['alert_devices']}  "
+              f"告警项: {summary['alerts']}  更新页面: {summary['rendered']}")
+        print("耗时: " + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in summary['timings'].items()))
+        if summary['superseded']:
+            print(f"同一设备有多份日志，只显示最新的一份，忽略较旧的日志 {summary['superseded']} 个")
+        if summary['bundle']:
+            print(f"报告文件: {summary['bundle']}")
+        for item in summary['errors']:
+            print(f"解析失败: {item['file']}: {item['error']}")
+        if 'error' in summary:
+            print(f"错误: {summary['error']}")
+
+    # 0: 成功；1: 部分日志解析失败；2: 生成失败；3: 存在告警且指定了 --fail-on-alert
+    if status == 'failed':
+        return 2
+    if status == 'partial':
+        return 1
+    if args.fail_on_alert and summary['alerts']:
+        return 3
+    return 0
+
+def fleet_command(args):
+    """按设备清单并发采集巡检日志，完成后生成报告"""
+    import shlex
+    import fleet
+
+    hosts = fleet.load_inventory(args.hosts)
+    if not hosts:
+        print("设备清单为空", file=sys.stderr)
+        return 2
+
+    def on_collected(done, total, ip, error):
+        if error:
+            print(f"[{done}/{total}] {ip} 采集失败: {error}", file=sys.stderr)
+        elif args.verbose:
+            print(f"[{done}/{total}] {ip} 完成", file=sys.stderr)
+
+    started = time.perf_counter()
+    logs, errors = fleet.collect_fleet(
+        hosts, args.output,
+        script=args.script or fleet.DEFAULT_SCRIPT,
+        concurrency=args.concurrency or fleet.DEFAULT_CONCURRENCY,
+        timeout=args.timeout or fleet.HOST_TIMEOUT,
+        retries=fleet.HOST_RETRIES if args.retries is None else args.retries,
+        ssh_command=shlex.split(args.ssh_command) if args.ssh_command else None,
+        progress=on_collected,
+        # JSON 记录格式的日志解析时直接解码，不需要逐行匹配文本
+        script_args=['-f', 'json'] if args.log_format == 'json' else None
+    )
+    print(f"采集完成: 成功 {len(logs)} 台，失败 {len(errors)} 台，"
+          f"耗时 {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if not logs:
+        return 2
+    if args.no_report:
+        return 1 if errors else 0
+    # 日志目录即报告目录，和手工收集日志后用 report 子命令生成的结果相同
+    args.input = args.output
+    rc = report_command(args)
+    return rc or (1 if errors else 0)
+
+def serve_command(args):
+    """启动本地报告服务，页面在第一次访问时才生成"""
+    import report_server
+
+    filters = {'recursive': args.recursive, 'since': args.since, 'until': args.until,
+               'ip_prefix': args.ip_prefix}
+    library = report_server.ReportLibrary(args.input, jobs=args.jobs, index_mode=args.index_mode,
+                                          cache_dir=args.output, filters=filters)
+    started = time.perf_counter()
+    try:
+        library.refresh(force=True)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    status = library.status()
+    print(f"已加载 {status['devices']} 台设备，解析失败 {status['errors']} 个，"
+          f"耗时 {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    for file, error in library.errors.items():
+        print(f"解析文件 {file} 时出错: {error}", file=sys.stderr)
+
+    port = report_server.DEFAULT_PORT if args.port is None else args.port
+    try:
+        server = report_server.ReportServer(library, args.bind, port, verbose=args.verbose)
+    except OSError as e:
+        print(f"无法监听 {args.bind}:{port}: {e}", file=sys.stderr)
+        return 2
+    print(f"报告地址: {server.url}  (Ctrl+C 退出)", file=sys.stderr)
+    if args.open:
+        import webbrowser
+        webbrowser.open(server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    status = library.status()
+    print(f"页面缓存命中 {status['hits']} 次，生成 {status['misses']} 次，重新加载 {status['reloads']} 次",
+          file=sys.stderr)
+    return 0
+
+# 各运行模式启动时需要导入的模块，用于 startup 子命令测量冷启动耗时
+STARTUP_IMPORTS = {
+    'collect': ['system_check', 'argparse', 'psutil', 'history_store', 'subprocess', 'socket'],
+    'agent': ['system_check', 'argparse', 'psutil', 'history_store', 'agent', 'subprocess', 'socket',
+              'threading', 'signal'],
+    'report': ['system_check', 'argparse', 'json', 'report_builder', 'concurrent.futures.process'],
+    'serve': ['system_check', 'argparse', 'report_server', 'concurrent.futures.process'],
+    'gui': ['system_check', 'tkinter', 'tkinter.ttk', 'tkinter.filedialog', 'report_gui'],
+}
+
+def query_command(args):
+    """查询 SQLite 结果库中某检查项告警过的设备"""
+    from log_parser import normalize_check_time
+    from report_store import ReportStore
+
+    # 库中的巡检时间为 'YYYY-MM-DD HH:MM:SS'，按字符串比较前先转换为同一格式
+    bounds = []
+    for option, text in (('--since', args.since), ('--until', args.until)):
+        value = None
+        if text:
+            value = normalize_check_time(text) or normalize_check_time(f'{text.strip()} 00:00:00')
+            if value is None:
+                print(f"无法识别的时间 {option} {text}，请使用 YYYY-MM-DD 或 'YYYY-MM-DD HH:MM:SS'",
+                      file=sys.stderr)
+                return 2
+        bounds.append(value)
+    since, until = bounds
+
+    with ReportStore(args.store) as db:
+        rows = db.alerting_devices(args.check, since=since, until=until)
+    for ip, hostname, check_time, status in rows:
+        print(f"{ip}\t{hostname}\t{check_time}\t{status}")
+    return 0
+
+def startup_command(args):
+    """用 -X importtime 在子进程中测量各模式的冷启动导入耗时"""
+    import subprocess
+
+    if getattr(sys, 'frozen', False):
+        print("打包后的程序无法使用 -X importtime，请在源码环境下运行 startup 子命令")
+        return 2
+
+    modes = [args.mode] if args.mode else list(STARTUP_IMPORTS)
+    for mode in modes:
+        code = '; '.join(f'import {name}' for name in STARTUP_IMPORTS[mode])
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True
         )
-        if directory:
-            self.log_dir = directory
-            self.dir_entry.delete(0, tk.END)
-            self.dir_entry.insert(0, directory)
-          
-            # 检查日志文件
-            self.check_log_files()
-          
-            # 检查是否存在报告文件
-            if os.path.exists(os.path.join(directory, 'index.html')):
-                self.view_btn.config(state='normal')
-            else:
-                self.view_btn.config(state='disabled')
-
-    def check_log_files(self):
-        """检查并显示日志文件"""
-        if not self.log_dir:
-            return
-          
-        self.file_listbox.delete(0, tk.END)  # 清空列表
-      
-        try:
-            # 同时支持 .log 和 .log.txt 结尾的文件
-            log_files = [f for f in os.listdir(self.log_dir) 
-                        if f.endswith(('.log', '.log.txt'))]
-          
-            if not log_files:
-                self.file_listbox.insert(tk.END, "未找到日志文件")
-                self.status_label.config(text="未找到日志文件")
-                return
-          
-            for file in sorted(log_files):
-                self.file_listbox.insert(tk.END, file)
-          
-            self.status_label.config(text=f"找到 {len(log_files)} 个日志文件")
-        except Exception as e:
-            self.status_label.config(text=f"读取目录出错: {str(e)}")
-
-    def format_service_status(self, content):
-        """格式化服务状态内容"""
-        # 移除所有的 '---' 和 '|'
-        lines = content.split('\n')
-        formatted_lines = []
-      
-        for line in lines:
-            # 跳过空行和只包含分隔符的行
-            if not line.strip() or line.strip().replace('-', '') == '':
+        wall = (time.perf_counter() - started) * 1000
+        if proc.returncode != 0:
+            print(f"[{mode}] 导入失败: {proc.stderr.strip().splitlines()[-1]}")
+            continue
+
+        # 每行格式: import time: self [us] | cumulative | imported package
+        entries = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
                 continue
-          
-            # 移除 '|' 并分割字段
-            fields = [field.strip() for field in line.replace('|', '').split('  ') if field.strip()]
-          
-            # 确保至少有4个字段（服务名称、状态、版本、运行时长）
-            if len(fields) >= 4:
-                # 使用固定宽度格式化每个字段
-                formatted_line = f"{fields[0]:<20} {fields[1]:<10} {fields[2]:<20} {fields[3]:<15}"
-                formatted_lines.append(formatted_line)
-      
-        return '\n'.join(formatted_lines)
-
-    def parse_check_log(self, file_path):
-        """解析日志文件"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-      
-        # 解析基本信息
-        ip = os.path.basename(file_path).split('_')[0]
-        hostname = re.search(r'主机名: (.*)', content).group(1)
-        check_time = re.search(r'系统巡检报告 \| (.*) =====', content).group(1)
-      
-        # 直接提取两个 ---- 之间的内容
-        sections = {}
-        current_section = None
-        section_content = []
-      
-        for line in content.split('\n'):
-            if line.startswith('---- ') and line.endswith(' ----'):
-                if current_section and section_content:
-                    sections[current_section] = '\n'.join(section_content)
-                    section_content = []
-                current_section = line[5:-5]  # 去掉前后的 ---- 和空格
-            elif current_section:
-                section_content.append(line)
-      
-        # 处理最后一个部分
-        if current_section and section_content:
-            sections[current_section] = '\n'.join(section_content)
-      
-        # 确保关键部分使用统一的名称
-        section_mapping = {
-            '内存使用': '内存使用',
-            '磁盘使用': '磁盘使用',
-            '服务状态': '服务状态'
-        }
-        
-        # 重命名部分以确保一致性
-        renamed_sections = {}
-        for name, content in sections.items():
-            if name in section_mapping:
-                renamed_sections[section_mapping[name]] = content
-            else:
-                renamed_sections[name] = content
-        
-        summary = re.search(r'巡检总结: (.*)', content).group(1)
-      
-        return {
-            'ip': ip,
-            'hostname': hostname,
-            'check_time': check_time,
-            'sections': renamed_sections,
-            'summary': summary
-        }
-    def generate_report(self):
-        """生成报告"""
-        if not self.log_dir:
-            self.status_label.config(text="请先选择日志文件目录")
-            return
-          
-        try:
-            self.status_label.config(text="正在生成报告...")
-            self.root.update()
-          
-            # 清理旧的HTML文件
-            for file in os.listdir(self.log_dir):
-                if file.endswith('.html'):
-                    try:
-                        os.remove(os.path.join(self.log_dir, file))
-                    except Exception as e:
-                        print(f"删除文件 {file} 时出错: {str(e)}")
-          
-            check_results = []
-            # 同时支持 .log 和 .log.txt 结尾的文件
-            log_files = [f for f in os.listdir(self.log_dir) 
-                        if f.endswith(('.log', '.log.txt'))]
-          
-            if not log_files:
-                self.status_label.config(text="未找到日志文件")
-                return
-          
-            total_files = len(log_files)
-            for i, file in enumerate(log_files, 1):
-                self.status_label.config(text=f"正在处理: {file} ({i}/{total_files})")
-                self.root.update()
-              
-                file_path = os.path.join(self.log_dir, file)
-                result = self.parse_check_log(file_path)
-                check_results.append(result)
-          
-            # 使用HTMLGenerator生成页面
-            index_html = HTMLGenerator.generate_index_page(check_results)
-            with open(os.path.join(self.log_dir, 'index.html'), 'w', encoding='utf-8') as f:
-                f.write(index_html)
-          
-            for i, device in enumerate(check_results, 1):
-                self.status_label.config(text=f"正在生成设备报告: {device['ip']} ({i}/{len(check_results)})")
-                self.root.update()
-              
-                detail_html = HTMLGenerator.generate_device_detail_page(device)
-                with open(os.path.join(self.log_dir, f'device_{device["ip"]}.html'), 'w', encoding='utf-8') as f:
-                    f.write(detail_html)
-          
-            self.status_label.config(text=f"成功生成报告！处理了 {len(check_results)} 个设备的数据")
-            self.view_btn.config(state='normal')
-          
-        except Exception as e:
-            self.status_label.config(text=f"错误: {str(e)}")
-            print(f"生成报告时出错: {str(e)}")
-
-    def view_report(self):
-        """打开报告文件"""
-        if not self.log_dir:
-            self.status_label.config(text="未找到报告目录")
-            return
-            
-        index_path = os.path.join(self.log_dir, 'index.html')
-        if not os.path.exists(index_path):
-            self.status_label.config(text="报告文件不存在")
-            return
-          
-        try:
-            webbrowser.open(f'file://{os.path.abspath(index_path)}')
-            self.status_label.config(text="已打开报告")
-        except Exception as e:
-            self.status_label.config(text=f"打开报告失败: {str(e)}")
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+        top_level = [entry for entry in entries if not entry[2].startswith('  ')]
+        total_ms = sum(entry[0] for entry in top_level) / 1000
+
+        print(f"[{mode}] 进程总耗时 {wall:.1f}ms，模块导入 {total_ms:.1f}ms")
+        for cumulative_us, self_us, name in sorted(entries, reverse=True)[:args.top]:
+            print(f"    {cumulative_us / 1000:8.1f}ms  (自身 {self_us / 1000:6.1f}ms)  {name.strip()}")
+    return 0
+
+def gui_command():
+    """启动图形界面"""
+    # 图形界面相关模块只在启动界面时导入，无显示环境下的子命令不依赖 tkinter
+    import tkinter as tk
+    from report_gui import SystemCheckGUI
 
-def main():
     root = tk.Tk()
     app = SystemCheckGUI(root)
     root.mainloop()
+    return 0
+
+def add_discovery_arguments(parser):
+    """report 和 serve 子命令共用的日志查找参数，见 log_discovery.discover_logs"""
+    parser.add_argument('-r', '--recursive', action='store_true', help="同时查找子目录（如按日期分的目录）中的日志")
+    parser.add_argument('--since', help="只处理该日期及之后的日志，如 2025-02-10，按文件名或目录名中的日期")
+    parser.add_argument('--until', help="只处理该日期之前（不含）的日志，如 2025-02-17")
+    parser.add_argument('--ip-prefix', help="只处理文件名以该 IP 前缀开头的日志，如 10.1.")
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        # 双击启动时没有参数，直接打开界面，省去 argparse 的导入和解析
+        return gui_command()
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="系统巡检报告生成器，不带子命令时启动图形界面")
+    subparsers = parser.add_subparsers(dest='command')
+
+    report_parser = subparsers.add_parser('report', help="无界面批量生成报告")
+    report_parser.add_argument('-i', '--input', help="日志文件目录")
+    report_parser.add_argument('-o', '--output', help="报告输出目录，默认与日志目录相同")
+    report_parser.add_argument('--store', help="同时把解析结果写入该 SQLite 数据库")
+    report_parser.add_argument('--from-store', metavar='DB',
+                               help="不读取日志，直接用 SQLite 数据库中的最新结果生成报告（需指定 -o）")
+    report_parser.add_argument('-j', '--jobs', type=int, help="解析进程数，默认为CPU核数")
+    report_parser.add_argument('--index-mode', choices=['auto', 'cards', 'virtual'], default='auto',
+                               help="索引页形式：设备卡片或虚拟滚动列表，auto 按设备数自动选择")
+    report_parser.add_argument('--bundle', choices=['zip', 'html'],
+                               help="整份报告只写成一个文件：zip 压缩包或自包含的单个 HTML")
+    add_discovery_arguments(report_parser)
+    report_parser.add_argument('--format', choices=['text', 'json'], default='text',
+                               help="汇总信息输出格式")
+    report_parser.add_argument('--fail-on-alert', action='store_true',
+                               help="存在告警时以退出码 3 结束")
+
+    query_parser = subparsers.add_parser('query', help="查询结果库中某检查项告警过的设备")
+    query_parser.add_argument('--store', required=True, help="SQLite 数据库路径")
+    query_parser.add_argument('--check', required=True, help="巡检总结中的检查项，如 回填率")
+    query_parser.add_argument('--since', help="起始时间，如 2025-02-10 或 '2025-02-10 08:00:00'")
+    query_parser.add_argument('--until', help="截止时间（不含），格式同 --since")
+
+    collect_parser = subparsers.add_parser('collect', help="采集本机状态并追加到历史库")
+    collect_parser.add_argument('--history', default='system_check_history',
+                                help="历史库目录，默认 system_check_history")
+
+    # 默认值在 agent 模块中定义，这里不导入
+    agent_parser = subparsers.add_parser('agent', help="常驻采样本机状态，按窗口汇总后追加到历史库")
+    agent_parser.add_argument('--history', default='system_check_history',
+                              help="历史库目录，默认 system_check_history")
+    agent_parser.add_argument('--interval', type=float, help="采样间隔秒数，默认 5")
+    agent_parser.add_argument('--window', type=int,
+                              help="汇总窗口秒数，每个窗口写入一行最低/最高/平均/P95，默认 300")
+    agent_parser.add_argument('--service-interval', type=float,
+                              help="服务状态查询间隔秒数，默认 60")
+    agent_parser.add_argument('-v', '--verbose', action='store_true', help="输出每个窗口的汇总")
+
+    export_parser = subparsers.add_parser('export', help="从历史库导出 Excel 可打开的 GBK 编码 CSV")
+    export_parser.add_argument('--history', default='system_check_history',
+                               help="历史库目录，默认 system_check_history")
+    export_parser.add_argument('-o', '--output', default='system_check_report.csv',
+                               help="CSV 文件路径，默认 system_check_report.csv（已存在时覆盖）")
+    export_parser.add_argument('--since', type=parse_time_arg,
+                               help="起始时间，如 2025-02-10 或 \"2025-02-10 08:00:00\"")
+    export_parser.add_argument('--until', type=parse_time_arg, help="截止时间（不含）")
+
+    # 默认值在 fleet 模块中定义，这里不导入，避免其他子命令承担导入开销
+    fleet_parser = subparsers.add_parser('fleet', help="通过 ssh 并发在多台设备上执行巡检脚本并生成报告")
+    fleet_parser.add_argument('-H', '--hosts', required=True,
+                              help="设备清单文件，每行一台设备：ip [ssh目标]")
+    fleet_parser.add_argument('-o', '--output', required=True, help="日志和报告输出目录")
+    fleet_parser.add_argument('--script', help="巡检脚本路径，默认为程序目录下的 system_check.sh")
+    fleet_parser.add_argument('-c', '--concurrency', type=int, help="同时连接的设备数，默认 32")
+    fleet_parser.add_argument('--timeout', type=float, help="单台设备单次执行超时秒数，默认 300")
+    fleet_parser.add_argument('--retries', type=int, help="失败重试次数，默认 2")
+    fleet_parser.add_argument('--ssh-command',
+                              help="替代默认 ssh 的命令，末尾会追加目标和远端命令，如 \"ssh -p 2222\"")
+    fleet_parser.add_argument('--log-format', choices=['text', 'json'], default='text',
+                              help="设备输出的日志格式：文本或每行一条 JSON 记录（system_check.sh -f json）")
+    fleet_parser.add_argument('--no-report', action='store_true', help="只采集日志，不生成报告")
+    fleet_parser.add_argument('-v', '--verbose', action='store_true', help="输出每台设备的完成情况")
+    fleet_parser.add_argument('--store', help="同时把解析结果写入该 SQLite 数据库")
+    fleet_parser.add_argument('-j', '--jobs', type=int, help="解析进程数，默认为CPU核数")
+    fleet_parser.add_argument('--index-mode', choices=['auto', 'cards', 'virtual'], default='auto',
+                              help="索引页形式：设备卡片或虚拟滚动列表，auto 按设备数自动选择")
+    fleet_parser.add_argument('--bundle', choices=['zip', 'html'],
+                              help="整份报告只写成一个文件：zip 压缩包或自包含的单个 HTML")
+    fleet_parser.add_argument('--format', choices=['text', 'json'], default='text',
+                              help="报告汇总信息输出格式")
+    fleet_parser.add_argument('--fail-on-alert', action='store_true',
+                              help="存在告警时以退出码 3 结束")
+    fleet_parser.set_defaults(from_store=None, recursive=False, since=None, until=None, ip_prefix=None)
+
+    # 默认值在 report_server 模块中定义，这里不导入
+    serve_parser = subparsers.add_parser('serve', help="启动本地报告服务，设备页面在访问时才生成")
+    serve_parser.add_argument('-i', '--input', required=True, help="日志文件目录")
+    serve_parser.add_argument('-o', '--output',
+                              help="report 子命令的输出目录，复用其中的解析缓存，默认与日志目录相同")
+    serve_parser.add_argument('--bind', default='127.0.0.1', help="监听地址，默认只允许本机访问")
+    serve_parser.add_argument('-p', '--port', type=int, help="监听端口，默认 8765，0 为任意空闲端口")
+    serve_parser.add_argument('-j', '--jobs', type=int, help="解析进程数，默认为CPU核数")
+    serve_parser.add_argument('--index-mode', choices=['auto', 'cards', 'virtual'], default='auto',
+                              help="索引页形式：设备卡片或虚拟滚动列表，auto 按设备数自动选择")
+    serve_parser.add_argument('--open', action='store_true', help="启动后在浏览器中打开")
+    serve_parser.add_argument('-v', '--verbose', action='store_true', help="输出每个请求")
+    add_discovery_arguments(serve_parser)
+
+    startup_parser = subparsers.add_parser('startup', help="测量各运行模式的冷启动导入耗时")
+    startup_parser.add_argument('mode', nargs='?', choices=list(STARTUP_IMPORTS),
+                                help="只测量指定模式，默认全部")
+    startup_parser.add_argument('--top', type=int, default=10, help="显示耗时最多的前 N 个模块")
+
+    args = parser.parse_args(argv)
+    if args.command == 'report':
+        if args.from_store and not args.output:
+            parser.error("--from-store 需要同时指定 -o/--output")
+        if not args.from_store and not args.input:
+            parser.error("需要指定 -i/--input 或 --from-store")
+        return report_command(args)
+    if args.command == 'query':
+        return query_command(args)
+    if args.command == 'collect':
+        return collect_command(args)
+    if args.command == 'agent':
+        return agent_command(args)
+    if args.command == 'export':
+        return export_command(args)
+    if args.command == 'fleet':
+        return fleet_command(args)
+    if args.command == 'serve':
+        return serve_command(args)
+    if args.command == 'startup':
+        return startup_command(args)
+    return gui_command()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 打包为 exe 后进程池子进程需要 freeze_support；源码运行时不需要，也不必在启动时导入 multiprocessing
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
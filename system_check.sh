@@ -32,14 +32,147 @@ DPDK_QUEUE_THRESHOLD=80
 # b256_pool使用率阈值（单位：百分比）
 B256_POOL_THRESHOLD=10
 
+# 单个检查项的超时时间（单位：秒），超时的检查项输出 [告警] 超时
+CHECK_TIMEOUT=60
+
+# 个别检查项单独设置超时时间，如 CHECK_TIMEOUTS=([core]=120 [traffic]=30)
+declare -A CHECK_TIMEOUTS=()
+
 # CTCC 命令相关配置
 CTCC_CMD="/home/ctcc_cmd"
 CTCC_PORT="26500"
 
+# 临时目录：保存各检查项的输出和 ctcc_cmd 查询缓存，脚本退出时删除
+WORK_DIR=$(mktemp -d /tmp/system_check.XXXXXX)
+# 正在执行的检查项 {检查项: 进程组号}，退出时先结束它们再删除临时目录
+declare -A RUNNING_CHECKS=()
+trap cleanup EXIT
+# ctcc_cmd 输出缓存目录：同一次巡检中相同的查询只连接一次 updpi 控制端口
+CTCC_CACHE_DIR="$WORK_DIR/ctcc"
+mkdir -p "$CTCC_CACHE_DIR"
+# 指定时把本次巡检的 ctcc_cmd 原始输出和全部查询的耗时（timings.tsv）保存到该目录
+CTCC_RECORD_DIR="${CTCC_RECORD_DIR:-}"
+# 指定时不执行 ctcc_cmd，从该目录读取录制的输出（用于测试）
+CTCC_REPLAY_DIR="${CTCC_REPLAY_DIR:-}"
+
+# 输出格式：text 为文本日志，json 为每行一条 JSON 记录（-f 参数指定）
+OUTPUT_FORMAT="text"
+# 输出文本日志的同时把 JSON 记录写入该文件（-J 参数指定）
+JSON_FILE=""
+# JSON 记录的格式版本
+JSON_VERSION=1
+# 检查项记录数值指标的文件，执行检查时按检查项设置
+METRIC_FILE=/dev/null
+# 检查项记录 ctcc_cmd 查询耗时的文件，执行检查时按检查项设置
+CTCC_TIMING_FILE=/dev/null
+
 # 定义要检查的服务列表（补充.service后缀保证兼容性）
 SERVICES=("updpi.service" "upp.service" "upload.service" "logtar.service" "tnlinfo_proxy.service")
 
 # ===== 函数定义 =====
+# 函数：执行 ctcc_cmd 查询，同一次巡检中相同的查询只执行一次
+# 实际执行的查询把耗时记入当前检查项，输出在该部分的 @timing 行之后
+# 用法：ctcc_query <端口> <模块> <命令>
+ctcc_query() {
+    local port="$1" module="$2" command="$3"
+    local key file tmp start end timing lock_fd
+
+    # ru 是 rule 模块的简写，两者查询结果相同
+    [ "$module" = "ru" ] && module="rule"
+    key="${port}_${module}_${command}"
+    key="${key//[^A-Za-z0-9._-]/_}"
+    key="${key%_}"
+    file="$CTCC_CACHE_DIR/$key"
+    # 检查项并发执行，临时文件按进程区分，避免同时查询时互相覆盖
+    tmp="$file.tmp.$BASHPID"
+
+    if [ ! -f "$file" ]; then
+        # 检查项并发时可能同时查询同一内容：按查询加锁，拿到锁后再确认一次，
+        # 只有第一个实际执行查询，其余等它写完后直接读取结果。
+        # 锁随文件描述符在进程退出时释放，超时被结束的检查项不会留下锁
+        exec {lock_fd}>"$file.lock"
+        flock "$lock_fd"
+        if [ ! -f "$file" ]; then
+            if [ -n "$CTCC_REPLAY_DIR" ]; then
+                cat "$CTCC_REPLAY_DIR/$key" > "$tmp" 2>/dev/null
+            else
+                start=$(date +%s%N)
+                "$CTCC_CMD" "$port" "$module" "$command" > "$tmp"
+                end=$(date +%s%N)
+                # 每条查询的耗时（毫秒），与查询一一对应
+                printf -v timing '%d\t%s %s %s\n' $(( (end - start) / 1000000 )) "$port" "$module" "$command"
+                printf '%s' "$timing" >> "$CTCC_TIMING_FILE"
+                printf '%s' "$timing" >> "$CTCC_CACHE_DIR/timings.tsv"
+            fi
+            mv "$tmp" "$file"
+            if [ -n "$CTCC_RECORD_DIR" ]; then
+                mkdir -p "$CTCC_RECORD_DIR" && cp "$file" "$CTCC_RECORD_DIR/$key"
+                [ -f "$CTCC_CACHE_DIR/timings.tsv" ] && cp "$CTCC_CACHE_DIR/timings.tsv" "$CTCC_RECORD_DIR/"
+            fi
+        fi
+        exec {lock_fd}>&-
+    fi
+    cat "$file"
+}
+
+# 函数：记录检查项的数值指标，指标名与报告生成器的指标名一致
+# 用法：record_metric <指标名> <数值>
+record_metric() {
+    printf '%s\t%s\n' "$1" "$2" >> "$METRIC_FILE"
+}
+
+# 函数：把文本转换为 JSON 字符串字面量，结果保存到第一个参数指定的变量
+# 按字节处理，UTF-8 多字节字符原样保留；除换行、回车、制表符外的控制字符被删除
+to_json_string() {
+    local LC_ALL=C
+    local text="$2"
+    text=${text//\\/\\\\}
+    text=${text//\"/\\\"}
+    text=${text//$'\n'/\\n}
+    text=${text//$'\r'/\\r}
+    text=${text//$'\t'/\\t}
+    text=${text//[$'\001'-$'\010'$'\013'$'\014'$'\016'-$'\037']/}
+    printf -v "$1" '"%s"' "$text"
+}
+
+# 函数：把指标文件转换为 JSON 对象，非数值的指标被忽略
+# 用法：metrics_to_json <变量名> <指标文件>
+metrics_to_json() {
+    local key value fields=() IFS
+    if [ -f "$2" ]; then
+        while IFS=$'\t' read -r key value; do
+            [[ $value =~ ^-?(0|[1-9][0-9]*)(\.[0-9]+)?$ ]] || continue
+            to_json_string key "$key"
+            fields+=("$key:$value")
+        done < "$2"
+    fi
+    IFS=,
+    printf -v "$1" '{%s}' "${fields[*]}"
+}
+
+# 函数：把 ctcc_cmd 查询耗时（"毫秒<TAB>查询" 列表）转换为 JSON 数组
+# 用法：ctcc_to_json <变量名> [耗时行...]
+ctcc_to_json() {
+    local name="$1" line query items=() IFS
+    shift
+    for line in "$@"; do
+        to_json_string query "${line#*$'\t'}"
+        items+=("{\"elapsed_ms\":${line%%$'\t'*},\"query\":$query}")
+    done
+    IFS=,
+    printf -v "$name" '[%s]' "${items[*]}"
+}
+
+# 函数：输出一条 JSON 记录：-f json 时写到标准输出，-J 指定文件时追加到该文件
+emit_json() {
+    if [ "$OUTPUT_FORMAT" = "json" ]; then
+        printf '%s\n' "$1"
+    fi
+    if [ -n "$JSON_FILE" ]; then
+        printf '%s\n' "$1" >> "$JSON_FILE"
+    fi
+}
+
 # 函数：获取服务运行时间
 get_uptime() {
     service_name="$1"
@@ -64,7 +197,7 @@ get_version() {
             version=$(/home/upp/anvs_upp -v | grep -a ver | awk -F '[: ]' '{print $8}')
             ;;
         upload.service)
-            version=$("$CTCC_CMD" "6666" upload "show version -rd" | grep -a Ver | awk -F '[:_]' '{print $4}')
+            version=$(ctcc_query 6666 upload "show version -rd" | grep -a Ver | awk -F '[:_]' '{print $4}')
             ;;
         logtar.service)
             version=$(/home/logtar/LogTar -v | grep -a Ver | awk -F '[: ]' '{print $5}')
@@ -79,8 +212,8 @@ get_version() {
 
 # 函数：生成巡检总结（单行输出）
 generate_summary() {
-    summary="巡检总结: "
-    summary+="内存: ${memory_status:-N/A}, "
+    local summary_json
+    summary="内存: ${memory_status:-N/A}, "
     summary+="磁盘: ${disk_status:-N/A}, "
     summary+="服务状态: ${service_status:-N/A}, "
     summary+="硬件状态: ${hardware_status:-N/A}, "
@@ -97,19 +230,24 @@ generate_summary() {
     summary+="流量情况: ${traffic_status:-N/A}, "
     summary+="策略加载: ${policy_status:-N/A}, "
     summary+="策略下发: ${policy_release_status:-N/A}"
-    echo -e "\n===== 巡检完成 ====="
-    echo "$summary"
+    if [ "$OUTPUT_FORMAT" = "text" ]; then
+        echo -e "\n===== 巡检完成 ====="
+        echo "巡检总结: $summary"
+    fi
+    to_json_string summary_json "$summary"
+    emit_json "{\"type\":\"summary\",\"has_alert\":$has_alert,\"summary\":$summary_json}"
 }
 
 # 函数：内存检查
 check_memory() {
     echo -e "\n---- 内存使用 ----"
     memory_alert=false
-    free -b | awk -v threshold="$MEMORY_THRESHOLD" '
+    free -b | awk -v threshold="$MEMORY_THRESHOLD" -v metric_file="$METRIC_FILE" '
     /Mem/ {
         total = $2/1024/1024
         used = ($3)/1024/1024
         use_percent = ($3/$2)*100
+        printf "内存使用率\t%.1f\n", use_percent > metric_file
   
         if (use_percent >= threshold) {
             printf "[告警] 内存使用率过高: 总内存 %.1fG | 已用 %.1fG(%.1f%%)\n", 
@@ -118,7 +256,7 @@ check_memory() {
                 use_percent
             exit 1
         } else {
-            print "（正常）内存使用正常"
+            printf "（正常）内存使用正常 (当前: %.1f%%)\n", use_percent
         }
     }'
     [ $? -eq 1 ] && memory_alert=true
@@ -134,20 +272,27 @@ check_memory() {
 check_disk() {
     echo -e "\n---- 磁盘使用 ----"
     disk_alert=false
-    df -h | awk -v threshold="$DISK_THRESHOLD" '
+    df -h | awk -v threshold="$DISK_THRESHOLD" -v metric_file="$METRIC_FILE" '
     NR>1 {
         if ($1 ~ /tmpfs|udev/) next
 
         gsub(/%/,"",$5)
+        if ($5 + 0 > max_use) {
+            max_use = $5 + 0
+            max_mount = $6
+        }
         if ($5 >= threshold) {
             printf "[告警] 挂载点 %s 使用率过高: 已用 %s/%s(%.1f%%)\n", 
                 $6, $3, $2, $5
-            disk_alert = true
+            alert = 1
         }
     }
     END {
-        if (!disk_alert) print "（正常）磁盘使用正常"
+        if (!alert) printf "（正常）磁盘使用正常 (最高: %d%% %s)\n", max_use, max_mount
+        if (max_mount != "") printf "磁盘使用率\t%d\n", max_use > metric_file
+        exit alert
     }'
+    [ $? -eq 1 ] && disk_alert=true
     if $disk_alert; then
         has_alert=true
         disk_status="告警"
@@ -219,7 +364,8 @@ check_services() {
 # 函数：回填率检查
 check_backfill() {
     echo -e "\n---- 回填率 ----"
-    backfill_rate=$("$CTCC_CMD" "$CTCC_PORT" tn "show tunnel_info stat" | grep -a "Backfill Rate" | awk -F '[:,]' '{print $2}' | tr -d ' %')
+    backfill_rate=$(ctcc_query "$CTCC_PORT" tn "show tunnel_info stat" | grep -a "Backfill Rate" | awk -F '[:,]' '{print $2}' | tr -d ' %')
+    [ -n "$backfill_rate" ] && record_metric "回填率" "$backfill_rate"
     if [ -z "$backfill_rate" ]; then
         echo "   [告警] 回填率获取失败"
         has_alert=true
@@ -243,7 +389,7 @@ check_traffic() {
   
     # 检查端口状态
     echo "端口状态检查:"
-    link_info=$("$CTCC_CMD" "$CTCC_PORT" ud "show link" | awk '
+    link_info=$(ctcc_query "$CTCC_PORT" ud "show link" | awk '
         /Port[0-9]/ && NF >= 6 {
             # 检查包含Port的行且至少有6列
             printf "%s %s\n", $1, $6
@@ -272,14 +418,15 @@ check_traffic() {
     fi
 
     # 检查流量信息
-    traffic_info=$("$CTCC_CMD" "$CTCC_PORT" ud "show pkt_stat e" | grep -aA 2 -B 2 Port | head -4)
+    traffic_info=$(ctcc_query "$CTCC_PORT" ud "show pkt_stat e" | grep -aA 2 -B 2 Port | head -4)
 
     if [ -z "$traffic_info" ]; then
         echo "   [告警] 流量信息获取失败"
         has_alert=true
         traffic_status="告警"
     else
-        echo "$traffic_info" | awk -v miss_threshold="$MISS_THRESHOLD" -v mbps_threshold="$MBPS_THRESHOLD" '
+        echo "$traffic_info" | awk -v miss_threshold="$MISS_THRESHOLD" -v mbps_threshold="$MBPS_THRESHOLD" \
+                                   -v metric_file="$METRIC_FILE" '
         BEGIN {
             alert = 0
             no_traffic = 0
@@ -291,6 +438,7 @@ check_traffic() {
             miss = $4
             mbps = $7
             printf "（正常）%s: Miss=%s, Mbps=%s\n", port, miss, mbps
+            printf "%s Miss\t%s\n%s Mbps\t%s\n", port, miss, port, mbps > metric_file
             if (miss > miss_threshold) {
                 printf "   [告警] %s Miss 超过 %s\n", port, miss_threshold
                 alert = 1
@@ -320,7 +468,7 @@ check_traffic() {
                 has_alert=true
                 traffic_status="告警"
                 echo -e "\nDPDK错误统计（触发Miss或Mbps阈值后自动显示）:"
-                $CTCC_CMD $CTCC_PORT udpi "show dpdk" | 
+                ctcc_query "$CTCC_PORT" udpi "show dpdk" | 
                     grep -a -E "Port|rx_crc_errors|rx_no_desc|rx_dropped_packets" | sed 's/^/   /'
                 ;;
         esac
@@ -332,7 +480,7 @@ check_policy() {
     echo -e "\n---- 策略加载信息 ----"
   
     # 检查规则分配失败情况
-    rule_alloc_failed=$("$CTCC_CMD" "$CTCC_PORT" rule "show action summary" | grep -a "Rule more alloc failed")
+    rule_alloc_failed=$(ctcc_query "$CTCC_PORT" rule "show action summary" | grep -a "Rule more alloc failed")
   
     if [ -n "$rule_alloc_failed" ]; then
         echo "[告警] 检测到规则分配失败:"
@@ -345,7 +493,7 @@ check_policy() {
     fi
 
     # 显示策略加载基本信息
-    policy_info=$("$CTCC_CMD" "$CTCC_PORT" ru "show action summary" | grep -a "Ant\|IDS")
+    policy_info=$(ctcc_query "$CTCC_PORT" ru "show action summary" | grep -a "Ant\|IDS")
     if [ -n "$policy_info" ]; then
         echo -e "\n策略数量统计:"
         echo "$policy_info" | sed 's/^/    /'
@@ -439,22 +587,23 @@ check_mempool() {
     echo -e "\n---- Updpi内存池检查 ----"
   
     # 检查内存池状态
-    mempool_info=$("$CTCC_CMD" "$CTCC_PORT" uc "show mempool_stat pool_name 256" | grep -a "b256_pool")
+    mempool_info=$(ctcc_query "$CTCC_PORT" uc "show mempool_stat pool_name 256" | grep -a "b256_pool")
   
     # 检查get_seg_mem_failed状态
-    seg_mem_failed=$("$CTCC_CMD" "$CTCC_PORT" rec "sh rec_stat " | grep -a get_seg_mem_failed | awk -F ':' '{print $2}' | awk '{print $1}')
+    seg_mem_failed=$(ctcc_query "$CTCC_PORT" rec "sh rec_stat " | grep -a get_seg_mem_failed | awk -F ':' '{print $2}' | awk '{print $1}')
   
     # 检查IMSI哈希表使用率
-    imsi_info=$("$CTCC_CMD" "$CTCC_PORT" tn "sh tun stat " | grep -a "imsi hash table")
+    imsi_info=$(ctcc_query "$CTCC_PORT" tn "sh tun stat " | grep -a "imsi hash table")
     imsi_usage=$(echo "$imsi_info" | grep -o '[0-9.]*%' | sed 's/%//')
   
     # 检查DPDK队列使用率
-    dpdk_info=$("$CTCC_CMD" "$CTCC_PORT" rsdp "show dpdk_queue queue_name step12" | grep -a "AGING_RING_STEP12")
+    dpdk_info=$(ctcc_query "$CTCC_PORT" rsdp "show dpdk_queue queue_name step12" | grep -a "AGING_RING_STEP12")
   
     if [ -n "$mempool_info" ]; then
         # 提取失败次数和失败率
         failed_count=$(echo "$mempool_info" | awk '{print $3}')
         failed_rate=$(echo "$mempool_info" | awk '{gsub(/%/,"",$4); print $4}')
+        record_metric "b256_pool失败率" "$failed_rate"
   
         # 使用awk进行浮点数比较
         is_rate_high=$(echo "$failed_rate $B256_POOL_THRESHOLD" | awk '{if ($1 > $2) print "yes"; else print "no"}')
@@ -485,6 +634,7 @@ check_mempool() {
 
         # 打印IMSI哈希表使用情况
         if [ -n "$imsi_info" ]; then
+            [[ $imsi_info =~ \(([0-9.]+)%\) ]] && record_metric "IMSI哈希表使用率" "${BASH_REMATCH[1]}"
             if [ "$is_imsi_high" = "yes" ]; then
                 echo -e "\n[告警] IMSI哈希表使用情况:"
                 echo "$imsi_info" | sed 's/^/    /'
@@ -500,13 +650,15 @@ check_mempool() {
         # 打印DPDK队列使用情况
         if [ -n "$dpdk_info" ]; then
             dpdk_alert=false
+            dpdk_max=0
             while IFS= read -r line; do
                 queue_percent=$(echo "$line" | awk '{print $6}')
+                [ "$queue_percent" -gt "$dpdk_max" ] 2>/dev/null && dpdk_max=$queue_percent
                 if [ "$queue_percent" -ge "$DPDK_QUEUE_THRESHOLD" ]; then
                     dpdk_alert=true
-                    break
                 fi
             done <<< "$dpdk_info"
+            record_metric "DPDK队列使用率" "$dpdk_max"
 
             if [ "$dpdk_alert" = "true" ]; then
                 echo -e "\n[告警] DPDK队列使用情况:"
@@ -545,6 +697,8 @@ show_help() {
     echo "使用方法: $0 [选项]"
     echo "选项:"
     echo "  -h                显示帮助信息"
+    echo "  -f text|json      输出格式：文本日志（默认）或每行一条 JSON 记录"
+    echo "  -J 文件           输出文本日志的同时把 JSON 记录写入该文件"
     echo ""
     echo "可选参数:"
     echo "  memory           检查内存使用情况"
@@ -562,16 +716,241 @@ show_help() {
     echo "  $0               执行所有检查项"
     echo "  $0 memory disk   仅检查内存和磁盘"
     echo "  $0 -h            显示帮助信息"
+    echo "  $0 -f json > check.log   输出 JSON 记录"
     exit 0
 }
 
+# ===== 检查项调度 =====
+# 检查项的标准输出顺序，日志格式依赖该顺序
+CHECK_ORDER=(memory disk services hardware core mempool backfill traffic policy policy_release)
+
+declare -A CHECK_FUNCTIONS=(
+    [memory]=check_memory
+    [disk]=check_disk
+    [services]=check_services
+    [hardware]=check_hardware
+    [core]=check_core_files
+    [mempool]=check_mempool
+    [backfill]=check_backfill
+    [traffic]=check_traffic
+    [policy]=check_policy
+    [policy_release]=check_policy_release
+)
+
+# 超时时输出的部分标题，与各检查函数输出的标题一致
+declare -A CHECK_TITLES=(
+    [memory]="内存使用"
+    [disk]="磁盘使用"
+    [services]="服务状态"
+    [hardware]="硬件错误检查"
+    [core]="Core文件检查"
+    [mempool]="Updpi内存池检查"
+    [backfill]="回填率"
+    [traffic]="流量情况"
+    [policy]="策略加载信息"
+    [policy_release]="策略下发检查"
+)
+
+# 各检查项设置的总结状态变量，检查在子进程中执行，结束后传回主进程
+declare -A CHECK_STATUS_VARS=(
+    [memory]="memory_status"
+    [disk]="disk_status"
+    [services]="service_status"
+    [hardware]="hardware_status"
+    [core]="core_status"
+    [mempool]="mempool_status"
+    [backfill]="backfill_status backfill_rate"
+    [traffic]="traffic_status"
+    [policy]="policy_status"
+    [policy_release]="policy_release_status"
+)
+
+# 函数：结束检查项的整个进程组（检查项子 shell 及其启动的所有命令）
+# 一次发送给整个进程组，子 shell 来不及再启动新的命令
+kill_check() {
+    kill -KILL -- "-$1" 2>/dev/null
+    wait "$1" 2>/dev/null
+}
+
+# 函数：脚本退出时结束仍在执行的检查项并删除临时目录，
+# 避免被中断时检查项的命令继续运行并写入已删除的临时目录
+cleanup() {
+    local name
+    for name in "${!RUNNING_CHECKS[@]}"; do
+        kill_check "${RUNNING_CHECKS[$name]}"
+    done
+    rm -rf "$WORK_DIR"
+}
+
+# 函数：统计检查项启动的外部命令数，作为 DEBUG 陷阱在每条简单命令执行前调用
+# 跳过变量赋值、内建命令、关键字和脚本中的函数；ctcc_query、record_metric 中
+# 只统计 ctcc_cmd 本身，不统计缓存和计时用到的命令。计数追加到文件中，
+# 命令替换和管道中的子进程也能累加。陷阱在检查项的每条命令前执行，
+# 这里不用 [[ =~ ]]，以免覆盖检查项中正则匹配得到的 BASH_REMATCH
+count_external_command() {
+    local command=$BASH_COMMAND word name
+    # 跳过命令前形如 NAME=value 的变量赋值，值较复杂时视为单独的赋值语句
+    while :; do
+        word=${command%% *}
+        case $word in
+            [A-Za-z_]*=*) ;;
+            *) break ;;
+        esac
+        case ${word%%=*} in
+            *[!A-Za-z0-9_]*) break ;;
+        esac
+        case ${word#*=} in
+            *[!A-Za-z0-9_./:-]*) return 0 ;;
+        esac
+        [ "$word" = "$command" ] && return 0
+        command=${command#* }
+        command=${command#"${command%%[! ]*}"}
+    done
+    command=${command%% *}
+    # "$CTCC_CMD"、$memory_alert 这类以变量作为命令的，按变量的值判断
+    case $command in
+        \$*|\"\$*\")
+            name=${command#\"}
+            name=${name%\"}
+            name=${name#\$}
+            case $name in
+                \{*\}) name=${name:1:-1} ;;
+            esac
+            case $name in
+                ''|[!A-Za-z_]*|*[!A-Za-z0-9_]*) ;;
+                *) command=${!name} ;;
+            esac
+            ;;
+    esac
+    case ${FUNCNAME[1]} in
+        ctcc_query|record_metric) [ "$command" = "$CTCC_CMD" ] || return 0 ;;
+    esac
+    [[ -z $command || $command == *=* || -n ${INTERNAL_COMMANDS[$command]} ]] && return 0
+    printf '.' >> "$COMMAND_COUNT_FILE"
+}
+
+# 函数：并发执行检查项，按参数顺序输出各检查结果
+# 每个检查项在单独进程组的子进程中执行，输出写入单独的文件，总结状态写入状态文件；
+# 超过超时时间的检查项连同它启动的所有命令一起被结束，输出 [告警] 超时。每部分末尾追加一行
+# "@timing elapsed_ms=耗时 commands=外部命令数"，供报告生成器统计检查耗时，之后每条
+# 实际执行的 ctcc_cmd 查询再输出一行 "@timing ctcc elapsed_ms=耗时 query=端口 模块 命令"
+# （超时的检查项只包含已完成的查询）；
+# 需要 JSON 输出时每个检查项另外生成一条记录，包含状态、数值指标和该部分的原始文本
+run_checks() {
+    local name pid var now elapsed commands output status title metrics ctcc started=$(date +%s%N)
+    local -a ctcc_timings
+    declare -gA INTERNAL_COMMANDS=([\(\(]=1)
+    for var in $(compgen -b) $(compgen -k) $(compgen -A function); do
+        INTERNAL_COMMANDS[$var]=1
+    done
+
+    # 打开作业控制，后台启动的每个检查项各自成为一个进程组（组号即子 shell 的进程号），
+    # 超时时可以一次结束整组；子 shell 内部没有作业控制，其中的命令都留在该组中
+    set -m
+    for name in "$@"; do
+        (
+            has_alert=false
+            COMMAND_COUNT_FILE="$WORK_DIR/$name.commands"
+            METRIC_FILE="$WORK_DIR/$name.metrics"
+            CTCC_TIMING_FILE="$WORK_DIR/$name.ctcc"
+            : > "$COMMAND_COUNT_FILE"
+            set -T
+            trap count_external_command DEBUG
+            eval "${CHECK_FUNCTIONS[$name]}" > "$WORK_DIR/$name.out"
+            trap - DEBUG
+            set +T
+            echo $(( ($(date +%s%N) - started) / 1000000 )) > "$WORK_DIR/$name.elapsed"
+            {
+                for var in ${CHECK_STATUS_VARS[$name]}; do
+                    [ -n "${!var+x}" ] && printf '%s=%q\n' "$var" "${!var}"
+                done
+                $has_alert && echo "has_alert=true"
+            } > "$WORK_DIR/$name.state"
+        ) &
+        RUNNING_CHECKS[$name]=$!
+    done
+    set +m
+
+    while [ ${#RUNNING_CHECKS[@]} -gt 0 ]; do
+        sleep 0.2
+        now=$(date +%s%N)
+        for name in "${!RUNNING_CHECKS[@]}"; do
+            pid=${RUNNING_CHECKS[$name]}
+            if ! kill -0 "$pid" 2>/dev/null; then
+                wait "$pid"
+                unset "RUNNING_CHECKS[$name]"
+            elif [ $(( (now - started) / 1000000 )) -ge $(( $(check_timeout "$name") * 1000 )) ]; then
+                kill_check "$pid"
+                touch "$WORK_DIR/$name.timeout"
+                echo $(( (now - started) / 1000000 )) > "$WORK_DIR/$name.elapsed"
+                unset "RUNNING_CHECKS[$name]"
+            fi
+        done
+    done
+
+    for name in "$@"; do
+        title=${CHECK_TITLES[$name]}
+        if [ -f "$WORK_DIR/$name.timeout" ]; then
+            output=$'\n'"---- $title ----"$'\n'"[告警] 超时: $(check_timeout "$name")秒内未完成检查"$'\n'
+            for var in ${CHECK_STATUS_VARS[$name]}; do
+                [[ "$var" == *_status ]] && printf -v "$var" '%s' "告警"
+            done
+            has_alert=true
+            rm -f "$WORK_DIR/$name.metrics"
+        else
+            # read -d '' 读到文件末尾，保留末尾的换行
+            IFS= read -r -d '' output < "$WORK_DIR/$name.out"
+            source "$WORK_DIR/$name.state"
+        fi
+        read -r elapsed < "$WORK_DIR/$name.elapsed"
+        commands=$(< "$WORK_DIR/$name.commands")
+        ctcc_timings=()
+        if [ -f "$WORK_DIR/$name.ctcc" ]; then
+            mapfile -t ctcc_timings < "$WORK_DIR/$name.ctcc"
+        fi
+        if [ "$OUTPUT_FORMAT" = "text" ]; then
+            printf '%s' "$output"
+            echo "@timing elapsed_ms=${elapsed:-0} commands=${#commands}"
+            for var in "${ctcc_timings[@]}"; do
+                echo "@timing ctcc elapsed_ms=${var%%$'\t'*} query=${var#*$'\t'}"
+            done
+        fi
+        if [ "$OUTPUT_FORMAT" = "json" ] || [ -n "$JSON_FILE" ]; then
+            # 原始文本取标题行之后的部分，与文本日志中该部分的正文相同
+            to_json_string output "${output#*"---- $title ----"$'\n'}"
+            var=${CHECK_STATUS_VARS[$name]%% *}
+            to_json_string status "${!var:-N/A}"
+            to_json_string title "$title"
+            metrics_to_json metrics "$WORK_DIR/$name.metrics"
+            ctcc_to_json ctcc "${ctcc_timings[@]}"
+            emit_json "{\"type\":\"check\",\"name\":\"$name\",\"title\":$title,\"status\":$status,\"elapsed_ms\":${elapsed:-0},\"commands\":${#commands},\"metrics\":$metrics,\"ctcc\":$ctcc,\"text\":$output}"
+        fi
+    done
+}
+
+# 函数：检查项的超时时间
+check_timeout() {
+    echo "${CHECK_TIMEOUTS[$1]:-$CHECK_TIMEOUT}"
+}
+
 # ===== 脚本主体 =====
 # 处理命令行参数
-while getopts "h" opt; do
+while getopts "hf:J:" opt; do
     case $opt in
         h)
             show_help
             ;;
+        f)
+            if [ "$OPTARG" != "text" ] && [ "$OPTARG" != "json" ]; then
+                echo "无效的输出格式: $OPTARG" >&2
+                show_help
+            fi
+            OUTPUT_FORMAT="$OPTARG"
+            ;;
+        J)
+            JSON_FILE="$OPTARG"
+            : > "$JSON_FILE" || exit 1
+            ;;
         \?)
             echo "无效的选项: -$OPTARG" >&2
             show_help
@@ -581,64 +960,34 @@ done
 shift $((OPTIND-1))
 
 # 系统概览
-echo "===== 系统巡检报告 | $(date) ====="
-echo "主机名: $(hostname)"
-echo "系统运行时间: $(uptime -p | sed 's/up //')"
+check_time=$(date)
+host_name=$(hostname)
+system_uptime=$(uptime -p | sed 's/up //')
+if [ "$OUTPUT_FORMAT" = "text" ]; then
+    echo "===== 系统巡检报告 | $check_time ====="
+    echo "主机名: $host_name"
+    echo "系统运行时间: $system_uptime"
+fi
+if [ "$OUTPUT_FORMAT" = "json" ] || [ -n "$JSON_FILE" ]; then
+    to_json_string check_time_json "$check_time"
+    to_json_string host_name_json "$host_name"
+    to_json_string system_uptime_json "$system_uptime"
+    emit_json "{\"type\":\"header\",\"version\":$JSON_VERSION,\"hostname\":$host_name_json,\"check_time\":$check_time_json,\"uptime\":$system_uptime_json}"
+fi
 
-# 默认执行所有检查
+# 默认执行所有检查，指定参数时执行对应检查
 if [ $# -eq 0 ]; then
-    check_memory
-    check_disk
-    check_services
-    check_hardware
-    check_core_files
-    check_mempool
-    check_backfill
-    check_traffic
-    check_policy
-    check_policy_release
-else
-    # 根据参数执行对应检查
-    for param in "$@"; do
-        case "$param" in
-            memory)
-                check_memory
-                ;;
-            disk)
-                check_disk
-                ;;
-            services)
-                check_services
-                ;;
-            hardware)
-                check_hardware
-                ;;
-            core)
-                check_core_files
-                ;;
-            mempool)
-                check_mempool
-                ;;
-            backfill)
-                check_backfill
-                ;;
-            traffic)
-                check_traffic
-                ;;
-            policy)
-                check_policy
-                ;;
-            policy_release)
-                check_policy_release
-                ;;
-            *)
-                echo "未知参数: $param"
-                echo "使用 -h 参数查看帮助信息"
-                exit 1
-                ;;
-        esac
-    done
+    set -- "${CHECK_ORDER[@]}"
 fi
+for param in "$@"; do
+    if [ -z "${CHECK_FUNCTIONS[$param]}" ]; then
+        echo "未知参数: $param"
+        echo "使用 -h 参数查看帮助信息"
+        exit 1
+    fi
+done
+# 各检查项并发执行，总耗时取决于最慢的检查项，输出顺序与参数顺序一致
+run_checks "$@"
 
 # 生成巡检总结
 generate_summary
\ No newline at end of file
@@ -6,7 +6,7 @@ a = Analysis(
     ['system_check.py'],
     pathex=['c:\\Users\\Sino-Deng\\Trae\\system_check'],
     binaries=[],
-    datas=[('html_generator.py', '.')],
+    datas=[('html_generator.py', '.'), ('system_check.sh', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
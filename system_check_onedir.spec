@@ -0,0 +1,53 @@
+# -*- mode: python ; coding: utf-8 -*-
+# 目录版打包：程序和依赖直接放在 dist/SystemCheck/ 下，启动时无需像单文件版那样
+# 每次解压到临时目录，也不使用 UPX（解压缩同样拖慢启动），适合被计划任务频繁调用
+
+block_cipher = None
+
+a = Analysis(
+    ['system_check.py'],
+    pathex=['c:\\Users\\Sino-Deng\\Trae\\system_check'],
+    binaries=[],
+    datas=[('html_generator.py', '.'), ('system_check.sh', '.')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False,
+)
+
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='SystemCheck',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon='system_check.ico',
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='SystemCheck',
+)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from agent import RingBuffer, SamplingAgent, summarize
+from history_store import HistoryStore
+
+DESCRIPTION = {
+    'hostname': 'host-1',
+    'system_version': 'CentOS 7.9',
+    'uptime': 3600,
+    'thresholds': {'memory': 80, 'disk': 90},
+}
+
+
+class FakeHost:
+    """按顺序返回预设的使用率和服务状态，记录写出的窗口"""
+
+    def __init__(self, usage, services=None):
+        self.usage = iter(usage)
+        self.services = iter(services or [])
+        self.last_services = [('updpi.service', 'active', '0:10:00')]
+        self.written = []
+
+    def read_usage(self):
+        return next(self.usage)
+
+    def read_services(self):
+        self.last_services = next(self.services, self.last_services)
+        return self.last_services
+
+    def describe(self):
+        return dict(DESCRIPTION)
+
+    def write(self, summary):
+        self.written.append(summary)
+
+    def agent(self, **kwargs):
+        return SamplingAgent(self.read_usage, self.read_services, self.describe, self.write, **kwargs)
+
+
+def test_ring_buffer_wraps_around():
+    buffer = RingBuffer(3)
+    for value in (1, 2):
+        buffer.append(value)
+    assert list(buffer.items()) == [1, 2]
+
+    for value in (3, 4, 5):
+        buffer.append(value)
+    assert len(buffer) == 3
+    assert list(buffer.items()) == [3, 4, 5]
+
+    buffer.clear()
+    assert len(buffer) == 0
+    buffer.append(6)
+    assert list(buffer.items()) == [6]
+
+
+def test_summarize_nearest_rank_p95():
+    assert summarize(range(1, 101)) == (1, 100, 50.5, 95)
+    assert summarize([5, 1, 3, 2, 4]) == (1, 5, 3.0, 5)
+    assert summarize(range(1, 21))[3] == 19
+    assert summarize([7]) == (7, 7, 7.0, 7)
+
+
+def test_window_rollover():
+    host = FakeHost([(float(i), 50.0) for i in range(12)],
+                    services=[[('updpi.service', 'failed', '')],
+                              [('updpi.service', 'active', '0:00:30')]])
+    agent = host.agent(interval=10, window=60, service_interval=30)
+    for now in range(1000, 1120, 10):
+        agent.tick(now)
+
+    # 1000、1010 在窗口 [960, 1020) 中，1020..1070 在 [1020, 1080) 中，1080 起为第三个窗口，尚未写出
+    assert [summary['time'] for summary in host.written] == [960, 1020]
+    first, second = host.written
+    assert first['samples'] == 2
+    assert first['memory'] == (0.0, 1.0, 0.5, 1.0)
+    assert second['samples'] == 6
+    assert second['memory'][:3] == (2.0, 7.0, 4.5)
+    assert second['interval'] == 10 and second['window'] == 60
+    assert second['hostname'] == 'host-1'
+    # 窗口内出现过的 failed 不被之后的 active 覆盖，下一个窗口重新开始
+    assert first['services'] == [('updpi.service', 'failed', '')]
+    assert second['services'] == [('updpi.service', 'active', '0:00:30')]
+
+    agent.flush()
+    assert host.written[-1]['time'] == 1080
+    assert host.written[-1]['samples'] == 4
+    assert agent.stats()['windows'] == 3
+    agent.flush()
+    assert len(host.written) == 3
+
+
+def test_failed_write_keeps_window():
+    host = FakeHost([(10.0, 20.0), (30.0, 40.0), (50.0, 60.0)])
+    failures = [OSError('disk full')]
+
+    def write(summary):
+        if failures:
+            raise failures.pop()
+        host.written.append(summary)
+
+    agent = SamplingAgent(host.read_usage, host.read_services, host.describe, write,
+                          interval=10, window=60)
+    agent.tick(0)
+    agent.tick(10)
+    with pytest.raises(OSError):
+        agent.tick(60)
+
+    agent.flush()
+    summary, = host.written
+    assert summary['time'] == 0
+    assert summary['samples'] == 2
+    assert summary['memory'][:3] == (10.0, 30.0, 20.0)
+
+
+def test_run_flushes_partial_window_on_stop():
+    stop = threading.Event()
+    times = iter(range(0, 1000, 10))
+    usage = iter([(float(i), 1.0) for i in range(8)])
+
+    def read_usage():
+        value = next(usage)
+        if value[0] == 7:
+            stop.set()
+        return value
+
+    host = FakeHost([])
+    agent = SamplingAgent(read_usage, host.read_services, host.describe, host.write,
+                          interval=0.001, window=60, clock=lambda: next(times))
+    agent.run(stop)
+
+    assert [(summary['time'], summary['samples']) for summary in host.written] == [(0, 6), (60, 2)]
+    assert agent.stats()['ticks'] == 8
+
+
+def test_window_store_round_trip(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    summary = dict(DESCRIPTION, time=86400, interval=1, window=86400,
+                   memory=(10.0, 90.0, 50.0, 85.0), disk=(60.0, 61.0, 60.5, 61.0),
+                   samples=86400, cost_mean=0.25, cost_max=3.5,
+                   services=[('updpi.service', 'active', '0:10:00')])
+    store.append_window(summary)
+
+    segment, = store.load()
+    assert segment.meta['kind'] == 'window'
+    assert list(segment.columns['samples']) == [86400]
+    assert list(segment.columns['memory_p95']) == [85.0]
+    assert list(segment.columns['time']) == [86400]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import os
+
+from history_store import HistoryStore, TIME_COLUMN
+
+START = 1739781542  # 2025-02-17 08:39:02 UTC
+THRESHOLDS = {'memory': 80, 'disk': 90}
+
+
+def make_sample(offset, services, memory=42.5, disk=61.0):
+    return {
+        'time': START + offset,
+        'hostname': 'host-1',
+        'system_version': 'CentOS 7.9',
+        'memory': memory,
+        'disk': disk,
+        'uptime': 3600,
+        'services': services,
+        'thresholds': THRESHOLDS,
+    }
+
+
+def read_csv(path):
+    with open(path, 'r', newline='', encoding='gbk') as f:
+        return list(csv.DictReader(f))
+
+
+def test_round_trip_splits_segment_when_services_change(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    before = [('updpi.service', 'active', '1 day, 2:03:04'), ('upp.service', 'failed', '')]
+    after = [('updpi.service', 'active', '1 day, 2:04:04'), ('upload.service', 'inactive', '')]
+    store.append(make_sample(0, before, memory=42.5))
+    store.append(make_sample(60, before, memory=85.0))
+    store.append(make_sample(120, after, disk=95.5))
+
+    segments = store.load()
+    assert len(segments) == 2
+    assert [len(segment) for segment in segments] == [2, 1]
+    assert segments[0].meta['services'] == ['updpi.service', 'upp.service']
+    assert segments[1].meta['services'] == ['updpi.service', 'upload.service']
+    assert list(segments[0].columns['memory']) == [42.5, 85.0]
+    assert list(segments[0].columns['service0_running']) == [93784, 93784]
+    assert list(segments[0].columns['service1_running']) == [-1, -1]
+
+    # 时间范围为 [since, until)
+    assert [len(segment) for segment in store.load(since=START + 60)] == [1, 1]
+    assert [len(segment) for segment in store.load(until=START + 60)] == [1]
+
+    csv_path = str(tmp_path / 'export.csv')
+    assert store.export_csv(csv_path) == 3
+    rows = read_csv(csv_path)
+    assert list(rows[0])[-3:] == ['upload.service_状态', 'upload.service_运行时间', 'upload.service_告警']
+    assert [row['内存状态'] for row in rows] == ['正常', '告警', '正常']
+    assert [row['磁盘状态'] for row in rows] == ['正常', '正常', '告警']
+    assert rows[0]['updpi.service_运行时间'] == '1 day, 2:03:04'
+    assert rows[0]['upp.service_状态'] == 'failed'
+    assert rows[0]['upp.service_运行时间'] == '未运行'
+    # 另一个分段没有的服务留空
+    assert rows[0]['upload.service_状态'] == ''
+    assert rows[2]['upp.service_状态'] == ''
+    assert rows[2]['upload.service_告警'] == '告警'
+
+
+def test_interrupted_append_is_truncated(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    services = [('updpi.service', 'active', '0:10:00')]
+    store.append(make_sample(0, services, memory=10.0))
+    path = store.segment_paths()[0]
+
+    # 模拟追加到一半中断：时间列最后写入，其他列多出半行
+    for column in ('memory', 'service0_running'):
+        with open(os.path.join(path, column), 'ab') as f:
+            f.write(b'\x01\x02')
+    segment, = store.load()
+    assert len(segment) == 1
+    assert list(segment.columns['memory']) == [10.0]
+
+    store.append(make_sample(60, services, memory=20.0))
+    segment, = store.load()
+    assert list(segment.columns['memory']) == [10.0, 20.0]
+    assert list(segment.columns['service0_running']) == [600, 600]
+    time_size = os.path.getsize(os.path.join(path, TIME_COLUMN[0]))
+    assert os.path.getsize(os.path.join(path, 'memory')) * 2 == time_size
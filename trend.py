@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import re
+from array import array
+from datetime import datetime
+
+# 指标阈值和告警方向，与 system_check.sh 中的阈值保持一致
+# 'up' 表示达到阈值即告警，'down' 表示低于阈值告警
+METRIC_THRESHOLDS = {
+    '内存使用率': (90, 'up'),
+    '磁盘使用率': (80, 'up'),
+    '回填率': (90, 'down'),
+    'Miss': (1000, 'up'),
+    'Mbps': (35000, 'up'),
+    'b256_pool失败率': (10, 'up'),
+    'IMSI哈希表使用率': (80, 'up'),
+    'DPDK队列使用率': (80, 'up'),
+}
+
+# 计算斜率使用的最近点数
+TREND_WINDOW = 14
+# 移动平均窗口
+MOVING_AVERAGE_WINDOW = 7
+# 至少需要的历史点数
+MIN_POINTS = 3
+# 预计多少天内超过阈值视为正在恶化
+TREND_HORIZON_DAYS = 14
+
+PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)%')
+BACKFILL_RE = re.compile(r'回填率(?:过低)?: (\d+(?:\.\d+)?)%')
+PORT_RE = re.compile(r'(Port\d+): Miss=(\d+(?:\.\d+)?), Mbps=(\d+(?:\.\d+)?)')
+B256_RE = re.compile(r'b256_pool\s+\S+\s+\S+\s+(\d+(?:\.\d+)?)')
+IMSI_RE = re.compile(r'imsi hash table.*?\((\d+(?:\.\d+)?)%\)')
+DPDK_RE = re.compile(r'使用率: (\d+(?:\.\d+)?)%')
+
+
+def extract_metrics(sections):
+    """从解析结果的各部分正文中提取数值指标，返回 {指标名: 数值}
+
+    流量指标按端口区分，如 'Port0 Miss'、'Port0 Mbps'；磁盘和 DPDK 队列取最大值。
+    """
+    metrics = {}
+
+    content = sections.get('内存使用', '')
+    match = PERCENT_RE.search(content)
+    if match:
+        metrics['内存使用率'] = float(match.group(1))
+
+    values = [float(v) for v in PERCENT_RE.findall(sections.get('磁盘使用', ''))]
+    if values:
+        metrics['磁盘使用率'] = max(values)
+
+    match = BACKFILL_RE.search(sections.get('回填率', ''))
+    if match:
+        metrics['回填率'] = float(match.group(1))
+
+    for port, miss, mbps in PORT_RE.findall(sections.get('流量情况', '')):
+        metrics[f'{port} Miss'] = float(miss)
+        metrics[f'{port} Mbps'] = float(mbps)
+
+    content = sections.get('Updpi内存池检查', '')
+    match = B256_RE.search(content)
+    if match:
+        metrics['b256_pool失败率'] = float(match.group(1))
+    match = IMSI_RE.search(content)
+    if match:
+        metrics['IMSI哈希表使用率'] = float(match.group(1))
+    values = [float(v) for v in DPDK_RE.findall(content)]
+    if values:
+        metrics['DPDK队列使用率'] = max(values)
+
+    return metrics
+
+def metric_threshold(metric):
+    """返回指标的 (阈值, 方向)，端口指标按最后一个词（Miss/Mbps）查找"""
+    return METRIC_THRESHOLDS.get(metric) or METRIC_THRESHOLDS.get(metric.rsplit(' ', 1)[-1])
+
+class MetricSeries:
+    """单台设备单个指标的时间序列，用 array 紧凑保存 (天数, 数值)"""
+
+    __slots__ = ('days', 'values')
+
+    def __init__(self):
+        self.days = array('d')
+        self.values = array('d')
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, day, value):
+        self.days.append(day)
+        self.values.append(value)
+
+    def slope(self, window=TREND_WINDOW):
+        """最近 window 个点的最小二乘斜率（每天变化量），点数不足时返回 None"""
+        days = self.days[-window:]
+        values = self.values[-window:]
+        n = len(values)
+        if n < 2:
+            return None
+        mean_day = sum(days) / n
+        mean_value = sum(values) / n
+        denominator = sum((d - mean_day) ** 2 for d in days)
+        if denominator == 0:
+            return None
+        return sum((d - mean_day) * (v - mean_value) for d, v in zip(days, values)) / denominator
+
+    def moving_average(self, window=MOVING_AVERAGE_WINDOW):
+        values = self.values[-window:]
+        return sum(values) / len(values) if values else None
+
+    def days_until(self, threshold, direction):
+        """按当前斜率预计多少天后触发阈值；已告警返回 0，不在恶化返回 None"""
+        if not self.values:
+            return None
+        last = self.values[-1]
+        if (direction == 'up' and last >= threshold) or (direction == 'down' and last < threshold):
+            return 0.0
+        slope = self.slope()
+        if slope is None:
+            return None
+        if direction == 'up' and slope > 0:
+            return (threshold - last) / slope
+        if direction == 'down' and slope < 0:
+            return (last - threshold) / -slope
+        return None
+
+def build_trends(history):
+    """把 (ip, checked_at, 指标名, 数值) 记录按时间顺序组装为 {ip: {指标名: MetricSeries}}"""
+    epoch = datetime(1970, 1, 1)
+    trends = {}
+    for ip, checked_at, metric, value in history:
+        day = (datetime.strptime(checked_at, '%Y-%m-%d %H:%M:%S') - epoch).total_seconds() / 86400
+        trends.setdefault(ip, {}).setdefault(metric, MetricSeries()).append(day, value)
+    return trends
+
+def find_degrading(trends, horizon_days=TREND_HORIZON_DAYS):
+    """找出尚未告警但预计 horizon_days 天内触发阈值的指标
+
+    返回 {ip: [(指标名, 当前值, 移动平均, 每天变化量, 剩余天数)]}，按剩余天数排序。
+    """
+    degrading = {}
+    for ip, series_by_metric in trends.items():
+        warnings = []
+        for metric, series in series_by_metric.items():
+            threshold = metric_threshold(metric)
+            if threshold is None or len(series) < MIN_POINTS:
+                continue
+            days_left = series.days_until(*threshold)
+            if days_left is not None and 0 < days_left <= horizon_days:
+                warnings.append((metric, series.values[-1], series.moving_average(),
+                                 series.slope(), days_left))
+        if warnings:
+            degrading[ip] = sorted(warnings, key=lambda item: item[4])
+    return degrading
+
+def format_warning(warning):
+    """把 find_degrading 的单条结果格式化为页面显示的文字"""
+    metric, last, _, slope, days_left = warning
+    return f"{metric} {last:g}（每天 {slope:+.2f}），约 {days_left:.1f} 天后触发阈值"